@@ -9,28 +9,131 @@ Example code:
     >>> track = bandcamp.track.info(api=api, track_id=1269403107)
     >>> print(track.title)
     Creep (Live in Prague)
+
+Every module level function also works with an AsyncApi object, in which case it returns an awaitable:
+    >>> api = bandcamp.AsyncApi(api_key='your-secret-api-key')
+    >>> track = await bandcamp.track.info(api=api, track_id=1269403107)
 """
+import asyncio
 import os
-import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlencode
-from urllib.request import urlopen
 
 from . import track
 from . import url
 from . import album
 from . import band
+from . import cache
+from . import compact
+from . import crawler
+from . import export
+from . import index
+from . import metrics
+from . import ratelimit
+from . import sync
+from . import table
+from . import transport
+from .cache import get_conditional_headers, get_validators
+from .commons import loads
+from .singleflight import AsyncSingleFlight, SingleFlight
+from .transport import AsyncPooledTransport, FileTransport, PooledTransport, Timings
+
+
+__all__ = ['Api', 'AsyncApi', 'track', 'url', 'album', 'band', 'cache', 'compact', 'crawler', 'export', 'index',
+           'metrics', 'ratelimit', 'sync', 'table', 'transport']
+
+DEFAULT_MAX_WORKERS = 8
 
+# Sent with every request, the transports decompress the responses
+DEFAULT_HEADERS = {'Accept-Encoding': 'gzip, deflate'}
 
-__all__ = ['Api', 'track', 'url', 'album', 'band']
+# Timings of responses from transports that do not measure them
+NO_TIMINGS = Timings(dns=0.0, connect=0.0, wait=0.0, transfer=0.0)
 
-# TODO: Reimplement the old caching mechanism
 # TODO: Check the docstrings and improve them as they are currently
 #       just copied from the bandcamp site ;)
 
 
+def _check_api_error(obj):
+    """Raise the error of an API response, only the top level keys are looked at"""
+    if 'error' in obj or 'error_message' in obj:
+        raise ValueError(obj.get('error_message', None) or 'API returned an error')
+
+    return obj
+
+
+class _StreamedBody(object):
+    """Readable file object that counts the bytes of a streamed body and calls on_close once it is closed"""
+
+    def __init__(self, body, on_close):
+        self._body = body
+        self._on_close = on_close
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self._body.read(size)
+        self.size += len(data)
+
+        return data
+
+    def close(self):
+        if self._on_close is None:
+            return
+
+        on_close, self._on_close = self._on_close, None
+        self._body.close()
+        on_close(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 class Api(object):
-    def __init__(self, api_key):
+    def __init__(self, api_key, cache=None, transport=None, max_workers=DEFAULT_MAX_WORKERS, rate_limiter=None,
+                 models=None, band_index=None, hooks=None, json_loads=loads):
+        """Create an Api object
+
+        Parameters:
+            api_key your Bandcamp developer key.
+            cache an optional cache (see bandcamp.cache) that answers repeated requests.
+            transport the bandcamp.transport.Transport that sends the requests,
+            defaults to a PooledTransport that keeps connections alive.
+            max_workers the maximum number of concurrent requests of a batch call.
+            rate_limiter an optional bandcamp.ratelimit.RateLimiter, share one between all Api objects
+            that use the same api key.
+            models a mapping of model classes like bandcamp.track.Track to the factories that should be
+            used instead, for example bandcamp.compact.models().
+            band_index an optional bandcamp.index.BandIndex that remembers fetched bands and answers
+            repeated searches without a request.
+            hooks callables that get a bandcamp.metrics.RequestRecord for every request,
+            for example a bandcamp.metrics.Metrics object.
+            json_loads the function that decodes the bytes of a response, defaults to orjson if it is installed
+            and to the json module otherwise.
+        """
+        if transport is None:
+            transport = PooledTransport()
+
         self._api_key = api_key
+        self.cache = cache
+        self.transport = transport
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter
+        self.models = models or {}
+        self.band_index = band_index
+        self.hooks = list(hooks or ())
+        self.json_loads = json_loads
+        self.headers = dict(DEFAULT_HEADERS)
+
+        # Identical requests that are in flight at the same time are only sent once
+        self._flights = self._create_flights()
+
+    @staticmethod
+    def _create_flights():
+        return SingleFlight()
 
     def get_encoded_url(self, url, parameters=None):
         """Encode a url"""
@@ -42,30 +145,340 @@ class Api(object):
 
         return url
 
+    def model_factory(self, model):
+        """Return the factory that creates the objects of a model class"""
+        return self.models.get(model, model)
+
+    def request(self, url, parameters, handler):
+        """Make a request to the Bandcamp API and return what handler makes of the decoded response
+
+        The module level functions only go through this method, so they work with both Api and AsyncApi.
+        """
+        return handler(self.make_api_request(url=url, parameters=parameters))
+
+    def request_many(self, url, parameters, handler, return_exceptions=False, max_workers=None):
+        """Make several requests concurrently and return what handler makes of the list of responses
+
+        parameters is a list with the parameters of each request, the responses have the same order.
+        With return_exceptions=True a failed request puts its exception into the list instead of raising it.
+        """
+        responses = [None] * len(parameters)
+
+        for index, response in self.iter_requests(url=url, parameters=parameters, max_workers=max_workers):
+            if isinstance(response, Exception) and not return_exceptions:
+                raise response
+
+            responses[index] = response
+
+        return handler(responses)
+
+    def iter_requests(self, url, parameters, handler=None, max_workers=None):
+        """Make several requests concurrently and yield the results in the order they complete
+
+        Yields handler(index, response) for every request, where index is the position of its parameters
+        and response is the decoded response or the exception of a failed request.
+        Without a handler (index, response) pairs are yielded.
+        """
+        max_workers = min(max_workers or self.max_workers, len(parameters)) or 1
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        try:
+            futures = {executor.submit(self.make_api_request, url=url, parameters=_parameters): index
+                       for index, _parameters in enumerate(parameters)}
+
+            for future in as_completed(futures):
+                try:
+                    response = future.result()
+                except Exception as e:
+                    response = e
+
+                if handler is None:
+                    yield futures[future], response
+                else:
+                    yield handler(futures[future], response)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def make_api_request(self, url, parameters=None):
         """Make a request to the Bandcamp API"""
         encoded_url = self.get_encoded_url(url=url, parameters=parameters)
 
-        # TODO: Remove later :-)
-        print(encoded_url)
+        if self.cache is not None:
+            obj = self.cache.get(encoded_url)
+            if obj is not None:
+                self._emit(encoded_url=encoded_url, cache_hit=True)
+                return obj
+
+        return self._flights.do(encoded_url, lambda: self._fetch(encoded_url=encoded_url))
+
+    def _fetch(self, encoded_url):
+        """Send a request over the transport and process the response"""
+        started = time.perf_counter()
+        headers, stale = self._get_request_headers(encoded_url)
+        attempts = 0
+        throttle_wait = 0.0
+        while True:
+            if self.rate_limiter is not None:
+                throttle_wait += self.rate_limiter.acquire()
+
+            try:
+                response = self.transport.request(encoded_url, headers=headers)
+            except Exception as e:
+                self._record_error(encoded_url=encoded_url, started=started, attempts=attempts + 1,
+                                   throttle_wait=throttle_wait, error=e)
+                raise
+
+            if self._should_retry(response=response, attempts=attempts):
+                attempts += 1
+                continue
+
+            return self._complete(encoded_url=encoded_url, response=response, started=started, attempts=attempts + 1,
+                                  throttle_wait=throttle_wait, stale=stale)
+
+    def _get_request_headers(self, encoded_url):
+        """Return the headers of a request and the expired cache entry they revalidate or None"""
+        stale = None if self.cache is None else self.cache.get_stale(encoded_url)
+        if stale is None:
+            return self.headers, None
+
+        headers = dict(self.headers)
+        headers.update(get_conditional_headers(stale[1]))
+
+        return headers, stale
+
+    def _complete(self, encoded_url, response, started, attempts, throttle_wait=0.0, stale=None):
+        """Decode a response, store it in the cache and tell the hooks about the request
+
+        A 304 Not Modified answer to a revalidation refreshes the stale cache entry and returns it.
+        """
+        if response.status == 304 and stale is not None:
+            self.cache.refresh(encoded_url, validators=get_validators(response.headers))
+            self._emit(encoded_url=encoded_url, response=response, started=started, attempts=attempts,
+                       throttle_wait=throttle_wait)
+            return stale[0]
+
+        parse_started = time.perf_counter()
+        try:
+            obj = self.decode_response(response)
+        except Exception as e:
+            self._emit(encoded_url=encoded_url, response=response, parse=time.perf_counter() - parse_started,
+                       started=started, attempts=attempts, throttle_wait=throttle_wait, error=e)
+            raise
+
+        parse = time.perf_counter() - parse_started
+
+        if self.cache is not None:
+            self.cache.set(encoded_url, obj, validators=get_validators(response.headers))
+
+        self._emit(encoded_url=encoded_url, response=response, parse=parse, started=started, attempts=attempts,
+                   throttle_wait=throttle_wait)
+
+        return obj
+
+    def _record_error(self, encoded_url, started, attempts, throttle_wait, error):
+        """Tell the rate limiter and the hooks about a request that failed without a response"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.record_error()
+
+        self._emit(encoded_url=encoded_url, started=started, attempts=attempts, throttle_wait=throttle_wait,
+                   error=error)
+
+    def _emit(self, encoded_url, response=None, cache_hit=False, parse=0.0, started=None, attempts=0,
+              throttle_wait=0.0, error=None, response_bytes=None, encoded_bytes=None):
+        """Call the hooks with the RequestRecord of a request
+
+        The sizes are taken from the response unless they are given, a streamed body is not in memory.
+        """
+        if not self.hooks:
+            return
+
+        timings = getattr(response, 'timings', None) or NO_TIMINGS
+
+        if response_bytes is None:
+            response_bytes = 0 if response is None else len(response.body)
+        if encoded_bytes is None:
+            encoded_bytes = getattr(response, 'encoded_size', None) or response_bytes
+        record = metrics.RequestRecord(endpoint=metrics.get_endpoint(encoded_url),
+                                       batch_size=metrics.get_batch_size(encoded_url),
+                                       status=None if response is None else response.status,
+                                       cache_hit=cache_hit,
+                                       response_bytes=response_bytes, encoded_bytes=encoded_bytes,
+                                       dns=timings.dns, connect=timings.connect, wait=timings.wait,
+                                       transfer=timings.transfer, parse=parse,
+                                       total=0.0 if started is None else time.perf_counter() - started,
+                                       attempts=attempts, throttle_wait=throttle_wait,
+                                       error=None if error is None else type(error).__name__)
+
+        for hook in self.hooks:
+            hook(record)
+
+    def _should_retry(self, response, attempts):
+        """Tell the rate limiter about a response and decide if the request has to be sent again"""
+        if self.rate_limiter is None:
+            return False
+
+        throttled = self.rate_limiter.record(response)
+
+        return throttled and attempts < self.rate_limiter.retries
+
+    def stream_api_request(self, url, parameters=None):
+        """Make a request to the Bandcamp API and return the body as a readable file object
+
+        The body is not cached, decoded or checked for API errors. The caller has to close it, the hooks are
+        called with the RequestRecord of the request once it has been closed.
+        """
+        encoded_url = self.get_encoded_url(url=url, parameters=parameters)
+
+        started = time.perf_counter()
+        attempts = 0
+        throttle_wait = 0.0
+        while True:
+            if self.rate_limiter is not None:
+                throttle_wait += self.rate_limiter.acquire()
+
+            try:
+                response = self.transport.open(encoded_url, headers=self.headers)
+            except Exception as e:
+                self._record_error(encoded_url=encoded_url, started=started, attempts=attempts + 1,
+                                   throttle_wait=throttle_wait, error=e)
+                raise
+
+            if self._should_retry(response=response, attempts=attempts):
+                response.body.close()
+                attempts += 1
+                continue
+
+            if response.status != 200:
+                response.body.close()
+                error = ValueError('HTTP status %d returned when querying API' % response.status)
+                self._emit(encoded_url=encoded_url, response=response, started=started, attempts=attempts + 1,
+                           throttle_wait=throttle_wait, error=error, response_bytes=0)
+                raise error
+
+            def on_close(body, response=response, attempts=attempts + 1):
+                self._emit(encoded_url=encoded_url, response=response, started=started, attempts=attempts,
+                           throttle_wait=throttle_wait, response_bytes=body.size,
+                           encoded_bytes=getattr(response.body, 'encoded_size', None) or body.size)
 
-        f = urlopen(encoded_url)
-        if f.code != 200:
-            raise ValueError('HTTP status %d returned when querying API' % f.code)
+            return _StreamedBody(response.body, on_close=on_close)
 
-        content = f.read().decode('utf-8')
+    def decode_response(self, response):
+        """Check a transport response and return its decoded body"""
+        if response.status != 200:
+            raise ValueError('HTTP status %d returned when querying API' % response.status)
 
-        return self.process_json_string(content)
+        return _check_api_error(self.json_loads(response.body))
 
     @staticmethod
     def process_json_string(content):
-        """Process a given json content and return a dictionary"""
-        obj = json.loads(content)
+        """Process a given json content and return a dictionary
 
-        if 'error' in obj or 'error_message' in obj:
-            raise ValueError(obj['error_message'])
+        content can be a string, bytes or a memoryview.
+        """
+        return _check_api_error(loads(content))
 
-        return obj
+    def close(self):
+        """Close the connections held by the transport"""
+        self.transport.close()
+
+
+class AsyncApi(Api):
+    """Api object for asyncio applications
+
+    Works like Api, but requests are sent with an async transport and the module level functions
+    return awaitables instead of results.
+    """
+
+    def __init__(self, api_key, cache=None, transport=None, max_workers=DEFAULT_MAX_WORKERS, rate_limiter=None,
+                 models=None, band_index=None, hooks=None, json_loads=loads):
+        if transport is None:
+            transport = AsyncPooledTransport()
+
+        super().__init__(api_key=api_key, cache=cache, transport=transport, max_workers=max_workers,
+                         rate_limiter=rate_limiter, models=models, band_index=band_index,
+                         hooks=hooks, json_loads=json_loads)
+
+    @staticmethod
+    def _create_flights():
+        return AsyncSingleFlight()
+
+    async def request(self, url, parameters, handler):
+        return handler(await self.make_api_request(url=url, parameters=parameters))
+
+    async def request_many(self, url, parameters, handler, return_exceptions=False, max_workers=None):
+        semaphore = asyncio.Semaphore(max_workers or self.max_workers)
+
+        async def _request(_parameters):
+            async with semaphore:
+                return await self.make_api_request(url=url, parameters=_parameters)
+
+        responses = await asyncio.gather(*(_request(_parameters) for _parameters in parameters),
+                                         return_exceptions=return_exceptions)
+
+        return handler(responses)
+
+    async def iter_requests(self, url, parameters, handler=None, max_workers=None):
+        semaphore = asyncio.Semaphore(max_workers or self.max_workers)
+
+        async def _request(index, _parameters):
+            async with semaphore:
+                try:
+                    return index, await self.make_api_request(url=url, parameters=_parameters)
+                except Exception as e:
+                    return index, e
+
+        tasks = [asyncio.ensure_future(_request(index, _parameters)) for index, _parameters in enumerate(parameters)]
+
+        try:
+            for task in asyncio.as_completed(tasks):
+                index, response = await task
+
+                if handler is None:
+                    yield index, response
+                else:
+                    yield handler(index, response)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def make_api_request(self, url, parameters=None):
+        """Make a request to the Bandcamp API"""
+        encoded_url = self.get_encoded_url(url=url, parameters=parameters)
+
+        if self.cache is not None:
+            obj = self.cache.get(encoded_url)
+            if obj is not None:
+                self._emit(encoded_url=encoded_url, cache_hit=True)
+                return obj
+
+        return await self._flights.do(encoded_url, lambda: self._fetch(encoded_url=encoded_url))
+
+    async def _fetch(self, encoded_url):
+        started = time.perf_counter()
+        headers, stale = self._get_request_headers(encoded_url)
+        attempts = 0
+        throttle_wait = 0.0
+        while True:
+            if self.rate_limiter is not None:
+                throttle_wait += await self.rate_limiter.acquire_async()
+
+            try:
+                response = await self.transport.request(encoded_url, headers=headers)
+            except Exception as e:
+                self._record_error(encoded_url=encoded_url, started=started, attempts=attempts + 1,
+                                   throttle_wait=throttle_wait, error=e)
+                raise
+
+            if self._should_retry(response=response, attempts=attempts):
+                attempts += 1
+                continue
+
+            return self._complete(encoded_url=encoded_url, response=response, started=started, attempts=attempts + 1,
+                                  throttle_wait=throttle_wait, stale=stale)
+
+    async def close(self):
+        """Close the connections held by the transport"""
+        await self.transport.close()
 
 
 class TestApi(Api):
@@ -79,8 +492,4 @@ class TestApi(Api):
         self.file_path = os.path.join(self.JSON_DIR, response_file_name)
         self.encoding = encoding
 
-    def make_api_request(self, *args, **kwargs):
-        with open(self.file_path, encoding=self.encoding) as f:
-            content = f.read()
-
-        return super().process_json_string(content=content)
\ No newline at end of file
+        super().__init__(api_key=None, transport=FileTransport(file_path=self.file_path, encoding=encoding))
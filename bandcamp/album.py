@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 """The Bandcamp Album module"""
+import functools
 import time
+from collections.abc import Sequence
 
 from .commons import DownloadableStates, integer
 from .track import Track
 
 __version__ = 2
-__all__ = ['info']
+__all__ = ['info', 'info_many', 'iter_info']
 
 BASE_URL_INFO = 'http://api.bandcamp.com/api/album/%d/info' % __version__
 
@@ -18,14 +20,107 @@ def info(api, album_id):
 
     parameters = {'album_id': album_id}
 
-    response = api.make_api_request(url=BASE_URL_INFO, parameters=parameters)
+    handler = functools.partial(_get_album_from_response, album_factory=api.model_factory(Album))
 
-    return Album(album_body=response)
+    return api.request(url=BASE_URL_INFO, parameters=parameters, handler=handler)
+
+
+def info_many(api, album_ids, max_workers=None, partial=False):
+    """Returns information about several albums, mapping the album ids to Album instances
+
+    The albums are fetched concurrently with at most max_workers requests at a time.
+    With partial=True albums that could not be fetched are left out instead of raising the error.
+    """
+    album_ids = [int(album_id) for album_id in album_ids]
+    parameters = [{'album_id': str(album_id)} for album_id in album_ids]
+    handler = functools.partial(_get_albums_from_responses, album_ids=album_ids,
+                                album_factory=api.model_factory(Album))
+
+    return api.request_many(url=BASE_URL_INFO, parameters=parameters, handler=handler, return_exceptions=partial,
+                            max_workers=max_workers)
+
+
+def iter_info(api, album_ids, max_workers=None):
+    """Fetch several albums concurrently and yield (album_id, Album) pairs in the order they complete
+
+    An album that could not be fetched yields its exception instead of an Album, the others are still fetched.
+    With an AsyncApi object this is an async generator.
+    """
+    album_ids = [int(album_id) for album_id in album_ids]
+    parameters = [{'album_id': str(album_id)} for album_id in album_ids]
+    handler = functools.partial(_get_album_item_from_response, album_ids=album_ids,
+                                album_factory=api.model_factory(Album))
+
+    return api.iter_requests(url=BASE_URL_INFO, parameters=parameters, handler=handler, max_workers=max_workers)
+
+
+def _get_albums_from_responses(responses, album_ids, album_factory):
+    """Get a mapping of album ids to Albums from the responses of info_many, skipping failed requests"""
+    return {album_id: album_factory(album_body=response) for album_id, response in zip(album_ids, responses)
+            if not isinstance(response, Exception)}
+
+
+def _get_album_item_from_response(index, response, album_ids, album_factory):
+    """Get a (album_id, Album) pair from a response of iter_info, passing exceptions on"""
+    if isinstance(response, Exception):
+        return album_ids[index], response
+
+    return album_ids[index], album_factory(album_body=response)
+
+
+def _get_album_from_response(response, album_factory):
+    """Get a Album from a API response"""
+    return album_factory(album_body=response)
+
+
+class TrackList(Sequence):
+    """The tracks of an album, every Track is created the first time it is accessed and then reused"""
+
+    def __init__(self, track_bodies, track_factory=Track):
+        self._track_bodies = track_bodies
+        self._track_factory = track_factory
+        self._tracks = [None] * len(track_bodies)
+
+        self._positions_by_id = None
+        self._positions_by_number = None
+
+    def __len__(self):
+        return len(self._track_bodies)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[_index] for _index in range(*index.indices(len(self)))]
+
+        track = self._tracks[index]
+        if track is None:
+            track = self._tracks[index] = self._track_factory(track_body=self._track_bodies[index])
+
+        return track
+
+    def by_id(self, track_id):
+        """Return the track with the given track id, raises KeyError if it is not on the album"""
+        if self._positions_by_id is None:
+            self._positions_by_id = self._index('track_id')
+
+        return self[self._positions_by_id[int(track_id)]]
+
+    def by_number(self, number):
+        """Return the track with the given track number, raises KeyError if there is none"""
+        if self._positions_by_number is None:
+            self._positions_by_number = self._index('number')
+
+        return self[self._positions_by_number[int(number)]]
+
+    def _index(self, key):
+        """Map the values of key to the positions of the tracks without creating any Track"""
+        return {int(track_body[key]): position for position, track_body in enumerate(self._track_bodies)
+                if track_body.get(key, None) is not None}
 
 
 class Album(object):
     def __init__(self, album_body):
         self.album_body = album_body
+        self._tracks = None
 
     @property
     def title(self):
@@ -56,8 +151,14 @@ class Album(object):
 
     @property
     def tracks(self):
-        """array of tracks, the info for each track is the same as you get from the track/info function."""
-        return [Track(track_body=track_body) for track_body in self.album_body.get('tracks')]
+        """array of tracks, the info for each track is the same as you get from the track/info function.
+
+        A TrackList, which creates the Track objects on demand and can look them up by track id or number.
+        """
+        if self._tracks is None:
+            self._tracks = TrackList(track_bodies=self.album_body.get('tracks', None) or [])
+
+        return self._tracks
 
     @property
     def about(self):
@@ -1,63 +1,200 @@
 # -*- coding: utf-8 -*-
 """The Bandcamp Band module"""
+import functools
+import inspect
 import time
 from collections import namedtuple
+from contextlib import closing
 
-from .commons import integer, DownloadableStates
+from . import album, track
+from .commons import integer, DownloadableStates, merge_batches, split_ids
+from .index import fold_name
+from .jsonstream import iter_discography_entries
 
 
 __version__ = 3
-__all__ = ['info']
+__all__ = ['info', 'search', 'search_many', 'discography', 'iter_discography']
 
 BASE_URL_INFO = 'http://api.bandcamp.com/api/band/%d/info' % __version__
 BASE_URL_SEARCH = 'http://api.bandcamp.com/api/band/%d/search' % __version__
 BASE_URL_DISCOGRAPHY = 'http://api.bandcamp.com/api/band/%d/discography' % __version__
 
-Discography = namedtuple('Discography', 'albums tracks')
+MAX_SEARCH_NAMES = 12
 
 
-def info(api, band_id):
+def _is_async(api):
+    return inspect.iscoroutinefunction(api.make_api_request)
+
+
+def _hydrate(item, api, fetch):
+    """Return the result of fetch() and keep it on the item, with an AsyncApi an awaitable of it"""
+    if _is_async(api):
+        return _hydrate_async(item, fetch)
+
+    if item._hydrated is None:
+        item._hydrated = fetch()
+
+    return item._hydrated
+
+
+async def _hydrate_async(item, fetch):
+    # The awaited result is kept, a coroutine can only be awaited once
+    if item._hydrated is None:
+        item._hydrated = await fetch()
+
+    return item._hydrated
+
+
+class Discography(namedtuple('Discography', 'albums tracks')):
+    __slots__ = ()
+
+    def hydrate_all(self, api, max_workers=None):
+        """Fetch the full Album and Track of every item and return them as a Discography
+
+        Tracks are fetched with batched track.info calls and albums concurrently with album.info_many.
+        Items that were hydrated before are not fetched again. This only works with an Api object, not an AsyncApi.
+        """
+        if _is_async(api):
+            raise TypeError('hydrate_all does not support an AsyncApi, await the hydrate() of every item instead')
+
+        track_ids = [item.track_id for item in self.tracks.values() if item._hydrated is None]
+        album_ids = [item.album_id for item in self.albums.values() if item._hydrated is None]
+
+        if track_ids:
+            tracks = track.info(api=api, track_id=track_ids)
+            if not isinstance(tracks, dict):
+                tracks = {track_ids[0]: tracks}
+
+            for item in self.tracks.values():
+                if item._hydrated is None:
+                    item._hydrated = tracks.get(item.track_id, None)
+
+        if album_ids:
+            albums = album.info_many(api=api, album_ids=album_ids, max_workers=max_workers)
+
+            for item in self.albums.values():
+                if item._hydrated is None:
+                    item._hydrated = albums.get(item.album_id, None)
+
+        return Discography(albums={album_id: item._hydrated for album_id, item in self.albums.items()},
+                           tracks={track_id: item._hydrated for track_id, item in self.tracks.items()})
+
+
+def info(api, band_id, partial=False):
     """Returns information about a band
 
     This call can be used in batch mode, where you can specify multiple band ids separated by commas.
     The info for all the bands is fetched in one call and returned to you in a hash, mapping the band ids
     to Band instances.
-    """
-    if isinstance(band_id, int):
-        band_id = str(band_id)
 
-    if not isinstance(band_id, str):
-        band_id = ','.join((str(_band_id) for _band_id in band_id))
+    Too many ids for a single call are split into batches that are fetched concurrently and merged.
+    With partial=True the bands of the successful batches are returned even if some of them failed,
+    the result is then always a hash, even for a single id.
+    """
+    batches = split_ids(band_id)
+    handler = functools.partial(_get_bands_from_response, band_factory=api.model_factory(Band))
 
-    parameters = {'band_id': band_id}
+    if api.band_index is not None:
+        handler = functools.partial(_index_bands, handler=handler, band_index=api.band_index)
 
-    response = api.make_api_request(url=BASE_URL_INFO, parameters=parameters)
+    if len(batches) == 1 and not partial:
+        parameters = {'band_id': batches[0]}
+        return api.request(url=BASE_URL_INFO, parameters=parameters, handler=handler)
 
-    if 'band_id' in response:
-        return Band(band_body=response)
+    parameters = [{'band_id': batch} for batch in batches]
+    handler = functools.partial(merge_batches, batches=batches, handler=handler)
 
-    return {int(band_id): Band(band_body=band_body) for band_id, band_body in response.items()}
+    return api.request_many(url=BASE_URL_INFO, parameters=parameters, handler=handler, return_exceptions=partial)
 
 
-def search(api, name):
+def search(api, name, partial=False):
     """Searches for bands by name. The names must match exactly, except that case is ignored.
 
     You can search for more than one name at a time by separating the URL-encoded names with commas.
     There’s a limit of 12 names in a single request.
+
+    More than 12 names are split into several requests that are sent concurrently, in that case the
+    result is always a mapping of band ids to Band instances, even if only one band was found.
+    With partial=True the bands of the successful requests are returned even if some of them failed,
+    the result is then always a mapping of band ids to Band instances.
+
+    If the Api object has a band_index, names that were searched for before are answered from it
+    and only the other names are sent to Bandcamp.
+    """
+    batches = _split_names(name)
+    band_factory = api.model_factory(Band)
+
+    if api.band_index is not None:
+        known, unresolved_batches = _lookup_names(band_index=api.band_index, batches=batches)
+        parameters = [{'name': ','.join(batch)} for batch in unresolved_batches]
+        handler = functools.partial(_get_indexed_search_results, single=len(batches) == 1,
+                                    batches=unresolved_batches, known=known, band_factory=band_factory,
+                                    band_index=api.band_index)
+
+        return api.request_many(url=BASE_URL_SEARCH, parameters=parameters, handler=handler,
+                                return_exceptions=partial)
+
+    if len(batches) == 1 and not partial:
+        parameters = {'name': ','.join(batches[0])}
+        handler = functools.partial(_get_search_results_from_response, band_factory=band_factory)
+        return api.request(url=BASE_URL_SEARCH, parameters=parameters, handler=handler)
+
+    parameters = [{'name': ','.join(batch)} for batch in batches]
+    handler = functools.partial(_merge_search_results, band_factory=band_factory)
+
+    return api.request_many(url=BASE_URL_SEARCH, parameters=parameters, handler=handler, return_exceptions=partial)
+
+
+def search_many(api, name, partial=False):
+    """Searches for bands by name and maps every name to the bands it matched
+
+    Returns a hash mapping each name to a hash of band ids to Band instances, which is empty if nothing matched.
+    With partial=True names of failed requests are left out instead of raising the error.
+    Names a band_index of the Api object knows are not sent to Bandcamp.
     """
-    if not isinstance(name, str):
-        name = ','.join((str(_name) for _name in name))
+    batches = _split_names(name)
+
+    if api.band_index is not None:
+        known, batches = _lookup_names(band_index=api.band_index, batches=batches)
+        handler = functools.partial(_get_indexed_search_matches, batches=batches, known=known,
+                                    band_factory=api.model_factory(Band), band_index=api.band_index)
+    else:
+        handler = functools.partial(_get_search_matches_from_responses, batches=batches,
+                                    band_factory=api.model_factory(Band))
 
-    parameters = {'name': name}
+    parameters = [{'name': ','.join(batch)} for batch in batches]
 
-    response = api.make_api_request(url=BASE_URL_SEARCH, parameters=parameters)['results']
-    if len(response) == 1:
-        return Band(band_body=response[0])
+    return api.request_many(url=BASE_URL_SEARCH, parameters=parameters, handler=handler, return_exceptions=partial)
+
+
+def _split_names(name):
+    """Split one or more names into batches of at most MAX_SEARCH_NAMES names"""
+    if isinstance(name, str):
+        names = name.split(',')
+    else:
+        names = [str(_name) for _name in name]
 
-    return {int(result['band_id']): Band(band_body=result) for result in (result for result in response)}
+    return [names[index:index + MAX_SEARCH_NAMES] for index in range(0, len(names), MAX_SEARCH_NAMES)] or [[]]
 
 
-def discography(api, band_id):
+def _lookup_names(band_index, batches):
+    """Return the matches the index knows for the names and the batches of names it does not know"""
+    known = {}
+    unresolved = []
+
+    for batch in batches:
+        for name in batch:
+            bands = band_index.lookup(name)
+            if bands is not None:
+                known[name] = bands
+            elif name not in unresolved:
+                unresolved.append(name)
+
+    return known, [unresolved[index:index + MAX_SEARCH_NAMES]
+                   for index in range(0, len(unresolved), MAX_SEARCH_NAMES)]
+
+
+def discography(api, band_id, partial=False):
     """Returns a band’s discography.
 
     This is the “top level” discography, meaning all of the band’s albums and tracks that aren’t on an album.
@@ -76,46 +213,167 @@ def discography(api, band_id):
     and then make an additional band or track info call when an item is selected.
 
     You can tell if an item’s a track or an album by the existence of a track_id or album_id property.
+
+    Too many ids for a single call are split into batches that are fetched concurrently and merged.
+    With partial=True the discographies of the successful batches are returned even if some of them failed,
+    the result is then always a hash, even for a single id.
     """
-    if isinstance(band_id, int):
-        band_id = str(band_id)
+    batches = split_ids(band_id)
+    handler = functools.partial(_get_discographies_from_response,
+                                album_factory=api.model_factory(DiscographyAlbum),
+                                track_factory=api.model_factory(DiscographyTrack))
 
-    if not isinstance(band_id, str):
-        band_id = ','.join((str(_band_id) for _band_id in band_id))
+    if len(batches) == 1 and not partial:
+        parameters = {'band_id': batches[0]}
+        return api.request(url=BASE_URL_DISCOGRAPHY, parameters=parameters, handler=handler)
 
-    parameters = {'band_id': band_id}
+    parameters = [{'band_id': batch} for batch in batches]
+    handler = functools.partial(merge_batches, batches=batches, handler=handler)
 
-    response = api.make_api_request(url=BASE_URL_DISCOGRAPHY, parameters=parameters)
+    return api.request_many(url=BASE_URL_DISCOGRAPHY, parameters=parameters, handler=handler,
+                            return_exceptions=partial)
 
+
+def iter_discography(api, band_id):
+    """Yields (band_id, item) pairs of the discographies of one or more bands while the response is downloaded
+
+    Unlike discography, the response is parsed incrementally and every DiscographyAlbum or DiscographyTrack
+    is yielded as soon as it has been decoded, so the memory usage does not grow with the number of bands.
+    Batches are requested one after the other. This only works with an Api object, not an AsyncApi.
+    """
+    album_factory = api.model_factory(DiscographyAlbum)
+    track_factory = api.model_factory(DiscographyTrack)
+
+    for batch in split_ids(band_id):
+        parameters = {'band_id': batch}
+
+        with closing(api.stream_api_request(url=BASE_URL_DISCOGRAPHY, parameters=parameters)) as body:
+            for _band_id, entry in iter_discography_entries(body):
+                if _band_id is None:
+                    # The response of a single band does not contain its id
+                    _band_id = int(batch)
+
+                yield _band_id, _get_discography_item(entry, album_factory=album_factory,
+                                                      track_factory=track_factory)
+
+
+def _get_bands_from_response(response, band_factory):
+    """Get a Band or a mapping of band ids to Bands from a API response"""
+    if 'band_id' in response:
+        return band_factory(band_body=response)
+
+    return {int(band_id): band_factory(band_body=band_body) for band_id, band_body in response.items()}
+
+
+def _get_search_results_from_response(response, band_factory):
+    """Get a Band or a mapping of band ids to Bands from a search response"""
+    results = response['results']
+    if len(results) == 1:
+        return band_factory(band_body=results[0])
+
+    return {int(result['band_id']): band_factory(band_body=result) for result in results}
+
+
+def _merge_search_results(responses, band_factory):
+    """Get a mapping of band ids to Bands from several search responses, skipping failed requests"""
+    return {int(result['band_id']): band_factory(band_body=result)
+            for response in responses if not isinstance(response, Exception)
+            for result in response['results']}
+
+
+def _get_search_matches_from_responses(responses, batches, band_factory):
+    """Map every searched name to the Bands whose name matches it"""
+    matches = {}
+
+    for response, names in zip(responses, batches):
+        if isinstance(response, Exception):
+            continue
+
+        bands = [band_factory(band_body=result) for result in response['results']]
+        for name in names:
+            folded_name = fold_name(name)
+            matches[name] = {band.band_id: band for band in bands if fold_name(band.name) == folded_name}
+
+    return matches
+
+
+def _get_indexed_search_matches(responses, batches, known, band_factory, band_index):
+    """Like _get_search_matches_from_responses, but stores the matches in the index and adds the known ones"""
+    matches = _get_search_matches_from_responses(responses=responses, batches=batches, band_factory=band_factory)
+
+    for name, bands in matches.items():
+        band_index.add_search(name, bands.values())
+
+    matches.update(known)
+
+    return matches
+
+
+def _get_indexed_search_results(responses, single, **kwargs):
+    """Get the result of search from the matches of every name"""
+    bands = {}
+    for matches in _get_indexed_search_matches(responses, **kwargs).values():
+        bands.update(matches)
+
+    if single and len(bands) == 1:
+        return next(iter(bands.values()))
+
+    return bands
+
+
+def _index_bands(response, handler, band_index):
+    """Add the bands handler gets from a response to the index"""
+    result = handler(response)
+
+    for band in (result.values() if isinstance(result, dict) else [result]):
+        band_index.add(band)
+
+    return result
+
+
+def _get_discographies_from_response(response, album_factory, track_factory):
+    """Get a Discography or a mapping of band ids to Discographies from a API response"""
     # Only fetched a single
     if 'discography' in response:
-        return _get_discography_from_response(response=response)
+        return _get_discography_from_response(response=response, album_factory=album_factory,
+                                              track_factory=track_factory)
 
     else:
         discographies = {}
 
         for band_id, content in response.items():
-            discographies[int(band_id)] = _get_discography_from_response(response=content)
+            discographies[int(band_id)] = _get_discography_from_response(response=content,
+                                                                         album_factory=album_factory,
+                                                                         track_factory=track_factory)
 
         return discographies
 
 
-def _get_discography_from_response(response):
+def _get_discography_from_response(response, album_factory, track_factory):
     """Get a Discography tuple from a API response"""
     albums = {}
     tracks = {}
 
     for entry in response['discography']:
+        item = _get_discography_item(entry, album_factory=album_factory, track_factory=track_factory)
         if 'album_id' in entry:
-            albums[entry['album_id']] = DiscographyAlbum(entry)
-        elif 'track_id' in entry:
-            tracks[entry['track_id']] = DiscographyTrack(entry)
+            albums[entry['album_id']] = item
         else:
-            raise ValueError(entry)
+            tracks[entry['track_id']] = item
 
     return Discography(albums=albums, tracks=tracks)
 
 
+def _get_discography_item(entry, album_factory, track_factory):
+    """Get a DiscographyAlbum or DiscographyTrack from an entry of a discography"""
+    if 'album_id' in entry:
+        return album_factory(album_body=entry)
+    elif 'track_id' in entry:
+        return track_factory(track_body=entry)
+
+    raise ValueError(entry)
+
+
 class Band(object):
     def __init__(self, band_body):
         self.band_body = band_body
@@ -150,6 +408,14 @@ class Band(object):
 class DiscographyAlbum(object):
     def __init__(self, album_body):
         self.album_body = album_body
+        self._hydrated = None
+
+    def hydrate(self, api):
+        """Return the full Album of this item, it is only fetched with album.info the first time
+
+        With an AsyncApi the result has to be awaited.
+        """
+        return _hydrate(self, api, lambda: album.info(api=api, album_id=self.album_id))
 
     @property
     @integer
@@ -209,6 +475,14 @@ class DiscographyAlbum(object):
 class DiscographyTrack(object):
     def __init__(self, track_body):
         self.track_body = track_body
+        self._hydrated = None
+
+    def hydrate(self, api):
+        """Return the full Track of this item, it is only fetched with track.info the first time
+
+        With an AsyncApi the result has to be awaited.
+        """
+        return _hydrate(self, api, lambda: track.info(api=api, track_id=self.track_id))
 
     @property
     def title(self):
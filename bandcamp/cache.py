@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""Response caches for the Api object
+
+A cache is keyed on the encoded url of a request, so the same lookup with the same parameters
+is only sent to Bandcamp once per time to live.
+
+Responses with an ETag or Last-Modified header keep these validators. Once such an entry expires it is kept
+for stale_ttl more seconds, the Api object then revalidates it with If-None-Match/If-Modified-Since and
+a 304 Not Modified answer refreshes the entry without downloading or decoding the body again.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlsplit
+
+from . import album, band, track, url
+from .commons import loads, normalize_request_url
+
+__all__ = ['MemoryCache', 'SQLiteCache', 'Validators']
+
+DEFAULT_TTL = 60 * 60
+DEFAULT_STALE_TTL = 7 * 24 * 60 * 60
+DEFAULT_MAX_SIZE = 4096
+DEFAULT_COMPACTION_INTERVAL = 5 * 60
+
+# Band info barely changes, discographies change whenever something gets released
+DEFAULT_ENDPOINT_TTLS = {
+    band.BASE_URL_INFO: 24 * 60 * 60,
+    band.BASE_URL_SEARCH: 24 * 60 * 60,
+    band.BASE_URL_DISCOGRAPHY: 60 * 60,
+    album.BASE_URL_INFO: 6 * 60 * 60,
+    track.BASE_URL_INFO: 6 * 60 * 60,
+    url.BASE_URL_INFO: 24 * 60 * 60,
+}
+
+# The ETag and Last-Modified headers of a cached response, either can be None
+Validators = namedtuple('Validators', 'etag last_modified')
+
+
+def get_validators(headers):
+    """Return the Validators of response headers or None if there is neither an ETag nor a Last-Modified header"""
+    values = {name.lower(): value for name, value in headers.items()}
+    validators = Validators(etag=values.get('etag', None), last_modified=values.get('last-modified', None))
+
+    return None if validators == (None, None) else validators
+
+
+def get_conditional_headers(validators):
+    """Return the request headers that ask the server whether a response with validators changed"""
+    headers = {}
+    if validators.etag is not None:
+        headers['If-None-Match'] = validators.etag
+    if validators.last_modified is not None:
+        headers['If-Modified-Since'] = validators.last_modified
+
+    return headers
+
+
+class BaseCache(object):
+    """Logic shared by all caches: time to live lookup and hit/miss counters
+
+    Parameters:
+        stale_ttl the number of seconds an expired entry with validators is kept for revalidation.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, endpoint_ttls=None, stale_ttl=DEFAULT_STALE_TTL, clock=time.time):
+        if endpoint_ttls is None:
+            endpoint_ttls = DEFAULT_ENDPOINT_TTLS
+
+        self.ttl = ttl
+        self.endpoint_ttls = {urlsplit(endpoint).path: _ttl for endpoint, _ttl in endpoint_ttls.items()}
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def get_ttl(self, key):
+        """Return the time to live in seconds for the endpoint the key belongs to"""
+        return self.endpoint_ttls.get(urlsplit(key).path, self.ttl)
+
+    def get(self, key):
+        """Return the cached response for key or None"""
+        raise NotImplementedError
+
+    def set(self, key, value, validators=None):
+        """Store a response and the Validators of its headers under key"""
+        raise NotImplementedError
+
+    def get_stale(self, key):
+        """Return (response, Validators) of an entry that can be revalidated or None
+
+        Only called after get missed, so the entry is expired unless another process just refreshed it.
+        """
+        return None
+
+    def refresh(self, key, validators=None):
+        """Start the time to live of an entry again after the server answered 304 Not Modified
+
+        validators replace the stored ones if the server sent new ones.
+        """
+
+
+class MemoryCache(BaseCache):
+    """In-memory cache with a bounded size and least recently used eviction
+
+    Stores the decoded responses, so a hit costs a dictionary lookup and no parsing.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.max_size = max_size
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                value, expires, validators = entry
+                now = self.clock()
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                if validators is None or expires + self.stale_ttl <= now:
+                    del self._entries[key]
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value, validators=None):
+        expires = self.clock() + self.get_ttl(key)
+
+        with self._lock:
+            self._entries[key] = (value, expires, validators)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_stale(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[2] is None or entry[1] + self.stale_ttl <= self.clock():
+                return None
+
+            return entry[0], entry[2]
+
+    def refresh(self, key, validators=None):
+        expires = self.clock() + self.get_ttl(key)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+
+            self._entries[key] = (entry[0], expires, validators or entry[2])
+            self._entries.move_to_end(key)
+            self.revalidations += 1
+
+    def clear(self):
+        """Remove all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.revalidations = 0
+
+
+class SQLiteCache(BaseCache):
+    """Persistent cache that stores the JSON bodies in a local SQLite file
+
+    The file can be shared by several processes on the same host, so a restarted worker starts warm.
+    Entries are keyed by endpoint and the normalized parameters (sorted, without the api key).
+    Expired rows are purged by a background thread every compaction_interval seconds,
+    pass None to disable it and call compact() yourself. Rows with validators are purged stale_ttl seconds later.
+    """
+    SCHEMA = ('CREATE TABLE IF NOT EXISTS responses ('
+              'endpoint TEXT NOT NULL, '
+              'parameters TEXT NOT NULL, '
+              'body TEXT NOT NULL, '
+              'expires REAL NOT NULL, '
+              'etag TEXT, '
+              'last_modified TEXT, '
+              'PRIMARY KEY (endpoint, parameters))')
+
+    def __init__(self, path, compaction_interval=DEFAULT_COMPACTION_INTERVAL, timeout=30, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._stopped = threading.Event()
+        # Guards the counters, the connections are per thread
+        self._lock = threading.Lock()
+
+        connection = self._get_connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        with connection:
+            connection.execute(self.SCHEMA)
+            connection.execute('CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires)')
+
+            # Files written before validators were stored lack their columns
+            columns = {row[1] for row in connection.execute('PRAGMA table_info(responses)')}
+            for column in ('etag', 'last_modified'):
+                if column not in columns:
+                    connection.execute('ALTER TABLE responses ADD COLUMN %s TEXT' % column)
+
+        self._compactor = None
+        if compaction_interval is not None:
+            self._compactor = threading.Thread(target=self._compact_periodically, args=(compaction_interval,),
+                                               name='bandcamp-cache-compaction', daemon=True)
+            self._compactor.start()
+
+    @staticmethod
+    def split_key(key):
+        """Split an encoded url into the endpoint and its normalized parameters"""
+        return normalize_request_url(key)
+
+    def _get_connection(self):
+        """Return the connection of the current thread, sqlite3 connections can not be shared"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+
+        return connection
+
+    def get(self, key):
+        endpoint, parameters = self.split_key(key)
+
+        row = self._get_connection().execute(
+            'SELECT body FROM responses WHERE endpoint = ? AND parameters = ? AND expires > ?',
+            (endpoint, parameters, self.clock())).fetchone()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+        return loads(row[0])
+
+    def set(self, key, value, validators=None):
+        endpoint, parameters = self.split_key(key)
+        expires = self.clock() + self.get_ttl(key)
+        etag, last_modified = validators or (None, None)
+
+        connection = self._get_connection()
+        with connection:
+            connection.execute('INSERT OR REPLACE INTO responses (endpoint, parameters, body, expires, etag, '
+                               'last_modified) VALUES (?, ?, ?, ?, ?, ?)',
+                               (endpoint, parameters, json.dumps(value), expires, etag, last_modified))
+
+    def get_stale(self, key):
+        endpoint, parameters = self.split_key(key)
+
+        row = self._get_connection().execute(
+            'SELECT body, etag, last_modified FROM responses WHERE endpoint = ? AND parameters = ? AND expires > ? '
+            'AND (etag IS NOT NULL OR last_modified IS NOT NULL)',
+            (endpoint, parameters, self.clock() - self.stale_ttl)).fetchone()
+
+        if row is None:
+            return None
+
+        return loads(row[0]), Validators(etag=row[1], last_modified=row[2])
+
+    def refresh(self, key, validators=None):
+        endpoint, parameters = self.split_key(key)
+        expires = self.clock() + self.get_ttl(key)
+
+        connection = self._get_connection()
+        with connection:
+            if validators is None:
+                cursor = connection.execute('UPDATE responses SET expires = ? WHERE endpoint = ? AND parameters = ?',
+                                            (expires, endpoint, parameters))
+            else:
+                cursor = connection.execute('UPDATE responses SET expires = ?, etag = ?, last_modified = ? '
+                                            'WHERE endpoint = ? AND parameters = ?',
+                                            (expires, validators.etag, validators.last_modified, endpoint,
+                                             parameters))
+
+        if cursor.rowcount:
+            with self._lock:
+                self.revalidations += 1
+
+    def compact(self):
+        """Delete all expired rows that can not be revalidated anymore and return how many were removed"""
+        now = self.clock()
+
+        connection = self._get_connection()
+        with connection:
+            cursor = connection.execute('DELETE FROM responses WHERE expires <= ? AND (expires <= ? OR '
+                                        '(etag IS NULL AND last_modified IS NULL))', (now, now - self.stale_ttl))
+
+        return cursor.rowcount
+
+    def _close_connection(self):
+        """Close the connection of the current thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _compact_periodically(self, interval):
+        try:
+            while not self._stopped.wait(interval):
+                try:
+                    self.compact()
+                except sqlite3.OperationalError:
+                    # The database is busy with another process, try again next time
+                    pass
+        finally:
+            self._close_connection()
+
+    def close(self):
+        """Stop the compaction thread and close the connection of the current thread"""
+        self._stopped.set()
+        if self._compactor is not None and self._compactor is not threading.current_thread():
+            self._compactor.join()
+
+        self._close_connection()
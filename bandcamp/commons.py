@@ -1,8 +1,18 @@
 # -*- coding: utf-8 -*-
 import enum
 import functools
+import json
+from urllib.parse import parse_qsl, urlencode, urlsplit
 
-__all__ = ['DownloadableStates', 'integer']
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+__all__ = ['DownloadableStates', 'integer', 'split_ids', 'merge_batches', 'loads', 'normalize_request_url']
+
+# The maximum number of characters of comma separated ids sent in one request
+MAX_BATCH_LENGTH = 1500
 
 
 class DownloadableStates(enum.Enum):
@@ -12,6 +22,21 @@ class DownloadableStates(enum.Enum):
     NOT_FOR_SALE = None
 
 
+def loads(data):
+    """Decode JSON from bytes, a memoryview or a string
+
+    orjson is used if it is installed, it parses bytes directly without decoding them into a string first.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+
+    # json detects the encoding of bytes itself
+    return json.loads(data)
+
+
 def integer(func):
     @functools.wraps(func)
     def converter(*args, **kwargs):
@@ -21,4 +46,69 @@ def integer(func):
 
         return arg
 
-    return converter
\ No newline at end of file
+    return converter
+
+
+def split_ids(ids, max_length=MAX_BATCH_LENGTH):
+    """Split one or more ids into comma separated batches that keep the request url short enough
+
+    ids can be a number, a comma separated string or an iterable of numbers or strings.
+    """
+    if isinstance(ids, int):
+        ids = str(ids)
+
+    if isinstance(ids, str):
+        ids = ids.split(',')
+
+    batches = []
+    batch = []
+    length = 0
+
+    for _id in ids:
+        _id = str(_id)
+        if batch and length + len(_id) + 1 > max_length:
+            batches.append(','.join(batch))
+            batch = []
+            length = 0
+
+        batch.append(_id)
+        length += len(_id) + 1
+
+    if batch:
+        batches.append(','.join(batch))
+
+    return batches
+
+
+def merge_batches(responses, batches, handler):
+    """Merge the responses to several batch requests into one mapping of ids to objects
+
+    handler turns a response into an object or a mapping of ids to objects, just like for a single request.
+    A response that is an exception (a failed batch) is skipped.
+    """
+    merged = {}
+
+    for response, batch in zip(responses, batches):
+        if isinstance(response, Exception):
+            continue
+
+        result = handler(response)
+        if not isinstance(result, dict):
+            # A batch of a single id is answered like a single request
+            result = {int(batch): result}
+
+        merged.update(result)
+
+    return merged
+
+
+def normalize_request_url(url):
+    """Split a request url into the endpoint and its parameters sorted and without the api key
+
+    Caches and archives key their entries on it, so the same request matches whatever the api key is.
+    """
+    parts = urlsplit(url)
+    endpoint = '%s://%s%s' % (parts.scheme, parts.netloc, parts.path)
+    parameters = sorted((name, value) for name, value in parse_qsl(parts.query) if name != 'key')
+
+    return endpoint, urlencode(parameters, safe=',')
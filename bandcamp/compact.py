@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Compact model classes
+
+The compact classes have the same attributes as Track, Album, Band, DiscographyAlbum and DiscographyTrack,
+but use __slots__ and decode every field once when they are created instead of on every access.
+The raw response is only kept if keep_body is set.
+
+Example code:
+    >>> api = bandcamp.Api(api_key='your-secret-api-key', models=bandcamp.compact.models())
+    >>> track = bandcamp.track.info(api=api, track_id=1269403107)
+    >>> isinstance(track, bandcamp.compact.CompactTrack)
+    True
+"""
+import functools
+import time
+
+from .album import Album
+from .band import Band, DiscographyAlbum, DiscographyTrack
+from .commons import DownloadableStates
+from .track import Track
+
+__all__ = ['CompactTrack', 'CompactTrackList', 'CompactAlbum', 'CompactBand', 'CompactDiscographyAlbum',
+           'CompactDiscographyTrack', 'models']
+
+
+def _integer(value):
+    if value is not None:
+        value = int(value)
+
+    return value
+
+
+def _timestamp(value):
+    if value is not None:
+        value = time.localtime(value)
+
+    return value
+
+
+def _text(value):
+    return value
+
+
+TRACK_FIELDS = (('title', _text), ('number', _integer), ('duration', _text), ('release_date', _timestamp),
+                ('downloadable', DownloadableStates), ('url', _text), ('streaming_url', _text),
+                ('lyrics', _text), ('about', _text), ('credits', _text), ('small_art_url', _text),
+                ('large_art_url', _text), ('artist', _text), ('track_id', _integer), ('album_id', _integer),
+                ('band_id', _integer))
+
+ALBUM_FIELDS = (('title', _text), ('release_date', _timestamp), ('downloadable', DownloadableStates),
+                ('url', _text), ('about', _text), ('credits', _text), ('small_art_url', _text),
+                ('large_art_url', _text), ('artist', _text), ('album_id', _integer), ('band_id', _integer))
+
+DISCOGRAPHY_ALBUM_FIELDS = (('album_id', _integer), ('band_id', _integer), ('title', _text),
+                            ('release_date', _timestamp), ('downloadable', DownloadableStates), ('url', _text),
+                            ('small_art_url', _text), ('large_art_url', _text), ('artist', _text))
+
+BAND_FIELDS = (('band_id', _integer), ('name', _text), ('subdomain', _text), ('url', _text),
+               ('offsite_url', _text))
+
+
+class _CompactModel(object):
+    """Decodes the fields of a response into slots"""
+    __slots__ = ()
+    FIELDS = ()
+
+    def _decode(self, body):
+        for name, converter in self.FIELDS:
+            setattr(self, name, converter(body.get(name, None)))
+
+
+class CompactTrack(_CompactModel):
+    __slots__ = tuple(name for name, _ in TRACK_FIELDS) + ('track_body',)
+    FIELDS = TRACK_FIELDS
+
+    def __init__(self, track_body, keep_body=False):
+        self._decode(track_body)
+        self.track_body = track_body if keep_body else None
+
+
+class CompactDiscographyTrack(CompactTrack):
+    __slots__ = ('_hydrated',)
+
+    def __init__(self, track_body, keep_body=False):
+        super().__init__(track_body=track_body, keep_body=keep_body)
+        self._hydrated = None
+
+    hydrate = DiscographyTrack.hydrate
+
+
+class CompactTrackList(tuple):
+    """The CompactTracks of an album with the lookups of album.TrackList
+
+    The tracks are created up front, so there are no bodies to index and the lookups scan the few tracks.
+    """
+    __slots__ = ()
+
+    def by_id(self, track_id):
+        """Return the track with the given track id, raises KeyError if it is not on the album"""
+        return self._find('track_id', int(track_id))
+
+    def by_number(self, number):
+        """Return the track with the given track number, raises KeyError if there is none"""
+        return self._find('number', int(number))
+
+    def _find(self, name, value):
+        for track in self:
+            if getattr(track, name) == value:
+                return track
+
+        raise KeyError(value)
+
+
+class CompactAlbum(_CompactModel):
+    __slots__ = tuple(name for name, _ in ALBUM_FIELDS) + ('tracks', 'album_body')
+    FIELDS = ALBUM_FIELDS
+
+    def __init__(self, album_body, keep_body=False):
+        self._decode(album_body)
+        self.tracks = CompactTrackList(CompactTrack(track_body=track_body, keep_body=keep_body)
+                                       for track_body in album_body.get('tracks', ()))
+        self.album_body = album_body if keep_body else None
+
+
+class CompactDiscographyAlbum(_CompactModel):
+    __slots__ = tuple(name for name, _ in DISCOGRAPHY_ALBUM_FIELDS) + ('album_body', '_hydrated')
+    FIELDS = DISCOGRAPHY_ALBUM_FIELDS
+
+    def __init__(self, album_body, keep_body=False):
+        self._decode(album_body)
+        self.album_body = album_body if keep_body else None
+        self._hydrated = None
+
+    hydrate = DiscographyAlbum.hydrate
+
+
+class CompactBand(_CompactModel):
+    __slots__ = tuple(name for name, _ in BAND_FIELDS) + ('band_body',)
+    FIELDS = BAND_FIELDS
+
+    def __init__(self, band_body, keep_body=False):
+        self._decode(band_body)
+        self.band_body = band_body if keep_body else None
+
+
+def models(keep_body=False):
+    """Return the models argument for an Api object that makes it create compact objects"""
+    return {
+        Track: functools.partial(CompactTrack, keep_body=keep_body),
+        Album: functools.partial(CompactAlbum, keep_body=keep_body),
+        Band: functools.partial(CompactBand, keep_body=keep_body),
+        DiscographyAlbum: functools.partial(CompactDiscographyAlbum, keep_body=keep_body),
+        DiscographyTrack: functools.partial(CompactDiscographyTrack, keep_body=keep_body),
+    }
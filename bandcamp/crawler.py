@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""Crawling of whole catalogs
+
+Example code:
+    >>> crawler = bandcamp.crawler.Crawler(api=api, checkpoint_path='crawl.json')
+    >>> for item in crawler.crawl(seeds=[3463798201, 'cults.bandcamp.com']):
+    ...     store(item)
+
+The crawler walks every band through band.info and band.discography, then fetches the albums with album.info
+and the tracks that are not on an album with track.info. It yields the Band, Album and Track objects as they
+arrive. After every step the progress is written to the checkpoint file, so an interrupted crawl started
+with the same file continues where it stopped. Items of a step that was interrupted are fetched again.
+The checkpoint file only holds the queues, the crawled and failed ids are appended to the files next to it
+that end in .done and .failed, so a checkpoint does not get slower as the crawl grows.
+A batch that fails as a whole is split in halves that are tried again, so only the ids that can not be
+fetched on their own end up as failed.
+"""
+import json
+import os
+import time
+from collections import namedtuple
+
+from . import album, band, track, url
+
+__all__ = ['Crawler', 'CrawlStats']
+
+DEFAULT_BAND_BATCH_SIZE = 50
+DEFAULT_ALBUM_BATCH_SIZE = 100
+DEFAULT_TRACK_BATCH_SIZE = 500
+
+CrawlStats = namedtuple('CrawlStats', 'bands albums tracks errors elapsed items_per_second '
+                                      'pending_bands pending_albums pending_tracks last_error')
+
+QUEUES = ('bands', 'albums', 'tracks')
+
+
+def _fetch_batch(fetch, batch, on_error):
+    """Return what fetch(batch) returns for a list of ids, a batch without any result is retried in halves
+
+    on_error is called with the exceptions of failed requests.
+    """
+    try:
+        result = fetch(batch)
+    except Exception as e:
+        on_error(e)
+        result = {}
+
+    if result or len(batch) == 1:
+        return result
+
+    middle = len(batch) // 2
+    result = _fetch_batch(fetch, batch[:middle], on_error)
+    result.update(_fetch_batch(fetch, batch[middle:], on_error))
+
+    return result
+
+
+class Crawler(object):
+    """Crawls the catalog of a set of bands with bounded concurrency and checkpointing
+
+    Parameters:
+        api the Api object used for all requests.
+        checkpoint_path the file the progress is stored in, None disables checkpointing.
+        max_workers the maximum number of concurrent album requests, defaults to the one of api.
+        on_progress called with a CrawlStats tuple after every step.
+    """
+
+    def __init__(self, api, checkpoint_path=None, max_workers=None, on_progress=None,
+                 band_batch_size=DEFAULT_BAND_BATCH_SIZE, album_batch_size=DEFAULT_ALBUM_BATCH_SIZE,
+                 track_batch_size=DEFAULT_TRACK_BATCH_SIZE, clock=time.monotonic):
+        self.api = api
+        self.checkpoint_path = checkpoint_path
+        self.max_workers = max_workers
+        self.on_progress = on_progress
+        self.band_batch_size = band_batch_size
+        self.album_batch_size = album_batch_size
+        self.track_batch_size = track_batch_size
+        self.clock = clock
+
+        self.pending = {queue: [] for queue in QUEUES}
+        self.done = {queue: set() for queue in QUEUES}
+        self.failed = {queue: set() for queue in QUEUES}
+        self.errors = 0
+        self.last_error = None
+
+        self._counts = {queue: 0 for queue in QUEUES}
+        self._started = None
+
+        # (queue, id) pairs that were finished since the last checkpoint
+        self._unsaved = {'done': [], 'failed': []}
+        self._log_mode = 'w'
+
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            self.load_checkpoint()
+
+    def _get_log_path(self, kind):
+        return '%s.%s' % (self.checkpoint_path, kind)
+
+    def load_checkpoint(self):
+        """Restore the progress of an earlier crawl from the checkpoint file and its logs"""
+        with open(self.checkpoint_path, encoding='utf-8') as f:
+            state = json.load(f)
+
+        for queue in QUEUES:
+            self.pending[queue] = state['pending'][queue]
+            # Checkpoints of older versions hold the ids themselves
+            self.done[queue] = set(state.get('done', {}).get(queue, ()))
+            self.failed[queue] = set(state.get('failed', {}).get(queue, ()))
+
+        for kind, ids in (('done', self.done), ('failed', self.failed)):
+            if not os.path.exists(self._get_log_path(kind)):
+                continue
+
+            with open(self._get_log_path(kind), encoding='utf-8') as f:
+                for line in f:
+                    # A line without a newline was cut off by a crash
+                    if line.endswith('\n'):
+                        queue, _id = line.split()
+                        ids[queue].add(int(_id))
+
+        # Ids that were logged after the checkpoint was written are not fetched again
+        for queue in QUEUES:
+            finished = self.done[queue] | self.failed[queue]
+            self.pending[queue] = [_id for _id in self.pending[queue] if _id not in finished]
+
+        self.errors = state['errors']
+        self._log_mode = 'a'
+
+    def save_checkpoint(self):
+        """Write the progress to the checkpoint file, the old file stays intact until the new one is complete
+
+        The ids that were finished since the last checkpoint are appended to the logs first.
+        """
+        if self.checkpoint_path is None:
+            return
+
+        for kind, entries in self._unsaved.items():
+            with open(self._get_log_path(kind), self._log_mode, encoding='utf-8') as f:
+                f.writelines('%s %d\n' % entry for entry in entries)
+
+            del entries[:]
+
+        self._log_mode = 'a'
+
+        state = {
+            'pending': self.pending,
+            'errors': self.errors,
+        }
+
+        temporary_path = self.checkpoint_path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+
+        os.replace(temporary_path, self.checkpoint_path)
+
+    @property
+    def stats(self):
+        """The progress of the current crawl as CrawlStats"""
+        elapsed = self.clock() - self._started if self._started is not None else 0.0
+        items = sum(self._counts.values())
+
+        return CrawlStats(bands=self._counts['bands'], albums=self._counts['albums'], tracks=self._counts['tracks'],
+                          errors=self.errors, elapsed=elapsed, items_per_second=items / elapsed if elapsed else 0.0,
+                          pending_bands=len(self.pending['bands']), pending_albums=len(self.pending['albums']),
+                          pending_tracks=len(self.pending['tracks']), last_error=self.last_error)
+
+    def add(self, queue, ids):
+        """Queue ids that were neither crawled nor queued before"""
+        pending = self.pending[queue]
+        known = self.done[queue] | self.failed[queue] | set(pending)
+
+        for _id in ids:
+            _id = int(_id)
+            if _id not in known:
+                pending.append(_id)
+                known.add(_id)
+
+    def crawl(self, seeds=()):
+        """Crawl the seeds and everything below them and yield the Band, Album and Track objects
+
+        seeds are band ids or Bandcamp URLs of bands, albums or tracks, which are resolved with url.info.
+        """
+        self._started = self.clock()
+
+        band_ids = [seed for seed in seeds if isinstance(seed, int)]
+        self.add('bands', band_ids + self._resolve_urls([seed for seed in seeds if not isinstance(seed, int)]))
+        self.save_checkpoint()
+
+        while any(self.pending.values()):
+            if self.pending['bands']:
+                yield from self._crawl_bands()
+            elif self.pending['albums']:
+                yield from self._crawl_albums()
+            else:
+                yield from self._crawl_tracks()
+
+            self.save_checkpoint()
+
+            if self.on_progress is not None:
+                self.on_progress(self.stats)
+
+    def _resolve_urls(self, urls):
+        """Resolve seed URLs to band ids concurrently"""
+        parameters = [{'url': _url} for _url in urls]
+        band_ids = []
+
+        for index, response in self.api.iter_requests(url=url.BASE_URL_INFO, parameters=parameters,
+                                                      max_workers=self.max_workers):
+            if isinstance(response, Exception) or response.get('band_id', None) is None:
+                self.errors += 1
+                if isinstance(response, Exception):
+                    self.last_error = response
+            else:
+                band_ids.append(int(response['band_id']))
+
+        return band_ids
+
+    def _keep_error(self, error):
+        """Keep the exception of a failed request, the ids it failed for are counted by _finish"""
+        self.last_error = error
+
+    def _finish(self, queue, batch, succeeded):
+        """Move a batch out of its queue and remember which ids succeeded or failed"""
+        del self.pending[queue][:len(batch)]
+
+        succeeded = set(succeeded)
+        for _id in batch:
+            if _id in succeeded:
+                kind = 'done'
+                self.done[queue].add(_id)
+            else:
+                kind = 'failed'
+                self.failed[queue].add(_id)
+                self.errors += 1
+
+            if self.checkpoint_path is not None:
+                self._unsaved[kind].append((queue, _id))
+
+    def _crawl_bands(self):
+        batch = self.pending['bands'][:self.band_batch_size]
+
+        bands = _fetch_batch(lambda ids: band.info(api=self.api, band_id=ids, partial=True), batch,
+                             self._keep_error)
+        discographies = _fetch_batch(lambda ids: band.discography(api=self.api, band_id=ids, partial=True), batch,
+                                     self._keep_error)
+
+        for _band in bands.values():
+            self._counts['bands'] += 1
+            yield _band
+
+        for discography in discographies.values():
+            self.add('albums', discography.albums)
+            self.add('tracks', discography.tracks)
+
+        self._finish('bands', batch, set(bands) & set(discographies))
+
+    def _crawl_albums(self):
+        batch = self.pending['albums'][:self.album_batch_size]
+        succeeded = []
+
+        try:
+            for album_id, _album in album.iter_info(api=self.api, album_ids=batch, max_workers=self.max_workers):
+                if isinstance(_album, Exception):
+                    self._keep_error(_album)
+                    continue
+
+                succeeded.append(album_id)
+                self._counts['albums'] += 1
+                yield _album
+
+                for _track in _album.tracks:
+                    self._counts['tracks'] += 1
+                    yield _track
+        except Exception as e:
+            # The albums that were not yielded yet are recorded as failed by _finish
+            self.errors += 1
+            self.last_error = e
+
+        self._finish('albums', batch, succeeded)
+
+    def _crawl_tracks(self):
+        batch = self.pending['tracks'][:self.track_batch_size]
+
+        tracks = _fetch_batch(lambda ids: track.info(api=self.api, track_id=ids, partial=True), batch,
+                              self._keep_error)
+        for _track in tracks.values():
+            self._counts['tracks'] += 1
+            yield _track
+
+        self._finish('tracks', batch, tracks)
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""Streaming export of bands, albums and tracks to JSONL, CSV and Parquet
+
+Every object becomes one row of the same flat schema, the 'kind' column tells which model it came from.
+Rows are buffered in groups of row_group_size and written group by group, so the memory used stays the same
+no matter how many objects are exported.
+
+Example code:
+    >>> with bandcamp.export.Exporter('catalog.csv.gz') as exporter:
+    ...     for item in crawler.crawl(seeds=seeds):
+    ...         exporter.write(item)
+
+    >>> bandcamp.export.export(crawler.crawl(seeds=seeds), 'catalog.parquet', compression='zstd')
+
+Parquet files are written with pyarrow, which has to be installed separately.
+"""
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import time
+
+from .album import Album
+from .band import Band, DiscographyAlbum, DiscographyTrack
+from .compact import CompactAlbum, CompactBand, CompactDiscographyAlbum, CompactDiscographyTrack, CompactTrack
+from .track import Track
+
+__all__ = ['Exporter', 'export', 'COLUMNS']
+
+DEFAULT_ROW_GROUP_SIZE = 10000
+
+COLUMNS = ('kind', 'band_id', 'album_id', 'track_id', 'title', 'name', 'subdomain', 'artist', 'number',
+           'duration', 'release_date', 'downloadable', 'url', 'streaming_url', 'small_art_url', 'large_art_url',
+           'offsite_url', 'about', 'credits', 'lyrics')
+
+# Columns that are not text, the parquet schema is built from this
+INTEGER_COLUMNS = {'band_id', 'album_id', 'track_id', 'number', 'release_date', 'downloadable'}
+FLOAT_COLUMNS = {'duration'}
+
+# Discography classes come first, CompactDiscographyTrack is a subclass of CompactTrack
+KINDS = (
+    ('discography_album', (DiscographyAlbum, CompactDiscographyAlbum), 'album_body'),
+    ('discography_track', (DiscographyTrack, CompactDiscographyTrack), 'track_body'),
+    ('album', (Album, CompactAlbum), 'album_body'),
+    ('track', (Track, CompactTrack), 'track_body'),
+    ('band', (Band, CompactBand), 'band_body'),
+)
+
+TEXT_COMPRESSIONS = {
+    'gzip': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open,
+}
+
+EXTENSIONS = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+}
+
+_kinds_by_type = {}
+
+
+def _get_kind(item):
+    """Return the kind and the name of the response attribute of a model object"""
+    item_type = type(item)
+
+    try:
+        return _kinds_by_type[item_type]
+    except KeyError:
+        pass
+
+    for kind, classes, body_name in KINDS:
+        if issubclass(item_type, classes):
+            _kinds_by_type[item_type] = kind, body_name
+            return kind, body_name
+
+    raise ValueError('Can not export objects of type %s' % item_type.__name__)
+
+
+def get_row(item):
+    """Return the values of all COLUMNS for a Band, Album, Track or discography object"""
+    kind, body_name = _get_kind(item)
+    body = getattr(item, body_name, None)
+
+    if body is not None:
+        # Reading the response directly skips building struct_time and enum values only to undo it
+        row = [kind]
+        for column in COLUMNS[1:]:
+            value = body.get(column, None)
+            if value is not None and column in INTEGER_COLUMNS:
+                value = int(value)
+
+            row.append(value)
+
+        return tuple(row)
+
+    row = [kind]
+    for column in COLUMNS[1:]:
+        value = getattr(item, column, None)
+
+        if column == 'release_date' and value is not None:
+            value = int(time.mktime(value))
+        elif column == 'downloadable' and value is not None:
+            value = value.value
+
+        row.append(value)
+
+    return tuple(row)
+
+
+def _guess_format(path):
+    """Return the format and compression of a file name like catalog.jsonl.gz"""
+    compression = None
+    for extension, name in EXTENSIONS.items():
+        if path.endswith(extension):
+            compression = name
+            path = path[:-len(extension)]
+
+    for name in ('jsonl', 'csv', 'parquet'):
+        if path.endswith('.' + name):
+            return name, compression
+
+    raise ValueError('Can not guess the export format of %s' % path)
+
+
+class _JsonLinesWriter(object):
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def write_rows(self, rows):
+        encode = self.encoder.encode
+        self.fileobj.write(''.join(encode(dict(zip(COLUMNS, row))) + '\n' for row in rows))
+
+    def close(self):
+        self.fileobj.close()
+
+
+class _CsvWriter(object):
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.writer = csv.writer(fileobj)
+        self.writer.writerow(COLUMNS)
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.fileobj.close()
+
+
+class _ParquetWriter(object):
+    def __init__(self, path, compression):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Exporting to parquet requires pyarrow')
+
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([(column, self._get_type(column)) for column in COLUMNS])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression=compression or 'none')
+
+    def _get_type(self, column):
+        if column in INTEGER_COLUMNS:
+            return self.pyarrow.int64()
+        elif column in FLOAT_COLUMNS:
+            return self.pyarrow.float64()
+
+        return self.pyarrow.string()
+
+    def write_rows(self, rows):
+        # Every call becomes one row group
+        columns = [self.pyarrow.array(values, type=field.type) for values, field in zip(zip(*rows), self.schema)]
+        self.writer.write_table(self.pyarrow.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class Exporter(object):
+    """Writes model objects to a file as rows of a flat schema
+
+    Parameters:
+        path the file to write to.
+        format 'jsonl', 'csv' or 'parquet', guessed from the file name if None.
+        compression 'gzip', 'bz2' or 'xz' for jsonl and csv, any codec pyarrow knows for parquet.
+            Guessed from the file name if None.
+        row_group_size the number of rows buffered before they are written.
+    """
+
+    def __init__(self, path, format=None, compression=None, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        if format is None:
+            format, guessed_compression = _guess_format(path)
+            compression = compression or guessed_compression
+
+        self.path = path
+        self.format = format
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.rows_written = 0
+
+        self._rows = []
+        self._writer = self._open()
+
+    def _open(self):
+        if self.format == 'parquet':
+            return _ParquetWriter(self.path, compression=self.compression)
+
+        if self.format not in ('jsonl', 'csv'):
+            raise ValueError('Unknown export format %s' % self.format)
+
+        if self.compression is None:
+            fileobj = open(self.path, 'w', encoding='utf-8', newline='')
+        elif self.compression in TEXT_COMPRESSIONS:
+            fileobj = TEXT_COMPRESSIONS[self.compression](self.path, 'wt', encoding='utf-8', newline='')
+        else:
+            raise ValueError('Unknown compression %s' % self.compression)
+
+        if self.format == 'jsonl':
+            return _JsonLinesWriter(fileobj)
+
+        return _CsvWriter(fileobj)
+
+    def write(self, item):
+        """Add one Band, Album, Track or discography object"""
+        self._rows.append(get_row(item))
+
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+
+    def write_many(self, items):
+        for item in items:
+            self.write(item)
+
+    def flush(self):
+        """Write the buffered rows"""
+        if self._rows:
+            self._writer.write_rows(self._rows)
+            self.rows_written += len(self._rows)
+            self._rows = []
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def export(items, path, format=None, compression=None, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """Write all items to path and return the number of rows written, see Exporter for the parameters"""
+    with Exporter(path, format=format, compression=compression, row_group_size=row_group_size) as exporter:
+        exporter.write_many(items)
+
+    return exporter.rows_written
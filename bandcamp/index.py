@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""A local index of the bands an Api object has seen
+
+Example code:
+    >>> api = bandcamp.Api(api_key='your-secret-api-key', band_index=bandcamp.index.BandIndex())
+    >>> band = bandcamp.band.search(api=api, name='Cults')
+    >>> band = bandcamp.band.search(api=api, name='cults')  # answered from the index
+
+Every Band returned by band.info, band.search and band.search_many is added to the index.
+Only names that were searched for are answered from it: a band seen through band.info proves that its name
+exists, but not that it is the only band with that name.
+"""
+import threading
+import time
+
+__all__ = ['BandIndex']
+
+DEFAULT_TTL = 24 * 60 * 60
+
+
+def fold_name(name):
+    """Return the form of a band name that search compares, names match except for case"""
+    return (name or '').strip().casefold()
+
+
+class BandIndex(object):
+    """Bands by id, case folded name and subdomain
+
+    Parameters:
+        ttl the number of seconds the result of a search is trusted, None keeps it forever.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+
+        self._bands = {}
+        self._names = {}
+        self._subdomains = {}
+        self._searched = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._bands)
+
+    def add(self, band):
+        """Add or replace a band"""
+        with self._lock:
+            self._add(band)
+
+    def _add(self, band):
+        old_band = self._bands.get(band.band_id, None)
+        if old_band is not None:
+            self._names.get(fold_name(old_band.name), {}).pop(band.band_id, None)
+
+        self._bands[band.band_id] = band
+        self._names.setdefault(fold_name(band.name), {})[band.band_id] = band
+
+        if band.subdomain:
+            self._subdomains[band.subdomain.casefold()] = band
+
+    def add_search(self, name, bands):
+        """Add the bands a search found for name, which is then answered by lookup"""
+        with self._lock:
+            for band in bands:
+                self._add(band)
+
+            self._searched[fold_name(name)] = self.clock()
+
+    def get(self, band_id):
+        """Return the Band with band_id or None"""
+        return self._bands.get(int(band_id), None)
+
+    def by_subdomain(self, subdomain):
+        """Return the Band with a subdomain like 'cults' or None"""
+        return self._subdomains.get(subdomain.casefold(), None)
+
+    def lookup(self, name):
+        """Return a mapping of band ids to the Bands named name or None if the name was never searched for
+
+        An empty mapping means a search for the name found nothing.
+        """
+        folded_name = fold_name(name)
+
+        with self._lock:
+            searched = self._searched.get(folded_name, None)
+            if searched is None or (self.ttl is not None and self.clock() - searched > self.ttl):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return dict(self._names.get(folded_name, {}))
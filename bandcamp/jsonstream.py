@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""Incremental parsing of discography responses
+
+The body is read in chunks and every discography entry is yielded as soon as it has been decoded,
+so only the entry that is being decoded has to be held in memory.
+"""
+import codecs
+import json
+
+__all__ = ['iter_discography_entries']
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+
+class _Scanner(object):
+    """Reads a JSON document from a file object piece by piece"""
+
+    def __init__(self, fileobj, chunk_size):
+        self._fileobj = fileobj
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+
+        self._buffer = ''
+        self._position = 0
+        self._eof = False
+
+    def _fill(self):
+        """Read the next chunk into the buffer, return False at the end of the body"""
+        if self._eof:
+            return False
+
+        data = self._fileobj.read(self._chunk_size)
+        if not data:
+            self._eof = True
+            self._buffer += self._decoder.decode(b'', final=True)
+            return False
+
+        # Drop everything that has been consumed already, this keeps the memory usage flat
+        self._buffer = self._buffer[self._position:] + self._decoder.decode(data)
+        self._position = 0
+
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, or '' at the end of the body"""
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in WHITESPACE:
+                self._position += 1
+
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+
+            if not self._fill():
+                return ''
+
+    def expect(self, characters):
+        """Consume the next character, which has to be one of characters, and return it"""
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError('Expected one of %r at position %d, got %r' % (characters, self._position, character))
+
+        self._position += 1
+
+        return character
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+
+            # A number at the end of the buffer might continue in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+
+            self._position = end
+
+            return value
+
+
+def iter_discography_entries(fileobj, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (band_id, entry) pairs from the body of a discography response
+
+    band_id is None for the response of a single band, entry is the decoded dictionary of an album or track.
+    """
+    scanner = _Scanner(fileobj=fileobj, chunk_size=chunk_size)
+    scanner.expect('{')
+
+    for key in _iter_keys(scanner):
+        if key == 'discography':
+            yield from ((None, entry) for entry in _iter_array(scanner))
+
+        elif key == 'error_message':
+            raise ValueError(scanner.value())
+
+        elif key.isdigit() and scanner.peek() == '{':
+            scanner.expect('{')
+
+            for inner_key in _iter_keys(scanner):
+                if inner_key == 'discography':
+                    band_id = int(key)
+                    yield from ((band_id, entry) for entry in _iter_array(scanner))
+                else:
+                    scanner.value()
+
+        else:
+            scanner.value()
+
+
+def _iter_keys(scanner):
+    """Yield the keys of an object whose opening brace has been consumed, the caller consumes the values"""
+    if scanner.peek() == '}':
+        scanner.expect('}')
+        return
+
+    while True:
+        key = scanner.value()
+        scanner.expect(':')
+
+        yield key
+
+        if scanner.expect(',}') == '}':
+            return
+
+
+def _iter_array(scanner):
+    """Yield the items of an array one by one"""
+    scanner.expect('[')
+
+    if scanner.peek() == ']':
+        scanner.expect(']')
+        return
+
+    while True:
+        yield scanner.value()
+
+        if scanner.expect(',]') == ']':
+            return
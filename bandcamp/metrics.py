@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Instrumentation of the requests of an Api object
+
+Every hook of an Api object is called with a RequestRecord for each request that was answered by the cache
+or sent to Bandcamp. Metrics is a hook that aggregates the records into counters and latency histograms
+per endpoint and exports them in the Prometheus text format.
+
+Example code:
+    >>> metrics = bandcamp.metrics.Metrics()
+    >>> api = bandcamp.Api(api_key='your-secret-api-key', hooks=[metrics])
+    >>> track = bandcamp.track.info(api=api, track_id=1269403107)
+    >>> print(metrics.to_prometheus())
+"""
+import threading
+from collections import namedtuple
+from urllib.parse import parse_qsl, urlsplit
+
+__all__ = ['RequestRecord', 'Histogram', 'Metrics']
+
+# endpoint      the path of the endpoint, like /api/track/3/info.
+# batch_size    the number of ids or names requested.
+# status        the HTTP status or None if the request failed before a response arrived or was cached.
+# cache_hit     True if the response came from the cache, no other timings are measured then.
+# response_bytes the size of the body.
+# encoded_bytes the size of the body on the wire, smaller than response_bytes if it was compressed.
+# dns, connect, wait, transfer the Timings of the transport, 0 if the transport does not measure them.
+# parse         the seconds spent decoding the body.
+# total         the seconds from sending the first attempt until the response was decoded.
+# attempts      the number of times the request was sent, more than 1 if it was throttled.
+# throttle_wait the seconds the request waited for the rate limiter, over all attempts.
+# error         the name of the exception that was raised or None.
+RequestRecord = namedtuple('RequestRecord', 'endpoint batch_size status cache_hit response_bytes encoded_bytes dns '
+                                            'connect wait transfer parse total attempts throttle_wait error')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def get_endpoint(encoded_url):
+    return urlsplit(encoded_url).path
+
+
+def get_batch_size(encoded_url):
+    """Return the number of comma separated ids or names of a request"""
+    sizes = [len(value.split(',')) for name, value in parse_qsl(urlsplit(encoded_url).query) if name != 'key']
+
+    return max(sizes, default=1)
+
+
+class Histogram(object):
+    """Counts observations in cumulative buckets like a Prometheus histogram"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+    def quantile(self, fraction):
+        """Return the upper bound of the bucket the quantile falls into, None without observations"""
+        if not self.count:
+            return None
+
+        rank = fraction * self.count
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= rank:
+                return bound
+
+        return float('inf')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    return '{%s}' % ','.join('%s="%s"' % (name, _escape(value)) for name, value in labels)
+
+
+class Metrics(object):
+    """Hook that aggregates RequestRecords per endpoint"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+
+        # (endpoint, status, cache) -> number of requests
+        self.requests = {}
+        self.errors = {}
+        self.response_bytes = {}
+        self.encoded_bytes = {}
+        self.batch_items = {}
+        self.throttle_wait = {}
+        self.latency = {}
+        self.parse_latency = {}
+
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        endpoint = record.endpoint
+        key = (endpoint, '' if record.status is None else record.status, 'hit' if record.cache_hit else 'miss')
+
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.batch_items[endpoint] = self.batch_items.get(endpoint, 0) + record.batch_size
+            self.throttle_wait[endpoint] = self.throttle_wait.get(endpoint, 0.0) + record.throttle_wait
+
+            if record.error is not None:
+                error_key = (endpoint, record.error)
+                self.errors[error_key] = self.errors.get(error_key, 0) + 1
+
+            if record.cache_hit:
+                return
+
+            self.response_bytes[endpoint] = self.response_bytes.get(endpoint, 0) + record.response_bytes
+            self.encoded_bytes[endpoint] = self.encoded_bytes.get(endpoint, 0) + record.encoded_bytes
+
+            if endpoint not in self.latency:
+                self.latency[endpoint] = Histogram(self.buckets)
+                self.parse_latency[endpoint] = Histogram(self.buckets)
+
+            self.latency[endpoint].observe(record.total)
+            self.parse_latency[endpoint].observe(record.parse)
+
+    def to_prometheus(self, prefix='bandcamp'):
+        """Return the metrics in the Prometheus text exposition format"""
+        lines = []
+
+        with self._lock:
+            self._add_counter(lines, prefix + '_requests_total', 'Requests sent to Bandcamp or answered by the cache',
+                              ('endpoint', 'status', 'cache'), self.requests)
+            self._add_counter(lines, prefix + '_request_errors_total', 'Requests that raised an exception',
+                              ('endpoint', 'error'), self.errors)
+            self._add_counter(lines, prefix + '_response_bytes_total', 'Bytes of the decompressed bodies',
+                              ('endpoint',), {(endpoint,): value for endpoint, value in self.response_bytes.items()})
+            self._add_counter(lines, prefix + '_response_encoded_bytes_total', 'Bytes of the bodies on the wire',
+                              ('endpoint',), {(endpoint,): value for endpoint, value in self.encoded_bytes.items()})
+            self._add_counter(lines, prefix + '_batch_items_total', 'Ids or names requested',
+                              ('endpoint',), {(endpoint,): value for endpoint, value in self.batch_items.items()})
+            self._add_counter(lines, prefix + '_throttle_wait_seconds_total', 'Seconds waited for the rate limiter',
+                              ('endpoint',), {(endpoint,): value for endpoint, value in self.throttle_wait.items()})
+            self._add_histogram(lines, prefix + '_request_duration_seconds',
+                                'Seconds from sending a request until its response was decoded', self.latency)
+            self._add_histogram(lines, prefix + '_parse_duration_seconds', 'Seconds spent decoding responses',
+                                self.parse_latency)
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _add_counter(lines, name, description, label_names, values):
+        lines.append('# HELP %s %s' % (name, description))
+        lines.append('# TYPE %s counter' % name)
+
+        for labels, value in sorted(values.items(), key=lambda item: tuple(map(str, item[0]))):
+            lines.append('%s%s %s' % (name, _format_labels(zip(label_names, labels)), value))
+
+    @staticmethod
+    def _add_histogram(lines, name, description, histograms):
+        lines.append('# HELP %s %s' % (name, description))
+        lines.append('# TYPE %s histogram' % name)
+
+        for endpoint, histogram in sorted(histograms.items()):
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                labels = _format_labels((('endpoint', endpoint), ('le', repr(float(bound)))))
+                lines.append('%s_bucket%s %d' % (name, labels, count))
+
+            labels = _format_labels((('endpoint', endpoint), ('le', '+Inf')))
+            lines.append('%s_bucket%s %d' % (name, labels, histogram.count))
+            lines.append('%s_sum%s %r' % (name, _format_labels((('endpoint', endpoint),)), histogram.sum))
+            lines.append('%s_count%s %d' % (name, _format_labels((('endpoint', endpoint),)), histogram.count))
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Client side rate limiting for the Api object
+
+One RateLimiter is shared by all threads and coroutines that use the same api key.
+"""
+import asyncio
+import threading
+import time
+
+__all__ = ['RateLimiter']
+
+# Status codes that mean the server wants us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+# Status codes of successful requests, 304 answers the revalidation of a cached response
+SUCCESS_STATUSES = (200, 304)
+
+DEFAULT_RATE = 10
+DEFAULT_MIN_RATE = 0.5
+DEFAULT_INCREASE = 0.1
+DEFAULT_DECREASE = 0.5
+DEFAULT_RETRIES = 3
+
+
+class RateLimiter(object):
+    """Token bucket that adapts its rate to the responses of the server
+
+    The rate is cut by decrease whenever a request is throttled or fails and grows by increase
+    requests per second with every success, up to the configured rate again.
+
+    Parameters:
+        rate the maximum number of requests per second.
+        burst the number of requests that may be sent at once after a quiet period, defaults to rate.
+        min_rate the rate never drops below this number of requests per second.
+        retries how often a throttled request is sent again before giving up.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=None, min_rate=DEFAULT_MIN_RATE, increase=DEFAULT_INCREASE,
+                 decrease=DEFAULT_DECREASE, retries=DEFAULT_RETRIES, clock=time.monotonic):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = burst or rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.retries = retries
+        self.clock = clock
+
+        # Total number of acquired tokens and seconds spent waiting for them
+        self.acquired = 0
+        self.waited = 0.0
+
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how many seconds the caller has to wait before it may use it
+
+        Tokens that are not available yet are borrowed, so concurrent callers queue up behind each other.
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            self.acquired += 1
+            self.waited += delay
+
+        return delay
+
+    def acquire(self):
+        """Block until a request may be sent and return the number of seconds waited"""
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+        return delay
+
+    async def acquire_async(self):
+        """Wait until a request may be sent and return the number of seconds waited"""
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+        return delay
+
+    def record(self, response):
+        """Adapt the rate to a response and return True if the request was throttled"""
+        with self._lock:
+            if response.status in SUCCESS_STATUSES:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+                return False
+
+            self._slow_down()
+
+            if response.status not in THROTTLE_STATUSES:
+                return False
+
+            retry_after = response.headers.get('Retry-After')
+            if retry_after is not None and retry_after.isdigit():
+                # Nobody gets a token before the server is willing to answer again
+                self._tokens = min(self._tokens, 0) - int(retry_after) * self.rate
+
+            return True
+
+    def record_error(self):
+        """Adapt the rate to a request that failed without a response, like a refused connection"""
+        with self._lock:
+            self._slow_down()
+
+    def _slow_down(self):
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+
+    @property
+    def average_wait(self):
+        """The average number of seconds a request waited for its token"""
+        if not self.acquired:
+            return 0.0
+
+        return self.waited / self.acquired
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Coalescing of identical requests that are in flight at the same time
+
+The first caller for a key does the work, everyone else asking for the same key in the meantime
+waits for that result instead of doing the work again.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future
+
+__all__ = ['SingleFlight', 'AsyncSingleFlight']
+
+
+class SingleFlight(object):
+    """Single flight group for threads"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._calls)
+
+    def do(self, key, func):
+        """Call func and return its result, unless a call for key is in flight already"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+        return result
+
+
+class AsyncSingleFlight(object):
+    """Single flight group for coroutines running on one event loop"""
+
+    def __init__(self):
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, func):
+        """Await func() and return its result, unless a call for key is in flight already
+
+        The call runs in its own task, so cancelling any caller, the first one included, leaves the others waiting.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(func())
+            task.add_done_callback(functools.partial(self._done, key))
+
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+        if not task.cancelled():
+            # Everybody might have been cancelled, the exception is not worth a warning then
+            task.exception()
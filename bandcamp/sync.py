@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""Incremental synchronisation of catalogs
+
+A Snapshot remembers the album and track ids of every band's discography together with their release dates.
+sync compares fresh discographies against it and only fetches the albums and tracks that are new or whose
+release date changed, so a nightly run costs time proportional to the new releases and not to the catalog.
+
+Example code:
+    >>> snapshot = bandcamp.sync.Snapshot('catalog.json')
+    >>> result = bandcamp.sync.sync(api=api, band_ids=band_ids, snapshot=snapshot)
+    >>> for album in result.albums.values():
+    ...     store(album)
+"""
+import json
+import os
+import time
+from collections import namedtuple
+
+from . import album, band, track
+
+__all__ = ['Snapshot', 'DiscographyDelta', 'SyncResult', 'diff_discography', 'sync']
+
+DiscographyDelta = namedtuple('DiscographyDelta', 'new_albums removed_albums changed_albums '
+                                                  'new_tracks removed_tracks changed_tracks')
+SyncResult = namedtuple('SyncResult', 'deltas albums tracks')
+
+
+def _release_timestamp(item, body):
+    """Return the release date of a discography item as unix timestamp"""
+    if body is not None:
+        return body.get('release_date', None)
+
+    if item.release_date is None:
+        return None
+
+    return int(time.mktime(item.release_date))
+
+
+def _get_entry(discography):
+    """Turn a Discography into the entry a Snapshot stores for its band"""
+    return {
+        'albums': {str(album_id): _release_timestamp(item, getattr(item, 'album_body', None))
+                   for album_id, item in discography.albums.items()},
+        'tracks': {str(track_id): _release_timestamp(item, getattr(item, 'track_body', None))
+                   for track_id, item in discography.tracks.items()},
+    }
+
+
+def _diff(previous, current):
+    """Return the new, removed and changed ids between two mappings of ids to release dates"""
+    new = {int(_id) for _id in current.keys() - previous.keys()}
+    removed = {int(_id) for _id in previous.keys() - current.keys()}
+    changed = {int(_id) for _id in current.keys() & previous.keys() if current[_id] != previous[_id]}
+
+    return new, removed, changed
+
+
+def diff_discography(previous, discography):
+    """Compare a snapshot entry (or None for an unknown band) with a fresh Discography
+
+    Returns a DiscographyDelta with sets of ids. Items whose release date changed are possibly changed.
+    """
+    if previous is None:
+        previous = {'albums': {}, 'tracks': {}}
+
+    current = _get_entry(discography)
+    new_albums, removed_albums, changed_albums = _diff(previous['albums'], current['albums'])
+    new_tracks, removed_tracks, changed_tracks = _diff(previous['tracks'], current['tracks'])
+
+    return DiscographyDelta(new_albums=new_albums, removed_albums=removed_albums, changed_albums=changed_albums,
+                            new_tracks=new_tracks, removed_tracks=removed_tracks, changed_tracks=changed_tracks)
+
+
+class Snapshot(object):
+    """The discographies seen by the last sync, stored in a JSON file"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.bands = {}
+
+        if path is not None and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.bands = json.load(f)
+
+    def get(self, band_id):
+        """Return the entry of a band or None if it was never synced"""
+        return self.bands.get(str(band_id), None)
+
+    def set(self, band_id, entry):
+        self.bands[str(band_id)] = entry
+
+    def save(self):
+        """Write the snapshot to its file, the old file stays intact until the new one is complete"""
+        if self.path is None:
+            return
+
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump(self.bands, f)
+
+        os.replace(temporary_path, self.path)
+
+
+def sync(api, band_ids, snapshot, max_workers=None):
+    """Fetch the albums and tracks of the bands that are new or possibly changed since the last sync
+
+    Returns a SyncResult with the DiscographyDelta of every band and the fetched Album and Track objects.
+    Albums and tracks that could not be fetched are left out of the snapshot, so the next sync tries again.
+    """
+    band_ids = [int(band_id) for band_id in band_ids]
+    discographies = band.discography(api=api, band_id=band_ids, partial=True)
+
+    deltas = {band_id: diff_discography(snapshot.get(band_id), discography)
+              for band_id, discography in discographies.items()}
+
+    album_ids = [album_id for delta in deltas.values() for album_id in delta.new_albums | delta.changed_albums]
+    track_ids = [track_id for delta in deltas.values() for track_id in delta.new_tracks | delta.changed_tracks]
+
+    albums = {}
+    if album_ids:
+        albums = album.info_many(api=api, album_ids=album_ids, max_workers=max_workers, partial=True)
+
+    tracks = {}
+    if track_ids:
+        tracks = track.info(api=api, track_id=track_ids, partial=True)
+
+    for band_id, discography in discographies.items():
+        snapshot.set(band_id, _merge_entry(previous=snapshot.get(band_id), current=_get_entry(discography),
+                                           fetched_albums=albums, fetched_tracks=tracks))
+
+    snapshot.save()
+
+    return SyncResult(deltas=deltas, albums=albums, tracks=tracks)
+
+
+def _merge_entry(previous, current, fetched_albums, fetched_tracks):
+    """Build the new snapshot entry of a band, keeping the old state of items that could not be fetched"""
+    if previous is None:
+        previous = {'albums': {}, 'tracks': {}}
+
+    entry = {}
+    for kind, fetched in (('albums', fetched_albums), ('tracks', fetched_tracks)):
+        items = {}
+
+        for _id, release_date in current[kind].items():
+            if (_id in previous[kind] and previous[kind][_id] == release_date) or int(_id) in fetched:
+                items[_id] = release_date
+            elif _id in previous[kind]:
+                items[_id] = previous[kind][_id]
+
+        entry[kind] = items
+
+    return entry
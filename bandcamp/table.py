@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""Columnar storage of tracks for aggregate reports
+
+Example code:
+    >>> tracks = bandcamp.track.info(api=api, track_id=track_ids)
+    >>> table = bandcamp.table.TrackTable.from_tracks(tracks)
+    >>> table.group_sum(by='band_id', column='duration')
+    {4180852708: 1342.5, ...}
+
+If NumPy is installed, where, filter, sum, group_sum and group_count work on whole columns at once through
+NumPy views of the arrays, otherwise they loop over the rows in Python.
+"""
+import math
+import time
+from array import array
+from collections import Counter
+from itertools import compress
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .commons import DownloadableStates
+
+__all__ = ['TrackTable', 'release_year']
+
+# Missing ids, numbers and dates are stored as 0, missing durations as nan
+MISSING = 0
+
+# Column name -> array typecode
+COLUMNS = (
+    ('track_id', 'q'),
+    ('album_id', 'q'),
+    ('band_id', 'q'),
+    ('duration', 'd'),
+    ('number', 'q'),
+    ('release_date', 'q'),
+    ('downloadable', 'b'),
+)
+
+
+def _view(values):
+    """Return a NumPy array that shares the memory of a column"""
+    return numpy.frombuffer(values, dtype=values.typecode) if len(values) else numpy.array([], values.typecode)
+
+
+def _to_array(typecode, values):
+    result = array(typecode)
+    result.frombytes(values.tobytes())
+
+    return result
+
+
+def _get_fields(track):
+    """Return the values of all columns for a Track or any object with the same attributes"""
+    body = getattr(track, 'track_body', None)
+
+    if body is not None:
+        # Reading the response directly skips the conversion to a struct_time and back
+        release_date = body.get('release_date', None)
+        downloadable = body.get('downloadable', None)
+    else:
+        release_date = track.release_date
+        if release_date is not None:
+            release_date = int(time.mktime(release_date))
+
+        downloadable = track.downloadable.value
+
+    duration = track.duration
+
+    return (track.track_id or MISSING,
+            track.album_id or MISSING,
+            track.band_id or MISSING,
+            math.nan if duration is None else float(duration),
+            track.number or MISSING,
+            int(release_date or MISSING),
+            downloadable or MISSING)
+
+
+class TrackTable(object):
+    """Tracks stored column by column in typed arrays
+
+    The columns are track_id, album_id, band_id, duration (seconds), number, release_date (unix timestamp)
+    and downloadable (the value of the DownloadableStates member, 0 if not for sale).
+    """
+
+    def __init__(self, columns=None):
+        if columns is None:
+            columns = {name: array(typecode) for name, typecode in COLUMNS}
+
+        self.columns = columns
+
+    @classmethod
+    def from_tracks(cls, tracks):
+        """Build a table from an iterable of tracks, the mapping returned by track.info or an album"""
+        table = cls()
+        table.extend(tracks)
+
+        return table
+
+    def extend(self, tracks):
+        """Append tracks to the table"""
+        if isinstance(tracks, dict):
+            tracks = tracks.values()
+        elif hasattr(tracks, 'tracks'):
+            tracks = tracks.tracks
+
+        rows = [_get_fields(track) for track in tracks]
+        for (name, _), values in zip(COLUMNS, zip(*rows)):
+            self.columns[name].extend(values)
+
+    def __len__(self):
+        return len(self.columns['track_id'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def mask(self, column, predicate):
+        """Return a list of booleans that tells for every row if predicate(value of column) is true
+
+        predicate is called for every row, where compares whole columns.
+        """
+        return [bool(predicate(value)) for value in self.columns[column]]
+
+    def filter(self, mask):
+        """Return a new table with the rows for which mask is true"""
+        if numpy is not None:
+            mask = numpy.asarray(mask, dtype=bool)
+            return TrackTable({name: _to_array(values.typecode, _view(values)[mask])
+                               for name, values in self.columns.items()})
+
+        mask = list(mask)
+
+        return TrackTable({name: array(values.typecode, compress(values, mask))
+                           for name, values in self.columns.items()})
+
+    def where(self, column, value):
+        """Return a new table with the rows whose column equals value
+
+        value can also be a DownloadableStates member for the downloadable column.
+        """
+        if isinstance(value, DownloadableStates):
+            value = value.value or MISSING
+
+        if numpy is not None:
+            return self.filter(_view(self.columns[column]) == value)
+
+        return self.filter(self.mask(column, lambda _value: _value == value))
+
+    def sum(self, column):
+        """Sum a column, missing durations are skipped"""
+        values = self.columns[column]
+
+        if numpy is not None:
+            return (numpy.nansum if values.typecode == 'd' else numpy.sum)(_view(values)).item()
+
+        if values.typecode == 'd':
+            return math.fsum(value for value in values if not math.isnan(value))
+
+        return sum(values)
+
+    def group_sum(self, by, column, key=None):
+        """Sum column for every distinct value of the column by, or of key(value) if key is given
+
+        key is called for every row.
+        """
+        values = self.columns[column]
+        skip_nan = values.typecode == 'd'
+
+        if numpy is not None:
+            groups = _view(self.columns[by]) if key is None else numpy.array(list(self._groups(by, key)))
+            values = _view(values)
+            if skip_nan:
+                keep = ~numpy.isnan(values)
+                groups, values = groups[keep], values[keep]
+
+            unique, inverse = numpy.unique(groups, return_inverse=True)
+            # Integer columns are summed as integers, so large sums stay exact
+            totals = numpy.zeros(len(unique), dtype=numpy.float64 if skip_nan else numpy.int64)
+            numpy.add.at(totals, inverse.ravel(), values)
+
+            return dict(zip(unique.tolist(), totals.tolist()))
+
+        totals = {}
+
+        for group, value in zip(self._groups(by, key), values):
+            if skip_nan and math.isnan(value):
+                continue
+
+            totals[group] = totals.get(group, 0) + value
+
+        return totals
+
+    def group_count(self, by, key=None):
+        """Count the rows for every distinct value of the column by, or of key(value) if key is given"""
+        if numpy is not None and key is None:
+            unique, counts = numpy.unique(_view(self.columns[by]), return_counts=True)
+            return dict(zip(unique.tolist(), counts.tolist()))
+
+        return dict(Counter(self._groups(by, key)))
+
+    def _groups(self, by, key):
+        if key is None:
+            return self.columns[by]
+
+        return map(key, self.columns[by])
+
+
+def release_year(timestamp):
+    """Group key that turns a release_date into its year, 0 stays 0"""
+    if timestamp == MISSING:
+        return MISSING
+
+    return time.localtime(timestamp).tm_year
@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
 """The Bandcamp Track module"""
+import functools
 import time
 
-from .commons import DownloadableStates, integer
+from .commons import DownloadableStates, integer, merge_batches, split_ids
 
 __version__ = 3
 __all__ = ['info']
@@ -10,27 +11,36 @@ __all__ = ['info']
 BASE_URL_INFO = 'http://api.bandcamp.com/api/track/%d/info' % __version__
 
 
-def info(api, track_id):
+def info(api, track_id, partial=False):
     """Returns information about one or more tracks.
 
     This call can be used in batch mode, where you can specify multiple track ids separated by commas.
     The info for all the tracks is fetched in one call and returned to you in a hash, mapping the track ids
     to Track instances.
+
+    Too many ids for a single call are split into batches that are fetched concurrently and merged.
+    With partial=True the tracks of the successful batches are returned even if some of them failed,
+    the result is then always a hash, even for a single id.
     """
-    if isinstance(track_id, int):
-        track_id = str(track_id)
+    batches = split_ids(track_id)
+    handler = functools.partial(_get_tracks_from_response, track_factory=api.model_factory(Track))
+
+    if len(batches) == 1 and not partial:
+        parameters = {'track_id': batches[0]}
+        return api.request(url=BASE_URL_INFO, parameters=parameters, handler=handler)
 
-    if not isinstance(track_id, str):
-        track_id = ','.join((str(_track_id) for _track_id in track_id))
+    parameters = [{'track_id': batch} for batch in batches]
+    handler = functools.partial(merge_batches, batches=batches, handler=handler)
 
-    parameters = {'track_id': track_id}
+    return api.request_many(url=BASE_URL_INFO, parameters=parameters, handler=handler, return_exceptions=partial)
 
-    response = api.make_api_request(url=BASE_URL_INFO, parameters=parameters)
 
+def _get_tracks_from_response(response, track_factory):
+    """Get a Track or a mapping of track ids to Tracks from a API response"""
     if 'track_id' in response:
-        return Track(track_body=response)
+        return track_factory(track_body=response)
 
-    return {int(track_id): Track(track_body=track_body) for track_id, track_body in response.items()}
+    return {int(track_id): track_factory(track_body=track_body) for track_id, track_body in response.items()}
 
 
 class Track(object):
@@ -0,0 +1,778 @@
+# -*- coding: utf-8 -*-
+"""HTTP transports used by the Api object
+
+A transport takes an encoded url, performs a GET request and returns a Response tuple.
+Transports that talk HTTP fill in the Timings of the request, so the instrumentation of the Api object can tell
+where the time went. They also decompress gzip and deflate encoded bodies while reading them, encoded_size is
+then the number of bytes that went over the wire.
+
+Async transports used by the AsyncApi object have the same interface, but request and close are coroutines.
+"""
+import asyncio
+import gzip
+import http.client
+import io
+import json
+import socket
+import threading
+import time
+import zlib
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from .commons import normalize_request_url
+
+__all__ = ['Response', 'Timings', 'Transport', 'PooledTransport', 'FileTransport', 'RecordingTransport',
+           'ReplayTransport', 'AsyncTransport', 'AsyncPooledTransport', 'AsyncFileTransport', 'AsyncRecordingTransport',
+           'AsyncReplayTransport']
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_IDLE_TIMEOUT = 30
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_CONNECTIONS = 100
+
+# Guards against decompression bombs, no API response comes close to this
+DEFAULT_MAX_DECOMPRESSED_SIZE = 256 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+Response = namedtuple('Response', 'status headers body timings encoded_size', defaults=(None, None))
+
+# Seconds spent resolving the host, connecting, waiting for the response headers and reading the body.
+# dns and connect are 0 when a pooled connection was reused.
+Timings = namedtuple('Timings', 'dns connect wait transfer')
+
+
+class _ConnectionTimer(object):
+    """Replaces socket.create_connection of a http.client connection to time name resolution and connecting"""
+
+    def __init__(self):
+        self.dns = 0.0
+        self.connect = 0.0
+
+    def __call__(self, address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+        host, port = address
+
+        started = time.perf_counter()
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+        self.dns = resolved - started
+
+        error = None
+        for _, _, _, _, socket_address in addresses:
+            try:
+                sock = socket.create_connection(socket_address[:2], timeout=timeout, source_address=source_address)
+            except OSError as e:
+                error = e
+                continue
+
+            self.connect = time.perf_counter() - resolved
+            return sock
+
+        raise error
+
+
+class _Decompressor(object):
+    """Decompresses a gzip or deflate encoded body chunk by chunk
+
+    Raises a ValueError as soon as the decompressed body would get larger than max_size.
+    """
+
+    def __init__(self, encoding, max_size):
+        self.encoding = encoding
+        self.max_size = max_size
+        self.size = 0
+        self.encoded_size = 0
+
+        self._decompressor = None
+
+    def _create(self, data):
+        if self.encoding in ('gzip', 'x-gzip'):
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        # Servers send deflate with and without the zlib header, a zlib header is divisible by 31
+        if len(data) >= 2 and data[0] & 0x0F == 8 and (data[0] << 8 | data[1]) % 31 == 0:
+            return zlib.decompressobj(zlib.MAX_WBITS)
+
+        return zlib.decompressobj(-zlib.MAX_WBITS)
+
+    def _check(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise ValueError('Decompressed response is larger than %d bytes' % self.max_size)
+
+        return chunk
+
+    def feed(self, data):
+        """Return the decompressed bytes of the next chunk of the body"""
+        self.encoded_size += len(data)
+        if self._decompressor is None:
+            self._decompressor = self._create(data)
+
+        chunks = []
+        while data:
+            # Output beyond max_length stays in unconsumed_tail, so a bomb never gets decompressed in full
+            chunks.append(self._check(self._decompressor.decompress(data, self.max_size - self.size + 1)))
+            data = self._decompressor.unconsumed_tail
+
+        return b''.join(chunks)
+
+    def flush(self):
+        """Return the rest of the decompressed body once all chunks were fed"""
+        if self._decompressor is None:
+            return b''
+
+        return self._check(self._decompressor.flush())
+
+
+def _get_decompressor(headers, max_size):
+    """Return a _Decompressor for the Content-Encoding of a response or None if the body is not encoded"""
+    encoding = (headers.get('Content-Encoding', None) or 'identity').strip().lower()
+    if encoding == 'identity':
+        return None
+
+    if encoding not in ('gzip', 'x-gzip', 'deflate'):
+        raise ValueError('Unsupported content encoding %s' % encoding)
+
+    return _Decompressor(encoding, max_size=max_size)
+
+
+class _DecompressingBody(object):
+    """Readable file object that decompresses a streamed body"""
+
+    def __init__(self, body, decompressor):
+        self._body = body
+        self._decompressor = decompressor
+        self._buffer = bytearray()
+        self._eof = False
+
+    @property
+    def encoded_size(self):
+        """The number of bytes read from the wire so far"""
+        return self._decompressor.encoded_size
+
+    def read(self, size=-1):
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            data = self._body.read(CHUNK_SIZE)
+            if data:
+                self._buffer += self._decompressor.feed(data)
+            else:
+                self._buffer += self._decompressor.flush()
+                self._eof = True
+
+        if size < 0 or size >= len(self._buffer):
+            data, self._buffer = bytes(self._buffer), bytearray()
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+
+        return data
+
+    def close(self):
+        self._body.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Transport(object):
+    """Base class of all transports"""
+
+    def request(self, url, headers=None):
+        """Send a GET request for url and return a Response"""
+        raise NotImplementedError
+
+    def open(self, url, headers=None):
+        """Send a GET request for url and return a Response whose body is a readable file object
+
+        The caller has to close the body. By default the whole body is read into memory first.
+        """
+        response = self.request(url, headers=headers)
+
+        return response._replace(body=io.BytesIO(response.body))
+
+    def close(self):
+        """Release all resources held by the transport"""
+        pass
+
+
+class _PooledBody(object):
+    """Body of a streamed response, the connection goes back into the pool once it has been read"""
+
+    def __init__(self, transport, origin, connection, response):
+        self._transport = transport
+        self._origin = origin
+        self._connection = connection
+        self._response = response
+
+    def read(self, size=-1):
+        return self._response.read(None if size < 0 else size)
+
+    def close(self):
+        if self._connection is None:
+            return
+
+        if self._response.isclosed():
+            self._transport._finish(self._origin, self._connection, self._response)
+        else:
+            # Whatever is left of the body is still on the wire, so the connection can not be reused
+            self._connection.close()
+
+        self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PooledTransport(Transport):
+    """Transport that keeps persistent HTTP/1.1 connections per host
+
+    Parameters:
+        pool_size the maximum number of idle connections kept per host.
+        idle_timeout connections that were idle for longer than this many seconds are not reused.
+        timeout the socket timeout in seconds.
+        max_decompressed_size the maximum size in bytes of a gzip or deflate encoded body after decompression.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT, timeout=DEFAULT_TIMEOUT,
+                 max_decompressed_size=DEFAULT_MAX_DECOMPRESSED_SIZE, clock=time.monotonic):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.max_decompressed_size = max_decompressed_size
+        self.clock = clock
+
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, origin):
+        """Return an idle connection to origin or None"""
+        now = self.clock()
+
+        with self._lock:
+            pool = self._pools.get(origin, [])
+            while pool:
+                connection, last_used = pool.pop()
+                if now - last_used < self.idle_timeout:
+                    return connection
+
+                connection.close()
+
+        return None
+
+    def _release(self, origin, connection):
+        """Put a connection back into the pool of origin"""
+        with self._lock:
+            pool = self._pools.setdefault(origin, [])
+            if len(pool) < self.pool_size:
+                pool.append((connection, self.clock()))
+                return
+
+        connection.close()
+
+    def _connect(self, origin):
+        scheme, host = origin
+        if scheme == 'https':
+            connection = http.client.HTTPSConnection(host, timeout=self.timeout)
+        else:
+            connection = http.client.HTTPConnection(host, timeout=self.timeout)
+
+        connection._create_connection = _ConnectionTimer()
+
+        return connection
+
+    def _send(self, url, headers):
+        """Send a request and return the origin, the connection, the response with unread body and the Timings
+
+        The transfer time of the Timings is still 0, it is only known once the body was read.
+        """
+        parts = urlsplit(url)
+        origin = (parts.scheme, parts.netloc)
+
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+
+        connection = self._acquire(origin)
+        reused = connection is not None
+
+        while True:
+            if connection is None:
+                connection = self._connect(origin)
+
+            try:
+                started = time.perf_counter()
+                connection.request('GET', target, headers=headers or {})
+                response = connection.getresponse()
+                elapsed = time.perf_counter() - started
+
+                timer = connection._create_connection
+                dns, connect = (0.0, 0.0) if reused else (timer.dns, timer.connect)
+
+                return origin, connection, response, Timings(dns=dns, connect=connect,
+                                                             wait=elapsed - dns - connect, transfer=0.0)
+            except (http.client.HTTPException, OSError):
+                connection.close()
+
+                # The server may have closed an idle connection in the meantime, retry once on a fresh one
+                if not reused:
+                    raise
+
+                connection = None
+                reused = False
+
+    def _finish(self, origin, connection, response):
+        """Pool the connection again if the server keeps it open"""
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(origin, connection)
+
+    def request(self, url, headers=None):
+        origin, connection, response, timings = self._send(url, headers)
+
+        try:
+            started = time.perf_counter()
+            body, encoded_size = self._read_body(response)
+            timings = timings._replace(transfer=time.perf_counter() - started)
+        except Exception:
+            # Whatever is left of the body is still on the wire, so the connection can not be reused
+            connection.close()
+            raise
+
+        self._finish(origin, connection, response)
+
+        return Response(status=response.status, headers=response.msg, body=body, timings=timings,
+                        encoded_size=encoded_size)
+
+    def _read_body(self, response):
+        """Read and decompress the body of a response and return it with its size on the wire"""
+        decompressor = _get_decompressor(response.msg, max_size=self.max_decompressed_size)
+        if decompressor is None:
+            body = response.read()
+            return body, len(body)
+
+        chunks = []
+        while True:
+            data = response.read(CHUNK_SIZE)
+            if not data:
+                break
+
+            chunks.append(decompressor.feed(data))
+
+        chunks.append(decompressor.flush())
+
+        return b''.join(chunks), decompressor.encoded_size
+
+    def open(self, url, headers=None):
+        origin, connection, response, timings = self._send(url, headers)
+        body = _PooledBody(self, origin, connection, response)
+
+        try:
+            decompressor = _get_decompressor(response.msg, max_size=self.max_decompressed_size)
+        except ValueError:
+            body.close()
+            raise
+
+        if decompressor is not None:
+            body = _DecompressingBody(body, decompressor)
+
+        return Response(status=response.status, headers=response.msg, body=body, timings=timings)
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = self._pools, {}
+
+        for pool in pools.values():
+            for connection, _ in pool:
+                connection.close()
+
+
+class FileTransport(Transport):
+    """Transport that answers every request with the content of a file
+
+    Only to be used for the unittests
+    """
+
+    def __init__(self, file_path, encoding='utf-8'):
+        self.file_path = file_path
+        self.encoding = encoding
+
+    def request(self, url, headers=None):
+        with open(self.file_path, encoding=self.encoding) as f:
+            body = f.read().encode('utf-8')
+
+        return Response(status=200, headers={}, body=body)
+
+
+def get_request_key(url):
+    """Return the key of a request in an archive: the url with sorted parameters and without the api key"""
+    return '%s?%s' % normalize_request_url(url)
+
+
+class RecordingTransport(Transport):
+    """Transport that sends requests over another transport and appends every response to an archive
+
+    The archive is a gzip compressed file with one JSON record per line and can be served by a ReplayTransport.
+    Records of several sessions can be appended to the same archive.
+    """
+
+    def __init__(self, transport, path, clock=time.perf_counter):
+        self.transport = transport
+        self.path = path
+        self.clock = clock
+
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def request(self, url, headers=None):
+        started = self.clock()
+        response = self.transport.request(url, headers=headers)
+        self.record(url, response, elapsed=self.clock() - started)
+
+        return response
+
+    def record(self, url, response, elapsed):
+        """Append a response to the archive"""
+        record = {
+            'key': get_request_key(url),
+            'status': response.status,
+            # The body is stored decompressed
+            'headers': {name: value for name, value in response.headers.items()
+                        if name.lower() not in ('content-encoding', 'content-length')},
+            # Bodies are JSON text, surrogateescape keeps any other bytes intact
+            'body': response.body.decode('utf-8', 'surrogateescape'),
+            'elapsed': elapsed,
+        }
+
+        with self._lock:
+            self._file.write(json.dumps(record) + '\n')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+    """Transport that answers requests with the responses of an archive written by a RecordingTransport
+
+    Requests are matched on the url with sorted parameters, the api key is ignored. If a request was recorded
+    several times, the responses are served in the recorded order and the last one is repeated.
+    A request that was never recorded raises a KeyError.
+
+    Parameters:
+        path the archive.
+        latency None to answer immediately, 'recorded' to wait as long as the recorded request took,
+            a number of seconds or a callable that gets the recorded duration and returns the seconds to wait.
+    """
+
+    def __init__(self, path, latency=None, sleep=time.sleep):
+        self.path = path
+        self.latency = latency
+        self.sleep = sleep
+
+        self._records = {}
+        self._served = {}
+        self._lock = threading.Lock()
+
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                self._records.setdefault(record['key'], []).append(record)
+
+    def __len__(self):
+        return sum(len(records) for records in self._records.values())
+
+    def _next_record(self, url):
+        """Return the response for url and the seconds to wait before it is returned"""
+        key = get_request_key(url)
+
+        with self._lock:
+            records = self._records.get(key, None)
+            if records is None:
+                raise KeyError('No response recorded for %s' % key)
+
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+
+        record = records[min(index, len(records) - 1)]
+        response = Response(status=record['status'], headers=record['headers'],
+                            body=record['body'].encode('utf-8', 'surrogateescape'))
+
+        return response, self._get_delay(record['elapsed'])
+
+    def _get_delay(self, elapsed):
+        if self.latency is None:
+            return 0
+        elif self.latency == 'recorded':
+            return elapsed
+        elif callable(self.latency):
+            return self.latency(elapsed)
+
+        return self.latency
+
+    def request(self, url, headers=None):
+        response, delay = self._next_record(url)
+        if delay > 0:
+            self.sleep(delay)
+
+        return response
+
+
+class AsyncTransport(object):
+    """Base class of all async transports"""
+
+    async def request(self, url, headers=None):
+        """Send a GET request for url and return a Response"""
+        raise NotImplementedError
+
+    async def close(self):
+        """Release all resources held by the transport"""
+        pass
+
+
+class AsyncPooledTransport(AsyncTransport):
+    """Async transport that keeps persistent HTTP/1.1 connections per host
+
+    Parameters:
+        pool_size the maximum number of idle connections kept per host.
+        idle_timeout connections that were idle for longer than this many seconds are not reused.
+        timeout the timeout in seconds for a whole request.
+        max_connections the maximum number of requests that are in flight at the same time.
+        max_decompressed_size the maximum size in bytes of a gzip or deflate encoded body after decompression.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT, timeout=DEFAULT_TIMEOUT,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, max_decompressed_size=DEFAULT_MAX_DECOMPRESSED_SIZE,
+                 clock=time.monotonic):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_decompressed_size = max_decompressed_size
+        self.clock = clock
+
+        self._pools = {}
+        self._semaphore = None
+
+    def _acquire(self, origin):
+        """Return an idle (reader, writer) pair connected to origin or None"""
+        now = self.clock()
+        pool = self._pools.get(origin, [])
+
+        while pool:
+            reader, writer, last_used = pool.pop()
+            if now - last_used < self.idle_timeout and not reader.at_eof():
+                return reader, writer
+
+            writer.close()
+
+        return None
+
+    def _release(self, origin, reader, writer):
+        """Put a connection back into the pool of origin"""
+        pool = self._pools.setdefault(origin, [])
+        if len(pool) < self.pool_size:
+            pool.append((reader, writer, self.clock()))
+        else:
+            writer.close()
+
+    async def _connect(self, origin):
+        """Connect to origin and return the (reader, writer) pair and the seconds spent on resolving and connecting"""
+        scheme, host, port = origin
+        loop = asyncio.get_running_loop()
+
+        started = time.perf_counter()
+        addresses = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+
+        error = None
+        for _, _, _, _, socket_address in addresses:
+            try:
+                connection = await asyncio.open_connection(socket_address[0], port, ssl=scheme == 'https',
+                                                           server_hostname=host if scheme == 'https' else None)
+            except OSError as e:
+                error = e
+                continue
+
+            return connection, resolved - started, time.perf_counter() - resolved
+
+        raise error
+
+    async def request(self, url, headers=None):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+
+        async with self._semaphore:
+            return await asyncio.wait_for(self._request(url, headers or {}), self.timeout)
+
+    async def _request(self, url, headers):
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        origin = (parts.scheme, parts.hostname, port)
+
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+
+        lines = ['GET %s HTTP/1.1' % target, 'Host: %s' % parts.netloc]
+        lines.extend('%s: %s' % header for header in headers.items())
+        data = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+        connection = self._acquire(origin)
+        reused = connection is not None
+
+        while True:
+            dns = connect = 0.0
+            if connection is None:
+                connection, dns, connect = await self._connect(origin)
+
+            reader, writer = connection
+            try:
+                started = time.perf_counter()
+                writer.write(data)
+                await writer.drain()
+                status, response_headers, body, arrived = await self._read_response(reader)
+                wait, transfer = arrived - started, time.perf_counter() - arrived
+            except (http.client.HTTPException, OSError, asyncio.IncompleteReadError):
+                writer.close()
+
+                # The server may have closed an idle connection in the meantime, retry once on a fresh one
+                if not reused:
+                    raise
+
+                connection = None
+                reused = False
+                continue
+            except BaseException:
+                # Timed out or cancelled in the middle of the exchange, the connection can not be reused
+                writer.close()
+                raise
+
+            break
+
+        if response_headers.get('Connection', '').lower() == 'close':
+            writer.close()
+        else:
+            self._release(origin, reader, writer)
+
+        encoded_size = len(body)
+        decompressor = _get_decompressor(response_headers, max_size=self.max_decompressed_size)
+        if decompressor is not None:
+            body = decompressor.feed(body) + decompressor.flush()
+
+        return Response(status=status, headers=response_headers, body=body,
+                        timings=Timings(dns=dns, connect=connect, wait=wait, transfer=transfer),
+                        encoded_size=encoded_size)
+
+    @staticmethod
+    async def _read_response(reader):
+        """Read the status line, the headers and the body of a response
+
+        Also returns the time.perf_counter() value of when the status line arrived.
+        """
+        status_line = await reader.readline()
+        arrived = time.perf_counter()
+        if not status_line:
+            raise http.client.RemoteDisconnected('Remote end closed connection without response')
+
+        version, status = status_line.split(None, 2)[:2]
+
+        header_lines = []
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+
+            header_lines.append(line)
+
+        headers = http.client.parse_headers(io.BytesIO(b''.join(header_lines) + b'\r\n'))
+        if version == b'HTTP/1.0' and headers.get('Connection', '').lower() != 'keep-alive':
+            headers['Connection'] = 'close'
+
+        status = int(status)
+        if status < 200 or status in (204, 304):
+            # These never have a body, reading until EOF would wait for the server to close the connection
+            body = b''
+        elif headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    # Skip the trailer
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+
+            body = b''.join(chunks)
+        elif 'Content-Length' in headers:
+            body = await reader.readexactly(int(headers['Content-Length']))
+        else:
+            body = await reader.read()
+            headers['Connection'] = 'close'
+
+        return status, headers, body, arrived
+
+    async def close(self):
+        pools, self._pools = self._pools, {}
+
+        for pool in pools.values():
+            for reader, writer, _ in pool:
+                writer.close()
+
+
+class AsyncFileTransport(FileTransport, AsyncTransport):
+    """Async transport that answers every request with the content of a file
+
+    Only to be used for the unittests
+    """
+
+    async def request(self, url, headers=None):
+        return FileTransport.request(self, url=url, headers=headers)
+
+    async def close(self):
+        pass
+
+
+class AsyncRecordingTransport(RecordingTransport, AsyncTransport):
+    """Async transport that sends requests over another async transport and appends every response to an archive"""
+
+    async def request(self, url, headers=None):
+        started = self.clock()
+        response = await self.transport.request(url, headers=headers)
+        self.record(url, response, elapsed=self.clock() - started)
+
+        return response
+
+    async def close(self):
+        with self._lock:
+            self._file.close()
+
+        await self.transport.close()
+
+
+class AsyncReplayTransport(ReplayTransport, AsyncTransport):
+    """Async transport that answers requests with the responses of an archive"""
+
+    def __init__(self, path, latency=None, sleep=asyncio.sleep):
+        super().__init__(path=path, latency=latency, sleep=sleep)
+
+    async def request(self, url, headers=None):
+        response, delay = self._next_record(url)
+        if delay > 0:
+            await self.sleep(delay)
+
+        return response
+
+    async def close(self):
+        pass
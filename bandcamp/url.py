@@ -1,13 +1,21 @@
 # -*- coding: utf-8 -*-
 """The Bandcamp URL module"""
-from collections import namedtuple
+import functools
+import threading
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlsplit
 
 __version__ = 1
-__all__ = ['info']
+__all__ = ['info', 'info_many', 'normalize', 'Resolver']
 
 BASE_URL_INFO = 'http://api.bandcamp.com/api/url/%d/info' % __version__
 UrlInfoResponse = namedtuple('UrlInfoResponse', 'band_id album_id track_id')
 
+DEFAULT_MAX_SIZE = 100000
+
+# Paths that show the band itself, these resolve to the band without an album or track
+BAND_PATHS = ('', '/music')
+
 
 def info(api, url):
     """Resolves a Bandcamp URL to its band, album or track.
@@ -18,7 +26,160 @@ def info(api, url):
     """
     parameters = {'url': url}
 
-    response = api.make_api_request(url=BASE_URL_INFO, parameters=parameters)
+    return api.request(url=BASE_URL_INFO, parameters=parameters, handler=_get_url_info_from_response)
+
+
+def info_many(api, urls, partial=False, max_workers=None):
+    """Resolves several Bandcamp URLs concurrently and returns a hash mapping each URL to a UrlInfoResponse
+
+    URLs that only differ in scheme, case of the host or a trailing slash are resolved once.
+    With partial=True URLs that could not be resolved are left out instead of raising the error.
+    Use a Resolver to keep the results between calls.
+    """
+    return Resolver(api=api, max_workers=max_workers).info_many(urls, partial=partial)
+
+
+def normalize(url):
+    """Return the form of a URL that is sent to url.info and cached: host and path without scheme or query"""
+    url = url.strip()
+    if '://' not in url:
+        url = '//' + url
+
+    parts = urlsplit(url)
+    if not parts.hostname:
+        raise ValueError('Invalid url %s' % url)
+
+    return parts.hostname + parts.path.rstrip('/')
+
+
+class Resolver(object):
+    """Resolves URLs with url.info and remembers the results
+
+    Besides every resolved URL, the band id of every host whose band page was resolved is remembered, so its
+    other band page (the root or /music) is answered without a request. Album and track URLs do not tell
+    the band of a host, on a label's subdomain they resolve to the band of the artist.
+
+    Parameters:
+        api the Api or AsyncApi object used for the requests.
+        max_size the maximum number of resolved URLs that are kept, the least recently used are dropped.
+        max_workers the maximum number of concurrent requests, defaults to the one of api.
+    """
+
+    def __init__(self, api, max_size=DEFAULT_MAX_SIZE, max_workers=None):
+        self.api = api
+        self.max_size = max_size
+        self.max_workers = max_workers
+
+        self.hits = 0
+        self.misses = 0
+
+        self._responses = OrderedDict()
+        self._band_ids = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """Return the known UrlInfoResponse of a URL or None"""
+        key = normalize(url)
+
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        response = self._responses.get(key, None)
+
+        if response is not None:
+            self._responses.move_to_end(key)
+        else:
+            host, _, path = key.partition('/')
+            band_id = self._band_ids.get(host, None)
+
+            if band_id is not None and ('/' + path).rstrip('/') in BAND_PATHS:
+                response = UrlInfoResponse(band_id=band_id, album_id=None, track_id=None)
+
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return response
+
+    def add(self, url, response):
+        """Remember the UrlInfoResponse of a URL"""
+        key = normalize(url)
+
+        with self._lock:
+            self._add(key, response)
+
+    def _add(self, key, response):
+        self._responses[key] = response
+        self._responses.move_to_end(key)
+
+        host, _, path = key.partition('/')
+        if (response.band_id is not None and response.album_id is None and response.track_id is None
+                and ('/' + path).rstrip('/') in BAND_PATHS):
+            self._band_ids[host] = response.band_id
+
+        while len(self._responses) > self.max_size:
+            self._responses.popitem(last=False)
+
+    def info(self, url):
+        """Resolve a single URL, see url.info"""
+        return self._resolve([url], partial=False, handler=functools.partial(_get_first_value, url=url))
+
+    def info_many(self, urls, partial=False):
+        """Resolve URLs that are not known yet concurrently and return a hash mapping each URL to a UrlInfoResponse
+
+        With partial=True URLs that could not be resolved are left out instead of raising the error.
+        """
+        return self._resolve(urls, partial=partial)
+
+    def _resolve(self, urls, partial, handler=None):
+        results = {}
+        pending = OrderedDict()
+
+        with self._lock:
+            for _url in urls:
+                key = normalize(_url)
+                response = self._get(key)
+
+                if response is not None:
+                    results[_url] = response
+                else:
+                    pending.setdefault(key, []).append(_url)
+
+        keys = list(pending)
+        parameters = [{'url': key} for key in keys]
+        merge = functools.partial(self._merge_responses, keys=keys, pending=pending, results=results,
+                                  handler=handler)
+
+        return self.api.request_many(url=BASE_URL_INFO, parameters=parameters, handler=merge,
+                                     return_exceptions=partial, max_workers=self.max_workers)
+
+    def _merge_responses(self, responses, keys, pending, results, handler):
+        """Remember the new responses and add them to the results of the already known URLs"""
+        with self._lock:
+            for key, response in zip(keys, responses):
+                if isinstance(response, Exception):
+                    continue
+
+                response = _get_url_info_from_response(response)
+                self._add(key, response)
+
+                for _url in pending[key]:
+                    results[_url] = response
+
+        if handler is not None:
+            return handler(results)
+
+        return results
+
+
+def _get_first_value(results, url):
+    return results[url]
+
+
+def _get_url_info_from_response(response):
+    """Get a UrlInfoResponse from a API response"""
     for _id in ('track_id', 'band_id', 'album_id'):
         if _id not in response:
             response[_id] = None
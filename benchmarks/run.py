@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""Offline benchmarks of the client hot paths
+
+The fixtures in tests/json are served by a local HTTP server and every endpoint is called in single and batch
+mode, measuring the throughput and the p50/p99 latency. JSON parsing and model construction are measured
+without any network. The results are written as JSON, so the results of two versions can be compared.
+
+Usage:
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --latency 0.02 --payload-size 65536 --output after.json --compare before.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+import bandcamp
+from bandcamp.compact import ALBUM_FIELDS, BAND_FIELDS, DISCOGRAPHY_ALBUM_FIELDS, TRACK_FIELDS
+from bandcamp.transport import PooledTransport
+from tests.server import FIXTURES, JSON_DIR, FixtureServer
+
+API_ORIGIN = 'http://api.bandcamp.com'
+
+DEFAULT_ITERATIONS = 200
+DEFAULT_BATCH_SIZE = 10
+
+# A regression is reported when a time got slower by more than this fraction
+DEFAULT_THRESHOLD = 0.1
+
+
+class LocalTransport(PooledTransport):
+    """PooledTransport that sends the requests meant for the Bandcamp API to a local server"""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def _rewrite(self, url):
+        if url.startswith(API_ORIGIN):
+            url = self.base_url + url[len(API_ORIGIN):]
+
+        return url
+
+    def request(self, url, headers=None):
+        return super().request(self._rewrite(url), headers=headers)
+
+    def open(self, url, headers=None):
+        return super().open(self._rewrite(url), headers=headers)
+
+
+def get_endpoint_cases(batch_size):
+    """Return (endpoint, mode, call) tuples, call sends the request with an Api object"""
+    ids = list(range(1, batch_size + 1))
+    names = ['band %d' % index for index in ids]
+    urls = ['band-%d.bandcamp.com/album/a' % index for index in ids]
+
+    return (
+        ('track.info', 'single', lambda api: bandcamp.track.info(api=api, track_id=1269403107)),
+        ('track.info', 'batch', lambda api: bandcamp.track.info(api=api, track_id=ids)),
+        ('album.info', 'single', lambda api: bandcamp.album.info(api=api, album_id=2587417518)),
+        ('album.info', 'batch', lambda api: bandcamp.album.info_many(api=api, album_ids=ids)),
+        ('band.info', 'single', lambda api: bandcamp.band.info(api=api, band_id=3463798201)),
+        ('band.info', 'batch', lambda api: bandcamp.band.info(api=api, band_id=ids)),
+        ('band.search', 'single', lambda api: bandcamp.band.search(api=api, name='mumble')),
+        ('band.search', 'batch', lambda api: bandcamp.band.search(api=api, name=names)),
+        ('band.discography', 'single', lambda api: bandcamp.band.discography(api=api, band_id=203035041)),
+        ('band.discography', 'batch', lambda api: bandcamp.band.discography(api=api, band_id=ids)),
+        ('url.info', 'single', lambda api: bandcamp.url.info(api=api, url='lapfoxtrax.com/album/--2')),
+        ('url.info', 'batch', lambda api: bandcamp.url.info_many(api=api, urls=urls)),
+    )
+
+
+def _read_fields(item, fields):
+    for name, _ in fields:
+        getattr(item, name)
+
+
+def _build_tracks(response, models):
+    for item in bandcamp.track._get_tracks_from_response(response, track_factory=models.get(
+            bandcamp.track.Track, bandcamp.track.Track)).values():
+        _read_fields(item, TRACK_FIELDS)
+
+
+def _build_album(response, models):
+    item = bandcamp.album._get_album_from_response(response, album_factory=models.get(
+        bandcamp.album.Album, bandcamp.album.Album))
+    _read_fields(item, ALBUM_FIELDS)
+
+    for _track in item.tracks:
+        _read_fields(_track, TRACK_FIELDS)
+
+
+def _build_bands(response, models):
+    for item in bandcamp.band._get_bands_from_response(response, band_factory=models.get(
+            bandcamp.band.Band, bandcamp.band.Band)).values():
+        _read_fields(item, BAND_FIELDS)
+
+
+def _build_discographies(response, models):
+    discographies = bandcamp.band._get_discographies_from_response(
+        response, album_factory=models.get(bandcamp.band.DiscographyAlbum, bandcamp.band.DiscographyAlbum),
+        track_factory=models.get(bandcamp.band.DiscographyTrack, bandcamp.band.DiscographyTrack))
+
+    for discography in discographies.values():
+        for item in discography.albums.values():
+            _read_fields(item, DISCOGRAPHY_ALBUM_FIELDS)
+
+        for item in discography.tracks.values():
+            _read_fields(item, TRACK_FIELDS)
+
+
+# Model name -> (fixture, function that builds the models of a response and reads every field)
+MODEL_CASES = {
+    'track': ('test_multiple_tracks', _build_tracks),
+    'album': ('test_album', _build_album),
+    'band': ('test_multiple_bands', _build_bands),
+    'discography': ('test_multiple_discographies', _build_discographies),
+}
+
+
+def percentile(values, fraction):
+    """Return the nearest rank percentile of a list of numbers"""
+    values = sorted(values)
+    index = max(0, min(len(values) - 1, math.ceil(fraction * len(values)) - 1))
+
+    return values[index]
+
+
+def measure(func, iterations):
+    """Call func iterations times and return the durations of the calls in seconds and the total time"""
+    durations = []
+    started = time.perf_counter()
+
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - call_started)
+
+    return durations, time.perf_counter() - started
+
+
+def _summarize(durations, elapsed):
+    return {
+        'iterations': len(durations),
+        'throughput': len(durations) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(durations, 0.50) * 1000,
+        'p99_ms': percentile(durations, 0.99) * 1000,
+    }
+
+
+def bench_endpoints(iterations, batch_size, latency, payload_size, compression=None):
+    """Call every endpoint against a local server and return the results per endpoint and mode"""
+    results = {}
+
+    with FixtureServer(latency=latency, payload_size=payload_size, compression=compression) as server:
+        api = bandcamp.Api(api_key='benchmark', transport=LocalTransport(server.url))
+
+        try:
+            for endpoint, mode, call in get_endpoint_cases(batch_size):
+                # The first call opens the connections
+                call(api)
+                durations, elapsed = measure(lambda: call(api), iterations)
+                results['%s/%s' % (endpoint, mode)] = _summarize(durations, elapsed)
+        finally:
+            api.close()
+
+    return results
+
+
+def bench_parsing(iterations):
+    """Measure how long decoding the body of every fixture the server sends takes"""
+    results = {}
+
+    for name in sorted({name for fixtures in FIXTURES.values() for name in fixtures}):
+        with open(os.path.join(JSON_DIR, name), 'rb') as f:
+            body = f.read()
+
+        durations, elapsed = measure(lambda: bandcamp.Api.process_json_string(body), iterations)
+        results[name] = {
+            'bytes': len(body),
+            'mean_us': elapsed / iterations * 1000000,
+            'megabytes_per_second': len(body) * iterations / elapsed / 1000000 if elapsed else 0.0,
+        }
+
+    return results
+
+
+def bench_models(iterations):
+    """Measure building the models of a decoded response and reading all of their fields"""
+    results = {}
+    variants = (('default', {}), ('compact', bandcamp.compact.models()))
+
+    for model, (fixture, build) in sorted(MODEL_CASES.items()):
+        with open(os.path.join(JSON_DIR, fixture), 'rb') as f:
+            response = json.loads(f.read().decode('utf-8'))
+
+        for variant, models in variants:
+            durations, elapsed = measure(lambda: build(response, models), iterations)
+            results['%s/%s' % (model, variant)] = {'mean_us': elapsed / iterations * 1000000}
+
+    return results
+
+
+def run(iterations=DEFAULT_ITERATIONS, batch_size=DEFAULT_BATCH_SIZE, latency=0.0, payload_size=0,
+        compression=None):
+    """Run all benchmarks and return the results as a JSON serializable dict"""
+    return {
+        'python': platform.python_version(),
+        'json': 'json' if bandcamp.commons.orjson is None else 'orjson',
+        'platform': platform.platform(),
+        'config': {'iterations': iterations, 'batch_size': batch_size, 'latency': latency,
+                   'payload_size': payload_size, 'compression': compression},
+        'endpoints': bench_endpoints(iterations=iterations, batch_size=batch_size, latency=latency,
+                                     payload_size=payload_size, compression=compression),
+        'parsing': bench_parsing(iterations=iterations),
+        'models': bench_models(iterations=iterations),
+    }
+
+
+def _get_times(results):
+    """Flatten the times of a result, where smaller is better"""
+    times = {}
+
+    for section in ('endpoints', 'parsing', 'models'):
+        for name, values in results.get(section, {}).items():
+            for metric in ('p50_ms', 'p99_ms', 'mean_us'):
+                if metric in values:
+                    times['%s/%s/%s' % (section, name, metric)] = values[metric]
+
+    return times
+
+
+def compare(old, new, threshold=DEFAULT_THRESHOLD):
+    """Return (name, old time, new time) for every time that got slower by more than threshold"""
+    old_times = _get_times(old)
+    regressions = []
+
+    for name, new_time in sorted(_get_times(new).items()):
+        old_time = old_times.get(name, None)
+        if old_time and new_time > old_time * (1 + threshold):
+            regressions.append((name, old_time, new_time))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the bandcamp client against a local server')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the server waits before answering')
+    parser.add_argument('--payload-size', type=int, default=0, help='minimum size of every response in bytes')
+    parser.add_argument('--compression', choices=('gzip', 'deflate'), help='compress the responses of the server')
+    parser.add_argument('--output', help='file the results are written to, stdout if not given')
+    parser.add_argument('--compare', help='results of an earlier run to check for regressions')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    arguments = parser.parse_args(argv)
+
+    results = run(iterations=arguments.iterations, batch_size=arguments.batch_size, latency=arguments.latency,
+                  payload_size=arguments.payload_size, compression=arguments.compression)
+
+    if arguments.output is None:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    else:
+        with open(arguments.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if arguments.compare is None:
+        return 0
+
+    with open(arguments.compare, encoding='utf-8') as f:
+        regressions = compare(json.load(f), results, threshold=arguments.threshold)
+
+    for name, old_time, new_time in regressions:
+        sys.stderr.write('%s: %.3f -> %.3f (%+.0f%%)\n' % (name, old_time, new_time,
+                                                          (new_time / old_time - 1) * 100))
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,4 +9,5 @@ setup(name='bandcamp',
       url='https://github.com/GIider/bandcamp',
       version='2.0a',
       py_modules=['bandcamp'],
+      python_requires='>=3.9',
       test_suite='tests')
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""A transport that answers API requests from a small synthetic catalog"""
+import json
+from urllib.parse import parse_qsl, urlsplit
+
+from bandcamp.transport import Response, Transport
+
+
+class CatalogTransport(Transport):
+    """Answer band, album, track and url requests for a catalog of bands
+
+    catalog maps band ids to {'albums': {album_id: [track_id, ...]}, 'tracks': [track_id, ...]},
+    where 'tracks' are the tracks that are not on an album. Release dates can be set in release_dates.
+    """
+
+    def __init__(self, catalog, release_dates=None):
+        self.catalog = catalog
+        self.release_dates = release_dates or {}
+        self.urls = []
+
+        self._albums = {album_id: band_id for band_id, content in catalog.items() for album_id in content['albums']}
+        self._tracks = {track_id: (band_id, None) for band_id, content in catalog.items()
+                        for track_id in content['tracks']}
+        self._tracks.update({track_id: (band_id, album_id) for band_id, content in catalog.items()
+                             for album_id, track_ids in content['albums'].items() for track_id in track_ids})
+
+    def request(self, url, headers=None):
+        self.urls.append(url)
+
+        parts = urlsplit(url)
+        parameters = dict(parse_qsl(parts.query))
+        endpoint = parts.path.split('/')[2:4]
+
+        if endpoint == ['url', '1']:
+            body = {'band_id': int(parameters['url'].split('.')[0].rsplit('-', 1)[-1])}
+        elif endpoint == ['album', '2']:
+            body = self.get_album(int(parameters['album_id']))
+        elif endpoint == ['track', '3']:
+            body = self._batch(parameters['track_id'], self.get_track)
+        elif parts.path.endswith('/discography'):
+            body = self._batch(parameters['band_id'], self.get_discography)
+        else:
+            body = self._batch(parameters['band_id'], self.get_band)
+
+        return Response(status=200, headers={}, body=json.dumps(body).encode('utf-8'))
+
+    @staticmethod
+    def _batch(ids, get):
+        ids = ids.split(',')
+        if len(ids) == 1:
+            return get(int(ids[0]))
+
+        return {_id: get(int(_id)) for _id in ids}
+
+    def get_band(self, band_id):
+        return {'band_id': band_id, 'name': 'Band %d' % band_id, 'subdomain': 'band-%d' % band_id,
+                'url': 'http://band-%d.bandcamp.com' % band_id}
+
+    def get_discography(self, band_id):
+        content = self.catalog[band_id]
+        entries = [{'album_id': album_id, 'band_id': band_id, 'title': 'Album %d' % album_id,
+                    'release_date': self.release_dates.get(album_id, 1300000000)} for album_id in content['albums']]
+        entries += [{'track_id': track_id, 'band_id': band_id, 'title': 'Track %d' % track_id,
+                     'release_date': self.release_dates.get(track_id, 1300000000)} for track_id in content['tracks']]
+
+        return {'discography': entries}
+
+    def get_album(self, album_id):
+        band_id = self._albums[album_id]
+        tracks = [dict(self.get_track(track_id), number=number)
+                  for number, track_id in enumerate(self.catalog[band_id]['albums'][album_id], 1)]
+
+        return {'album_id': album_id, 'band_id': band_id, 'title': 'Album %d' % album_id, 'tracks': tracks,
+                'release_date': self.release_dates.get(album_id, 1300000000)}
+
+    def get_track(self, track_id):
+        band_id, album_id = self._tracks[track_id]
+        body = {'track_id': track_id, 'band_id': band_id, 'title': 'Track %d' % track_id, 'duration': 180.0,
+                'release_date': self.release_dates.get(track_id, 1300000000)}
+        if album_id is not None:
+            body['album_id'] = album_id
+
+        return body
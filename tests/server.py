@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""A local HTTP server that answers API requests with the files in tests/json"""
+import gzip
+import os
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+JSON_DIR = os.path.join(os.path.dirname(__file__), 'json')
+
+# Path of an endpoint -> (file for a single item, file for a batch request)
+FIXTURES = {
+    '/api/track/3/info': ('test_single_track', 'test_multiple_tracks'),
+    '/api/album/2/info': ('test_album', 'test_album'),
+    '/api/band/3/info': ('test_single_band', 'test_multiple_bands'),
+    '/api/band/3/search': ('test_search_mumble', 'test_search_multiple'),
+    '/api/band/3/discography': ('test_single_discography', 'test_multiple_discographies'),
+    '/api/url/1/info': ('test_album_url', 'test_album_url'),
+}
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, with Nagle's algorithm the body waits for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        self.server.requests.append(self.path)
+
+        if parts.path not in FIXTURES:
+            self.send_error(404)
+            return
+
+        parameters = dict(parse_qsl(parts.query))
+        single, batch = FIXTURES[parts.path]
+        is_batch = any(',' in value for name, value in parameters.items() if name != 'key')
+
+        encoding = self.server.compression
+        if encoding is None or encoding not in self.headers.get('Accept-Encoding', ''):
+            encoding = None
+
+        name = batch if is_batch else single
+        body = self.server.get_fixture(name, encoding=encoding)
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        # The fixtures never change, so their name is a valid entity tag
+        etag = '"%s"' % name
+        if self.headers.get('If-None-Match', None) == etag:
+            # Like most servers, without a Content-Length
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        if encoding is not None:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """Serve the fixtures on a random local port from a background thread
+
+    Use it as a context manager, the base url is available as server.url
+    latency delays every response by that many seconds, payload_size pads every body with whitespace
+    to at least that many bytes. compression is 'gzip' or 'deflate', it is used if the client accepts it.
+    Every response has an ETag, a request with a matching If-None-Match gets 304 Not Modified.
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, payload_size=0, compression=None):
+        super().__init__((host, port), FixtureRequestHandler)
+        self.latency = latency
+        self.payload_size = payload_size
+        self.compression = compression
+        self.connections = 0
+        self.requests = []
+        self._fixtures = {}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def get_fixture(self, name, encoding=None):
+        if (name, encoding) not in self._fixtures:
+            with open(os.path.join(JSON_DIR, name), 'rb') as f:
+                body = f.read().ljust(self.payload_size, b' ')
+
+            if encoding == 'gzip':
+                body = gzip.compress(body)
+            elif encoding == 'deflate':
+                body = zlib.compress(body)
+
+            self._fixtures[name, encoding] = body
+
+        return self._fixtures[name, encoding]
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
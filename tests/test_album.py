@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import time
 import unittest
+from unittest import mock
 
 import bandcamp
 
@@ -46,6 +47,36 @@ class TestAlbum(unittest.TestCase):
         self.assertEqual(5, album.tracks[4].number)
         self.assertEqual(6, album.tracks[5].number)
 
+    def test_tracks_are_memoized(self):
+        """Verify that the tracks are created once and only when they are accessed"""
+        api = bandcamp.TestApi('test_album_tpwg')
+        album = bandcamp.album.info(api=api, album_id=2587417518)
+
+        self.assertIs(album.tracks, album.tracks)
+        self.assertIs(album.tracks[1], album.tracks[1])
+
+        track_factory = mock.Mock(wraps=bandcamp.track.Track)
+        tracks = bandcamp.album.TrackList(track_bodies=album.album_body['tracks'], track_factory=track_factory)
+        tracks[1]
+        tracks[1]
+        tracks.by_number(2)
+
+        self.assertEqual(1, track_factory.call_count)
+
+    def test_tracks_lookup(self):
+        """Verify that tracks can be looked up by track id and track number"""
+        api = bandcamp.TestApi('test_album_tpwg')
+        album = bandcamp.album.info(api=api, album_id=2587417518)
+
+        third = album.tracks[2]
+
+        self.assertIs(third, album.tracks.by_number(3))
+        self.assertIs(third, album.tracks.by_id(third.track_id))
+        self.assertEqual([4, 5, 6], [track.number for track in album.tracks[3:]])
+
+        with self.assertRaises(KeyError):
+            album.tracks.by_number(7)
+
     def test_title_property(self):
         album_id = 2587417518
 
@@ -133,3 +164,38 @@ class TestAlbum(unittest.TestCase):
         album = bandcamp.album.info(api=api, album_id=album_id)
 
         self.assertEqual(3463798201, album.band_id)
+
+    def test_info_many(self):
+        """Verify that several albums can be fetched at once"""
+        album_ids = [2587417518, 927252583, 1163674320]
+
+        api = bandcamp.TestApi('test_album')
+        albums = bandcamp.album.info_many(api=api, album_ids=album_ids, max_workers=2)
+
+        self.assertEqual(set(album_ids), set(albums))
+        self.assertIsInstance(albums[927252583], bandcamp.album.Album)
+
+    def test_iter_info_captures_errors(self):
+        """Verify that a failing album does not abort the others"""
+        album_ids = [2587417518, 927252583, 1163674320]
+
+        api = bandcamp.TestApi('test_album')
+        original_request = api.transport.request
+
+        def request(url, headers=None):
+            if '927252583' in url:
+                raise OSError('Connection reset by peer')
+
+            return original_request(url, headers=headers)
+
+        with mock.patch.object(api.transport, 'request', side_effect=request):
+            results = dict(bandcamp.album.iter_info(api=api, album_ids=album_ids))
+
+            with self.assertRaises(OSError):
+                bandcamp.album.info_many(api=api, album_ids=album_ids)
+
+            albums = bandcamp.album.info_many(api=api, album_ids=album_ids, partial=True)
+
+        self.assertIsInstance(results[927252583], OSError)
+        self.assertIsInstance(results[2587417518], bandcamp.album.Album)
+        self.assertEqual({2587417518, 1163674320}, set(albums))
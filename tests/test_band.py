@@ -1,8 +1,34 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import json
 import unittest
 import time
+from unittest import mock
+from urllib.parse import parse_qsl, urlsplit
 
 import bandcamp
+from bandcamp.transport import AsyncTransport, Response, Transport
+
+
+class EchoTransport(Transport):
+    """Answer track and album info requests with a minimal body for every requested id"""
+
+    def __init__(self):
+        self.urls = []
+
+    def request(self, url, headers=None):
+        self.urls.append(url)
+        parameters = dict(parse_qsl(urlsplit(url).query))
+
+        if 'album_id' in parameters:
+            body = {'album_id': int(parameters['album_id']), 'tracks': []}
+        else:
+            track_ids = parameters['track_id'].split(',')
+            body = {track_id: {'track_id': int(track_id)} for track_id in track_ids}
+            if len(track_ids) == 1:
+                body = body[track_ids[0]]
+
+        return Response(status=200, headers={}, body=json.dumps(body).encode('utf-8'))
 
 
 class TestBand(unittest.TestCase):
@@ -80,13 +106,45 @@ class TestBand(unittest.TestCase):
         self.assertEqual(96, len(bands))
 
     def test_search_more_than_twelve(self):
-        """Verify that we raise an error when you try to search for more than 12 names"""
+        """Verify that an error of the API is raised when searching for more than 12 names"""
         name = ['1', '2', '3', '4', '5', '6', '7', '8', '9', '10', '11', '12', '13']
 
         api = bandcamp.TestApi('test_search_thirteen')
         with self.assertRaises(ValueError):
             bandcamp.band.search(api=api, name=name)
 
+    def test_search_is_split(self):
+        """Verify that more than 12 names are split into several requests and merged"""
+        name = [str(number) for number in range(30)]
+
+        api = bandcamp.TestApi('test_search_twelve')
+        with mock.patch.object(api.transport, 'request', wraps=api.transport.request) as request:
+            bands = bandcamp.band.search(api=api, name=name)
+
+        self.assertEqual(3, request.call_count)
+        self.assertEqual(96, len(bands))
+
+    def test_search_bulk_keeps_shape(self):
+        """Verify that a bulk search returns a mapping even for a single band"""
+        name = ['Mumble'] * 13
+
+        api = bandcamp.TestApi('test_search_mumble')
+        bands = bandcamp.band.search(api=api, name=name)
+
+        self.assertIsInstance(bands, dict)
+        self.assertEqual(1, len(bands))
+
+    def test_search_many(self):
+        """Verify that every name is mapped to the bands it matched"""
+        api = bandcamp.TestApi('test_search_multiple')
+        matches = bandcamp.band.search_many(api=api, name=['LapFoxTrax', 'aviators', 'nobody'])
+
+        self.assertEqual({'LapFoxTrax', 'aviators', 'nobody'}, set(matches))
+        self.assertEqual({}, matches['nobody'])
+        for name in ('LapFoxTrax', 'aviators'):
+            self.assertTrue(matches[name])
+            self.assertTrue(all(band.name.casefold() == name.casefold() for band in matches[name].values()))
+
     def test_single_band_discography(self):
         """Verify that we can look up the discography of a single band"""
         band_id = 203035041
@@ -111,6 +169,29 @@ class TestBand(unittest.TestCase):
         self.assertIsInstance(discographies[3463798201], bandcamp.band.Discography)
         self.assertIsInstance(discographies[203035041], bandcamp.band.Discography)
 
+    def test_many_band_discographies(self):
+        """Verify that the discographies of too many bands are fetched in several requests"""
+        band_ids = [3463798201, 203035041] + list(range(1000000000, 1000000300))
+
+        api = bandcamp.TestApi('test_multiple_discographies')
+        discographies = bandcamp.band.discography(api=api, band_id=band_ids)
+
+        self.assertEqual(2, len(discographies))
+        self.assertIsInstance(discographies[3463798201], bandcamp.band.Discography)
+        self.assertIsInstance(discographies[203035041], bandcamp.band.Discography)
+
+    def test_partial_single_batch(self):
+        """Verify that partial=True also applies when all ids fit into one request"""
+        api = bandcamp.TestApi('test_single_discography')
+
+        discographies = bandcamp.band.discography(api=api, band_id=203035041, partial=True)
+        self.assertIsInstance(discographies[203035041], bandcamp.band.Discography)
+
+        with mock.patch.object(api.transport, 'request', side_effect=OSError('Connection refused')):
+            self.assertEqual({}, bandcamp.band.discography(api=api, band_id=203035041, partial=True))
+            self.assertEqual({}, bandcamp.band.info(api=api, band_id=[3463798201, 203035041], partial=True))
+            self.assertEqual({}, bandcamp.band.search(api=api, name='mumble', partial=True))
+
     def test_subdomain_property(self):
         band_id = 3463798201
 
@@ -267,4 +348,78 @@ class TestDiscographyAlbum(unittest.TestCase):
 
         album = discography.albums[4246425639]
 
-        self.assertEqual(4246425639, album.album_id)
\ No newline at end of file
+        self.assertEqual(4246425639, album.album_id)
+
+
+class TestHydration(unittest.TestCase):
+    """Test turning discography items into full albums and tracks"""
+
+    def get_discography(self):
+        api = bandcamp.TestApi('test_multiple_discographies')
+        return bandcamp.band.discography(api=api, band_id=[3463798201, 203035041])[3463798201]
+
+    def test_hydrate_album(self):
+        """Verify that an album is fetched once"""
+        transport = EchoTransport()
+        api = bandcamp.Api(api_key=None, transport=transport)
+        item = self.get_discography().albums[2587417518]
+
+        album = item.hydrate(api=api)
+
+        self.assertIsInstance(album, bandcamp.album.Album)
+        self.assertEqual(2587417518, album.album_id)
+        self.assertIs(album, item.hydrate(api=api))
+        self.assertEqual(1, len(transport.urls))
+
+    def test_hydrate_track(self):
+        transport = EchoTransport()
+        api = bandcamp.Api(api_key=None, transport=transport)
+        item = self.get_discography().tracks[827639211]
+
+        self.assertEqual(827639211, item.hydrate(api=api).track_id)
+
+    def test_hydrate_async(self):
+        """Verify that an AsyncApi hydrates an item once and the result can be awaited again"""
+        transport = EchoTransport()
+
+        class AsyncEchoTransport(AsyncTransport):
+            async def request(self, url, headers=None):
+                return transport.request(url, headers=headers)
+
+        api = bandcamp.AsyncApi(api_key=None, transport=AsyncEchoTransport())
+        discography = self.get_discography()
+
+        async def hydrate():
+            album_item, track_item = discography.albums[2587417518], discography.tracks[827639211]
+            return [await album_item.hydrate(api=api), await album_item.hydrate(api=api),
+                    await track_item.hydrate(api=api), await track_item.hydrate(api=api)]
+
+        first_album, second_album, first_track, second_track = asyncio.run(hydrate())
+
+        self.assertEqual(2587417518, first_album.album_id)
+        self.assertIs(first_album, second_album)
+        self.assertIs(first_track, second_track)
+        self.assertEqual(2, len(transport.urls))
+
+        with self.assertRaises(TypeError):
+            discography.hydrate_all(api=api)
+
+    def test_hydrate_all(self):
+        """Verify that tracks are fetched in one batch, albums one by one and nothing twice"""
+        transport = EchoTransport()
+        api = bandcamp.Api(api_key=None, transport=transport)
+        discography = self.get_discography()
+        discography.albums[2587417518].hydrate(api=api)
+
+        hydrated = discography.hydrate_all(api=api)
+
+        self.assertEqual(set(discography.albums), set(hydrated.albums))
+        self.assertEqual(set(discography.tracks), set(hydrated.tracks))
+        self.assertTrue(all(isinstance(album, bandcamp.album.Album) for album in hydrated.albums.values()))
+        self.assertTrue(all(isinstance(track, bandcamp.track.Track) for track in hydrated.tracks.values()))
+
+        # One album request before, one batch of tracks and one request for each other album
+        self.assertEqual(1 + 1 + len(discography.albums) - 1, len(transport.urls))
+
+        discography.hydrate_all(api=api)
+        self.assertEqual(len(discography.albums) + 1, len(transport.urls))
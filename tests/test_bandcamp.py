@@ -1,8 +1,14 @@
 #!/usr/bin/env python
 # -*- coding: UTF-8 -*-
+import asyncio
+import os
 import unittest
+from unittest import mock
 
 import bandcamp
+from bandcamp.transport import AsyncFileTransport, AsyncPooledTransport
+
+from .server import FixtureServer
 
 
 class TestApiObject(unittest.TestCase):
@@ -41,5 +47,89 @@ class TestApiObject(unittest.TestCase):
         self.assertEqual(encoded_url, api.get_encoded_url(url=url, parameters=parameters))
 
 
+    def test_json_from_bytes(self):
+        """Verify that bytes and memoryviews are decoded with and without orjson"""
+        body = '{"title": "Gefühl", "band_id": 1}'.encode('utf-8')
+
+        for orjson in (bandcamp.commons.orjson, None):
+            with mock.patch('bandcamp.commons.orjson', orjson):
+                for content in (body, memoryview(body), body.decode('utf-8')):
+                    self.assertEqual({'title': 'Gefühl', 'band_id': 1}, bandcamp.Api.process_json_string(content))
+
+    def test_error_without_message(self):
+        self.assertRaises(ValueError, bandcamp.Api.process_json_string, b'{"error": true}')
+
+    def test_pluggable_json_decoder(self):
+        """Verify that the response body is handed to json_loads as it is"""
+        bodies = []
+
+        def json_loads(body):
+            bodies.append(body)
+            return {'band_id': 4214473200}
+
+        api = bandcamp.TestApi('test_band_url')
+        api.json_loads = json_loads
+
+        self.assertEqual(4214473200, bandcamp.url.info(api=api, url='cults.bandcamp.com').band_id)
+        self.assertIsInstance(bodies[0], bytes)
+
+
+class TestAsyncApiObject(unittest.IsolatedAsyncioTestCase):
+    """Test the AsyncApi class"""
+
+    def get_api(self, response_file_name):
+        file_path = os.path.join(bandcamp.TestApi.JSON_DIR, response_file_name)
+        return bandcamp.AsyncApi(api_key=None, transport=AsyncFileTransport(file_path=file_path))
+
+    async def test_track_info(self):
+        """Verify that the module level functions can be awaited"""
+        api = self.get_api('test_single_track')
+        track = await bandcamp.track.info(api=api, track_id=1269403107)
+
+        self.assertIsInstance(track, bandcamp.track.Track)
+        self.assertEqual(1269403107, track.track_id)
+
+    async def test_band_discography(self):
+        """Verify that batch responses are parsed like with the Api object"""
+        api = self.get_api('test_multiple_discographies')
+        discographies = await bandcamp.band.discography(api=api, band_id=[3463798201, 203035041])
+
+        self.assertIsInstance(discographies[203035041], bandcamp.band.Discography)
+
+    async def test_url_info(self):
+        api = self.get_api('test_album_url')
+        response = await bandcamp.url.info(api=api, url='lapfoxtrax.com/album/--2')
+
+        self.assertEqual(1163674320, response.album_id)
+
+    async def test_album_iter_info(self):
+        """Verify that iter_info is an async generator with an AsyncApi object"""
+        api = self.get_api('test_album')
+        albums = [item async for item in bandcamp.album.iter_info(api=api, album_ids=[2587417518, 927252583])]
+
+        self.assertEqual({2587417518, 927252583}, {album_id for album_id, album in albums})
+
+    async def test_error_response(self):
+        """Verify that API errors are raised"""
+        api = self.get_api('test_search_thirteen')
+
+        with self.assertRaises(ValueError):
+            await bandcamp.band.search(api=api, name=[str(number) for number in range(13)])
+
+    async def test_pooled_transport(self):
+        """Verify that concurrent requests over the network share pooled connections"""
+        with FixtureServer() as server:
+            transport = AsyncPooledTransport(max_connections=4)
+            api = bandcamp.AsyncApi(api_key=None, transport=transport)
+
+            urls = [server.url + '/api/album/2/info?album_id=2587417518'] * 20
+            responses = await asyncio.gather(*(transport.request(url) for url in urls))
+            await api.close()
+
+        self.assertTrue(all(response.status == 200 for response in responses))
+        self.assertEqual(20, len(server.requests))
+        self.assertLessEqual(server.connections, 4)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from benchmarks import run
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Test the benchmark suite"""
+
+    def test_run(self):
+        """Verify that every endpoint, fixture and model is measured"""
+        results = run.run(iterations=2, batch_size=2, payload_size=4096)
+
+        self.assertEqual(12, len(results['endpoints']))
+        self.assertEqual(8, len(results['models']))
+        self.assertTrue(all(values['p99_ms'] >= values['p50_ms'] for values in results['endpoints'].values()))
+        self.assertEqual([], run.compare(results, results))
+
+    def test_compare(self):
+        old = {'models': {'track/default': {'mean_us': 10.0}}, 'endpoints': {'band.info/single': {'p50_ms': 1.0}}}
+        new = {'models': {'track/default': {'mean_us': 12.0}}, 'endpoints': {'band.info/single': {'p50_ms': 1.05}}}
+
+        self.assertEqual([('models/track/default/mean_us', 10.0, 12.0)], run.compare(old, new, threshold=0.1))
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(50, run.percentile(values, 0.5))
+        self.assertEqual(99, run.percentile(values, 0.99))
+        self.assertEqual(1, run.percentile([1], 0.99))
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+import bandcamp
+from bandcamp.cache import MemoryCache, SQLiteCache, Validators
+from bandcamp.transport import Response, Transport
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingTransport(Transport):
+    def __init__(self, body):
+        self.body = body
+        self.calls = 0
+
+    def request(self, url, headers=None):
+        self.calls += 1
+        return Response(status=200, headers={}, body=self.body)
+
+
+class ConditionalTransport(Transport):
+    """Answers with an ETag and with 304 Not Modified if the client already has the current body"""
+
+    def __init__(self, body, etag):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+
+    def request(self, url, headers=None):
+        headers = headers or {}
+        self.requests.append(headers)
+
+        if headers.get('If-None-Match', None) == self.etag:
+            return Response(status=304, headers={'ETag': self.etag}, body=b'')
+
+        return Response(status=200, headers={'ETag': self.etag}, body=self.body)
+
+
+class TestMemoryCache(unittest.TestCase):
+    """Test the in-memory response cache"""
+
+    def test_hit_and_miss_counters(self):
+        """Verify that hits and misses are counted"""
+        cache = MemoryCache()
+
+        self.assertIsNone(cache.get('http://api.bandcamp.com/api/url/1/info?url=a'))
+        cache.set('http://api.bandcamp.com/api/url/1/info?url=a', {'band_id': 1})
+
+        self.assertEqual({'band_id': 1}, cache.get('http://api.bandcamp.com/api/url/1/info?url=a'))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_lru_eviction(self):
+        """Verify that the least recently used entry is evicted first"""
+        cache = MemoryCache(max_size=2)
+
+        cache.set('http://example.com/a', 'a')
+        cache.set('http://example.com/b', 'b')
+        cache.get('http://example.com/a')
+        cache.set('http://example.com/c', 'c')
+
+        self.assertEqual(2, len(cache))
+        self.assertEqual('a', cache.get('http://example.com/a'))
+        self.assertIsNone(cache.get('http://example.com/b'))
+        self.assertEqual('c', cache.get('http://example.com/c'))
+
+    def test_endpoint_ttls(self):
+        """Verify that every endpoint expires after its own time to live"""
+        clock = FakeClock()
+        cache = MemoryCache(ttl=10, clock=clock, endpoint_ttls={bandcamp.band.BASE_URL_INFO: 100,
+                                                                bandcamp.band.BASE_URL_DISCOGRAPHY: 5})
+
+        info_url = bandcamp.band.BASE_URL_INFO + '?band_id=1'
+        discography_url = bandcamp.band.BASE_URL_DISCOGRAPHY + '?band_id=1'
+        album_url = bandcamp.album.BASE_URL_INFO + '?album_id=1'
+
+        cache.set(info_url, 'info')
+        cache.set(discography_url, 'discography')
+        cache.set(album_url, 'album')
+
+        clock.now = 7
+        self.assertEqual('info', cache.get(info_url))
+        self.assertIsNone(cache.get(discography_url))
+        self.assertEqual('album', cache.get(album_url))
+
+        clock.now = 50
+        self.assertEqual('info', cache.get(info_url))
+        self.assertIsNone(cache.get(album_url))
+
+    def test_stale_entries(self):
+        """Verify that expired entries with validators are kept for revalidation until stale_ttl passed"""
+        clock = FakeClock()
+        cache = MemoryCache(ttl=10, stale_ttl=100, clock=clock, endpoint_ttls={})
+
+        cache.set('http://example.com/a', 'a', validators=Validators(etag='"1"', last_modified=None))
+        cache.set('http://example.com/b', 'b')
+
+        clock.now = 11
+        self.assertIsNone(cache.get('http://example.com/a'))
+        self.assertIsNone(cache.get('http://example.com/b'))
+        self.assertEqual(('a', ('"1"', None)), cache.get_stale('http://example.com/a'))
+        self.assertIsNone(cache.get_stale('http://example.com/b'))
+        self.assertEqual(1, len(cache))
+
+        cache.refresh('http://example.com/a')
+        self.assertEqual('a', cache.get('http://example.com/a'))
+        self.assertEqual(1, cache.revalidations)
+
+        clock.now = 200
+        self.assertIsNone(cache.get('http://example.com/a'))
+        self.assertIsNone(cache.get_stale('http://example.com/a'))
+        self.assertEqual(0, len(cache))
+
+
+class TestSQLiteCache(unittest.TestCase):
+    """Test the persistent SQLite response cache"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache.sqlite')
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get_cache(self):
+        cache = SQLiteCache(self.path, compaction_interval=None, ttl=10, endpoint_ttls={}, clock=self.clock)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_shared_between_instances(self):
+        """Verify that a second cache on the same file sees the stored responses"""
+        self.get_cache().set('http://api.bandcamp.com/api/url/1/info?url=a', {'band_id': 1})
+
+        self.assertEqual({'band_id': 1}, self.get_cache().get('http://api.bandcamp.com/api/url/1/info?url=a'))
+
+    def test_normalized_parameters(self):
+        """Verify that the parameter order and the api key do not matter"""
+        cache = self.get_cache()
+        cache.set('http://api.bandcamp.com/api/band/3/search?name=a&key=secret', {'results': []})
+
+        self.assertEqual({'results': []}, cache.get('http://api.bandcamp.com/api/band/3/search?key=other&name=a'))
+
+    def test_expiry_and_compaction(self):
+        """Verify that expired rows are not returned and are purged by compact"""
+        cache = self.get_cache()
+        cache.set('http://api.bandcamp.com/api/url/1/info?url=a', {'band_id': 1})
+
+        self.clock.now = 11
+        self.assertIsNone(cache.get('http://api.bandcamp.com/api/url/1/info?url=a'))
+        self.assertEqual(1, cache.compact())
+        self.assertEqual(0, cache.compact())
+
+    def test_stale_entries(self):
+        """Verify that rows with validators can be revalidated and are only purged after stale_ttl"""
+        cache = self.get_cache()
+        cache.stale_ttl = 100
+        cache.set('http://api.bandcamp.com/api/url/1/info?url=a', {'band_id': 1},
+                  validators=Validators(etag=None, last_modified='Wed, 21 Oct 2015 07:28:00 GMT'))
+
+        self.clock.now = 11
+        self.assertIsNone(cache.get('http://api.bandcamp.com/api/url/1/info?url=a'))
+        self.assertEqual(0, cache.compact())
+        self.assertEqual(({'band_id': 1}, (None, 'Wed, 21 Oct 2015 07:28:00 GMT')),
+                         cache.get_stale('http://api.bandcamp.com/api/url/1/info?url=a'))
+
+        cache.refresh('http://api.bandcamp.com/api/url/1/info?url=a', validators=Validators('"2"', None))
+        self.assertEqual({'band_id': 1}, cache.get('http://api.bandcamp.com/api/url/1/info?url=a'))
+
+        self.clock.now = 100
+        self.assertEqual('"2"', cache.get_stale('http://api.bandcamp.com/api/url/1/info?url=a')[1].etag)
+
+        self.clock.now = 300
+        self.assertIsNone(cache.get_stale('http://api.bandcamp.com/api/url/1/info?url=a'))
+        self.assertEqual(1, cache.compact())
+
+    def test_file_without_validators(self):
+        """Verify that a file written before validators were stored gets their columns"""
+        connection = sqlite3.connect(self.path)
+        with connection:
+            connection.execute('CREATE TABLE responses (endpoint TEXT NOT NULL, parameters TEXT NOT NULL, '
+                               'body TEXT NOT NULL, expires REAL NOT NULL, PRIMARY KEY (endpoint, parameters))')
+            connection.execute("INSERT INTO responses VALUES ('http://api.bandcamp.com/api/url/1/info', 'url=a', "
+                               "'{\"band_id\": 1}', 10)")
+        connection.close()
+
+        cache = self.get_cache()
+        self.assertEqual({'band_id': 1}, cache.get('http://api.bandcamp.com/api/url/1/info?url=a'))
+
+        cache.set('http://api.bandcamp.com/api/url/1/info?url=b', {'band_id': 2}, validators=Validators('"1"', None))
+        self.clock.now = 11
+        self.assertIsNotNone(cache.get_stale('http://api.bandcamp.com/api/url/1/info?url=b'))
+
+    def test_counters_from_threads(self):
+        """Verify that no hit or miss is lost when several threads share the cache"""
+        cache = self.get_cache()
+        cache.set('http://api.bandcamp.com/api/url/1/info?url=a', {'band_id': 1})
+
+        def lookup():
+            for _ in range(100):
+                cache.get('http://api.bandcamp.com/api/url/1/info?url=a')
+                cache.get('http://api.bandcamp.com/api/url/1/info?url=b')
+
+        threads = [threading.Thread(target=lookup) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual((800, 800), (cache.hits, cache.misses))
+
+    def test_compactor_closes_its_connection(self):
+        """Verify that the compaction thread closes its own connection when the cache is closed"""
+        compacted = threading.Event()
+        closed = []
+
+        class RecordingCache(SQLiteCache):
+            def compact(self):
+                try:
+                    return super().compact()
+                finally:
+                    compacted.set()
+
+            def _close_connection(self):
+                if getattr(self._local, 'connection', None) is not None:
+                    closed.append(threading.current_thread().name)
+                super()._close_connection()
+
+        cache = RecordingCache(self.path, compaction_interval=0.01)
+        self.assertTrue(compacted.wait(5))
+        cache.close()
+
+        self.assertIn('bandcamp-cache-compaction', closed)
+        self.assertFalse(cache._compactor.is_alive())
+
+
+class TestApiCache(unittest.TestCase):
+    """Test that the Api object uses its cache"""
+
+    def test_repeated_request_is_cached(self):
+        """Verify that a repeated lookup does not hit the network again"""
+        transport = CountingTransport(b'{"band_id": 4214473200}')
+        api = bandcamp.Api(api_key=None, cache=MemoryCache(), transport=transport)
+
+        first = bandcamp.url.info(api=api, url='cults.bandcamp.com')
+        second = bandcamp.url.info(api=api, url='cults.bandcamp.com')
+
+        self.assertEqual(1, transport.calls)
+        self.assertEqual(first, second)
+        self.assertEqual(1, api.cache.hits)
+
+    def test_revalidation(self):
+        """Verify that an expired response is revalidated and a 304 answer is not decoded again"""
+        clock = FakeClock()
+        decoded = []
+
+        def json_loads(body):
+            decoded.append(body)
+            return bandcamp.commons.loads(body)
+
+        transport = ConditionalTransport(b'{"band_id": 4214473200}', etag='"v1"')
+        api = bandcamp.Api(api_key=None, cache=MemoryCache(ttl=10, endpoint_ttls={}, clock=clock),
+                           transport=transport, json_loads=json_loads)
+
+        first = bandcamp.url.info(api=api, url='cults.bandcamp.com')
+        clock.now = 11
+        second = bandcamp.url.info(api=api, url='cults.bandcamp.com')
+        third = bandcamp.url.info(api=api, url='cults.bandcamp.com')
+
+        self.assertEqual(first, second)
+        self.assertEqual(first, third)
+        self.assertEqual(2, len(transport.requests))
+        self.assertNotIn('If-None-Match', transport.requests[0])
+        self.assertEqual('"v1"', transport.requests[1]['If-None-Match'])
+        self.assertEqual(1, len(decoded))
+        self.assertEqual(1, api.cache.revalidations)
+
+    def test_changed_response(self):
+        """Verify that a response that changed since it was cached replaces the cache entry"""
+        clock = FakeClock()
+        transport = ConditionalTransport(b'{"band_id": 1}', etag='"v1"')
+        api = bandcamp.Api(api_key=None, cache=MemoryCache(ttl=10, endpoint_ttls={}, clock=clock),
+                           transport=transport)
+
+        bandcamp.url.info(api=api, url='cults.bandcamp.com')
+        transport.body, transport.etag = b'{"band_id": 2}', '"v2"'
+        clock.now = 11
+
+        self.assertEqual(2, bandcamp.url.info(api=api, url='cults.bandcamp.com').band_id)
+
+        clock.now = 22
+        self.assertEqual(2, bandcamp.url.info(api=api, url='cults.bandcamp.com').band_id)
+        self.assertEqual('"v2"', transport.requests[2]['If-None-Match'])
+        self.assertEqual(1, api.cache.revalidations)
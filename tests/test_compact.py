@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import bandcamp
+from bandcamp.compact import (CompactAlbum, CompactBand, CompactDiscographyAlbum, CompactDiscographyTrack,
+                              CompactTrack, TRACK_FIELDS, ALBUM_FIELDS, BAND_FIELDS, DISCOGRAPHY_ALBUM_FIELDS)
+
+
+def get_api(response_file_name, **kwargs):
+    api = bandcamp.TestApi(response_file_name)
+    api.models = bandcamp.compact.models(**kwargs)
+    return api
+
+
+class TestCompactModels(unittest.TestCase):
+    """Test the compact model classes"""
+
+    def assertSameFields(self, fields, expected, actual):
+        for name, _ in fields:
+            self.assertEqual(getattr(expected, name), getattr(actual, name), name)
+
+    def test_track(self):
+        """Verify that a compact track has the same values as a Track"""
+        track = bandcamp.track.info(api=bandcamp.TestApi('test_single_track'), track_id=1269403107)
+        compact_track = bandcamp.track.info(api=get_api('test_single_track'), track_id=1269403107)
+
+        self.assertIsInstance(compact_track, CompactTrack)
+        self.assertSameFields(TRACK_FIELDS, track, compact_track)
+
+    def test_no_instance_dict(self):
+        """Verify that compact objects do not carry a __dict__ or the response by default"""
+        compact_track = bandcamp.track.info(api=get_api('test_single_track'), track_id=1269403107)
+
+        self.assertFalse(hasattr(compact_track, '__dict__'))
+        self.assertIsNone(compact_track.track_body)
+
+    def test_keep_body(self):
+        """Verify that the response can be kept"""
+        compact_track = bandcamp.track.info(api=get_api('test_single_track', keep_body=True), track_id=1269403107)
+
+        self.assertEqual(1269403107, compact_track.track_body['track_id'])
+
+    def test_album(self):
+        """Verify that a compact album has the same values and tracks as an Album"""
+        album = bandcamp.album.info(api=bandcamp.TestApi('test_album_tpwg'), album_id=2587417518)
+        compact_album = bandcamp.album.info(api=get_api('test_album_tpwg'), album_id=2587417518)
+
+        self.assertIsInstance(compact_album, CompactAlbum)
+        self.assertSameFields(ALBUM_FIELDS, album, compact_album)
+
+        self.assertEqual(len(album.tracks), len(compact_album.tracks))
+        for track, compact_track in zip(album.tracks, compact_album.tracks):
+            self.assertSameFields(TRACK_FIELDS, track, compact_track)
+
+        for track in album.tracks:
+            self.assertEqual(track.track_id, compact_album.tracks.by_id(track.track_id).track_id)
+            self.assertEqual(track.track_id, compact_album.tracks.by_number(track.number).track_id)
+
+        with self.assertRaises(KeyError):
+            compact_album.tracks.by_number(100)
+
+    def test_bands(self):
+        """Verify that batch responses create compact bands"""
+        bands = bandcamp.band.info(api=bandcamp.TestApi('test_multiple_bands'), band_id=[3789714150, 4214473200])
+        compact_bands = bandcamp.band.info(api=get_api('test_multiple_bands'), band_id=[3789714150, 4214473200])
+
+        self.assertEqual(set(bands), set(compact_bands))
+        for band_id, band in bands.items():
+            self.assertIsInstance(compact_bands[band_id], CompactBand)
+            self.assertSameFields(BAND_FIELDS, band, compact_bands[band_id])
+
+    def test_discography(self):
+        """Verify that discography items are compact"""
+        discography = bandcamp.band.discography(api=get_api('test_single_discography'), band_id=203035041)
+
+        album = discography.albums[4246425639]
+        self.assertIsInstance(album, CompactDiscographyAlbum)
+        self.assertEqual('The Age of Adz', album.title)
+        self.assertFalse(hasattr(album, 'tracks'))
+
+        expected = bandcamp.band.discography(api=bandcamp.TestApi('test_single_discography'), band_id=203035041)
+        self.assertSameFields(DISCOGRAPHY_ALBUM_FIELDS, expected.albums[4246425639], album)
+
+    def test_discography_track(self):
+        """Verify that discography tracks are compact"""
+        discographies = bandcamp.band.discography(api=get_api('test_multiple_discographies'),
+                                                  band_id=[3463798201, 203035041])
+
+        tracks = [track for discography in discographies.values() for track in discography.tracks.values()]
+        self.assertTrue(all(isinstance(track, CompactDiscographyTrack) for track in tracks))
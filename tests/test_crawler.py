@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import bandcamp
+from bandcamp.crawler import Crawler
+
+from .catalog import CatalogTransport
+
+CATALOG = {
+    1: {'albums': {11: [111, 112], 12: [121]}, 'tracks': [101]},
+    2: {'albums': {21: [211]}, 'tracks': []},
+    3: {'albums': {}, 'tracks': [301, 302]},
+}
+
+
+def summarize(items):
+    return sorted((type(item).__name__, getattr(item, 'track_id', None) or getattr(item, 'album_id', None)
+                   or item.band_id) for item in items)
+
+
+class TestCrawler(unittest.TestCase):
+    """Test the catalog crawler"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.checkpoint_path = os.path.join(self.directory.name, 'crawl.json')
+
+    def get_crawler(self, **kwargs):
+        self.transport = CatalogTransport(CATALOG)
+        api = bandcamp.Api(api_key=None, transport=self.transport)
+
+        return Crawler(api=api, checkpoint_path=self.checkpoint_path, band_batch_size=2, album_batch_size=2,
+                       track_batch_size=2, **kwargs)
+
+    def test_crawl(self):
+        """Verify that bands, albums and tracks are all yielded once"""
+        progress = []
+        items = list(self.get_crawler(on_progress=progress.append).crawl(seeds=[1, 2, 'band-3.bandcamp.com']))
+
+        expected = [('Band', 1), ('Band', 2), ('Band', 3)]
+        expected += [('Album', album_id) for content in CATALOG.values() for album_id in content['albums']]
+        expected += [('Track', track_id) for content in CATALOG.values() for track_ids in content['albums'].values()
+                     for track_id in track_ids]
+        expected += [('Track', track_id) for content in CATALOG.values() for track_id in content['tracks']]
+
+        self.assertEqual(sorted(expected), summarize(items))
+
+        self.assertEqual(0, progress[-1].pending_bands + progress[-1].pending_albums + progress[-1].pending_tracks)
+        self.assertEqual(3, progress[-1].bands)
+        self.assertEqual(0, progress[-1].errors)
+
+    def test_resume(self):
+        """Verify that an interrupted crawl continues from the checkpoint"""
+        crawler = self.get_crawler()
+        first_items = []
+
+        for item in crawler.crawl(seeds=[1, 2, 3]):
+            first_items.append(item)
+            if isinstance(item, bandcamp.album.Album):
+                break
+
+        # The interrupted step is done again, but the bands are not
+        resumed = self.get_crawler()
+        second_items = list(resumed.crawl())
+
+        self.assertFalse(any(isinstance(item, bandcamp.band.Band) for item in second_items))
+        self.assertFalse(any('/band/' in _url for _url in self.transport.urls))
+
+        # 3 bands, 3 albums, 4 tracks on albums and 3 tracks that are not on an album
+        self.assertEqual(13, len(set(summarize(first_items + second_items))))
+
+        # A finished crawl does not crawl known bands again
+        self.assertEqual([], list(self.get_crawler().crawl(seeds=[1])))
+
+    def test_failures_are_recorded(self):
+        """Verify that ids that can not be fetched are counted and not retried"""
+        crawler = self.get_crawler()
+        original_get_album = self.transport.get_album
+
+        def get_album(album_id):
+            if album_id == 21:
+                raise OSError('Connection reset by peer')
+
+            return original_get_album(album_id)
+
+        self.transport.get_album = get_album
+        list(crawler.crawl(seeds=[1, 2, 3]))
+
+        self.assertEqual({21}, crawler.failed['albums'])
+        self.assertEqual(1, crawler.stats.errors)
+
+    def test_failed_band(self):
+        """Verify that a band that can not be fetched only fails itself and is not retried on resume"""
+        crawler = self.get_crawler()
+        original_get_band = self.transport.get_band
+
+        def get_band(band_id):
+            if band_id == 2:
+                raise KeyError(band_id)
+
+            return original_get_band(band_id)
+
+        self.transport.get_band = get_band
+        items = list(crawler.crawl(seeds=[1, 2, 3]))
+
+        self.assertEqual({1, 3}, {item.band_id for item in items if isinstance(item, bandcamp.band.Band)})
+        self.assertEqual({2}, crawler.failed['bands'])
+        self.assertEqual([], crawler.pending['bands'])
+        self.assertEqual(1, crawler.stats.errors)
+
+        # The checkpoint knows the failure, so a resumed crawl has nothing left to do
+        self.assertEqual([], list(self.get_crawler().crawl()))
+
+    def test_failed_track(self):
+        """Verify that a track that can not be fetched is recorded while the rest of its batch is crawled"""
+        crawler = self.get_crawler()
+        original_get_track = self.transport.get_track
+
+        def get_track(track_id):
+            if track_id == 301:
+                raise KeyError(track_id)
+
+            return original_get_track(track_id)
+
+        self.transport.get_track = get_track
+        items = list(crawler.crawl(seeds=[3]))
+
+        self.assertEqual([('Band', 3), ('Track', 302)], summarize(items))
+        self.assertEqual({301}, crawler.failed['tracks'])
+        self.assertEqual(1, crawler.stats.errors)
+
+    def test_failed_album_step(self):
+        """Verify that an exception while the albums are crawled is counted and kept"""
+        def iter_info(api, album_ids, max_workers=None):
+            raise OSError('Connection reset by peer')
+
+        crawler = self.get_crawler()
+        with mock.patch('bandcamp.album.iter_info', iter_info):
+            list(crawler.crawl(seeds=[2]))
+
+        self.assertEqual({21}, crawler.failed['albums'])
+        self.assertEqual(2, crawler.stats.errors)
+        self.assertIsInstance(crawler.stats.last_error, OSError)
+
+    def test_incremental_checkpoint(self):
+        """Verify that the checkpoint file only holds the queues and the finished ids are appended to logs"""
+        crawler = self.get_crawler()
+        list(crawler.crawl(seeds=[1, 2, 3]))
+
+        with open(self.checkpoint_path, encoding='utf-8') as f:
+            self.assertEqual({'pending', 'errors'}, set(json.load(f)))
+
+        with open(self.checkpoint_path + '.done', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+        self.assertEqual(sorted('%s %d' % (queue, _id) for queue, ids in crawler.done.items() for _id in ids),
+                         sorted(lines))
+
+        resumed = self.get_crawler()
+        self.assertEqual(crawler.done, resumed.done)
+        self.assertEqual({'bands': set(), 'albums': set(), 'tracks': set()}, resumed.failed)
+
+    def test_ids_logged_after_checkpoint(self):
+        """Verify that ids in the logs are not fetched again and a cut off line is ignored"""
+        crawler = self.get_crawler()
+        crawler.add('tracks', [101, 301, 302])
+        crawler.save_checkpoint()
+
+        with open(self.checkpoint_path + '.done', 'a', encoding='utf-8') as f:
+            f.write('tracks 101\ntracks 30')
+
+        resumed = self.get_crawler()
+        self.assertEqual([301, 302], resumed.pending['tracks'])
+        self.assertEqual({101}, resumed.done['tracks'])
+
+    def test_old_checkpoint(self):
+        """Verify that a checkpoint that holds the finished ids itself is loaded"""
+        state = {'pending': {'bands': [], 'albums': [], 'tracks': [101, 301]},
+                 'done': {'bands': [1], 'albums': [], 'tracks': []},
+                 'failed': {'bands': [], 'albums': [11], 'tracks': []}, 'errors': 1}
+        with open(self.checkpoint_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+
+        crawler = self.get_crawler()
+        self.assertEqual(({1}, {11}, 1), (crawler.done['bands'], crawler.failed['albums'], crawler.errors))
+        self.assertEqual([('Track', 101), ('Track', 301)], summarize(crawler.crawl()))
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import csv
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+import bandcamp
+from bandcamp.export import COLUMNS, Exporter, export
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+def get_api(response_file_name, models=None):
+    api = bandcamp.TestApi(response_file_name)
+    if models is not None:
+        api.models = models
+
+    return api
+
+
+def get_items(models=None):
+    items = [bandcamp.band.info(api=get_api('test_single_band', models), band_id=3463798201),
+             bandcamp.track.info(api=get_api('test_single_track', models), track_id=1269403107)]
+
+    discography = bandcamp.band.discography(api=get_api('test_single_discography', models), band_id=203035041)
+    items += list(discography.albums.values()) + list(discography.tracks.values())
+
+    _album = bandcamp.album.info(api=get_api('test_album', models), album_id=2587417518)
+    items += [_album] + list(_album.tracks)
+
+    return items
+
+
+class TestExport(unittest.TestCase):
+    """Test the streaming exporter"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def get_path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_jsonl(self):
+        items = get_items()
+        path = self.get_path('catalog.jsonl')
+
+        self.assertEqual(len(items), export(items, path, row_group_size=3))
+
+        with open(path, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+
+        self.assertEqual(len(items), len(rows))
+        self.assertEqual(list(COLUMNS), list(rows[0]))
+        self.assertEqual(('band', 3463798201), (rows[0]['kind'], rows[0]['band_id']))
+        self.assertEqual(('track', 1269403107), (rows[1]['kind'], rows[1]['track_id']))
+        self.assertEqual({'band', 'track', 'album', 'discography_album'},
+                         {row['kind'] for row in rows})
+
+    def test_compressed_csv(self):
+        """Verify that the format and compression are taken from the file name"""
+        items = get_items()
+        path = self.get_path('catalog.csv.gz')
+
+        export(items, path)
+
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+
+        self.assertEqual(list(COLUMNS), rows[0])
+        self.assertEqual(len(items), len(rows) - 1)
+
+    def test_compact_models(self):
+        """Verify that compact objects without a response give the same rows"""
+        path = self.get_path('catalog.jsonl')
+        compact_path = self.get_path('compact.jsonl')
+
+        export(get_items(), path)
+        export(get_items(models=bandcamp.compact.models()), compact_path)
+
+        with open(path, encoding='utf-8') as f, open(compact_path, encoding='utf-8') as compact_f:
+            self.assertEqual([json.loads(line) for line in f], [json.loads(line) for line in compact_f])
+
+    def test_row_groups(self):
+        """Verify that rows are only written once a row group is full"""
+        exporter = Exporter(self.get_path('catalog.jsonl'), row_group_size=2)
+        items = get_items()
+
+        exporter.write(items[0])
+        self.assertEqual(0, exporter.rows_written)
+        exporter.write(items[1])
+        self.assertEqual(2, exporter.rows_written)
+
+        exporter.write(items[2])
+        exporter.close()
+        self.assertEqual(3, exporter.rows_written)
+
+    def test_unknown_object(self):
+        with Exporter(self.get_path('catalog.jsonl')) as exporter:
+            self.assertRaises(ValueError, exporter.write, object())
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, Exporter, self.get_path('catalog.txt'))
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet(self):
+        items = get_items()
+        path = self.get_path('catalog.parquet')
+
+        export(items, path, compression='gzip', row_group_size=3)
+
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        self.assertEqual(len(items), parquet_file.metadata.num_rows)
+        self.assertEqual(3, parquet_file.metadata.row_group(0).num_rows)
+        self.assertEqual(list(COLUMNS), parquet_file.schema_arrow.names)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+import bandcamp
+from bandcamp.index import BandIndex
+from bandcamp.transport import Response, Transport
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingTransport(Transport):
+    """Answers every request with the same fixture and remembers the urls"""
+
+    def __init__(self, response_file_name):
+        with open(os.path.join(bandcamp.TestApi.JSON_DIR, response_file_name), 'rb') as f:
+            self.body = f.read()
+
+        self.urls = []
+
+    def request(self, url, headers=None):
+        self.urls.append(url)
+        return Response(status=200, headers={}, body=self.body)
+
+
+def get_api(response_file_name, band_index=None):
+    if band_index is None:
+        band_index = BandIndex()
+
+    transport = RecordingTransport(response_file_name)
+    return bandcamp.Api(api_key=None, transport=transport, band_index=band_index), transport
+
+
+class TestBandIndex(unittest.TestCase):
+    """Test the local band index"""
+
+    def test_search_is_answered_from_the_index(self):
+        """Verify that a name is only searched for once, ignoring case"""
+        api, transport = get_api('test_search_lapfox')
+
+        bands = bandcamp.band.search(api=api, name='LapFoxTrax')
+        self.assertEqual({842757654, 2142855304}, set(bands))
+
+        bands = bandcamp.band.search(api=api, name='lapfoxtrax ')
+        self.assertEqual({842757654, 2142855304}, set(bands))
+        self.assertEqual(1, len(transport.urls))
+        self.assertEqual(1, api.band_index.hits)
+
+    def test_only_unknown_names_are_sent(self):
+        api, transport = get_api('test_search_lapfox')
+        bandcamp.band.search(api=api, name='LapFoxTrax')
+
+        matches = bandcamp.band.search_many(api=api, name=['Lapfoxtrax', 'nobody'])
+
+        self.assertEqual({842757654, 2142855304}, set(matches['Lapfoxtrax']))
+        self.assertEqual({}, matches['nobody'])
+        self.assertIn('name=nobody', transport.urls[-1])
+
+        # Names without a match are remembered as well
+        bandcamp.band.search_many(api=api, name=['nobody'])
+        self.assertEqual(2, len(transport.urls))
+
+    def test_info_fills_the_index(self):
+        """Verify that bands from band.info can be found by id and subdomain, but do not answer searches"""
+        api, transport = get_api('test_single_band')
+        band = bandcamp.band.info(api=api, band_id=3463798201)
+
+        self.assertIs(band, api.band_index.get(3463798201))
+        self.assertIs(band, api.band_index.by_subdomain(band.subdomain.upper()))
+        self.assertIsNone(api.band_index.lookup(band.name))
+
+    def test_ttl(self):
+        clock = FakeClock()
+        api, transport = get_api('test_search_lapfox', band_index=BandIndex(ttl=60, clock=clock))
+
+        bandcamp.band.search(api=api, name='LapFoxTrax')
+        clock.now = 61
+        bandcamp.band.search(api=api, name='LapFoxTrax')
+
+        self.assertEqual(2, len(transport.urls))
+
+    def test_renamed_band(self):
+        """Verify that a band is only found under its newest name"""
+        band_index = BandIndex()
+        api, _ = get_api('test_search_lapfox', band_index=band_index)
+        bands = bandcamp.band.search(api=api, name='LapFoxTrax')
+
+        renamed = bandcamp.band.Band(band_body=dict(bands[2142855304].band_body, name='Renamed'))
+        band_index.add(renamed)
+
+        self.assertEqual({842757654}, set(band_index.lookup('lapfoxtrax')))
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import os
+import unittest
+
+import bandcamp
+from bandcamp.jsonstream import iter_discography_entries
+
+
+def read_fixture(name):
+    with open(os.path.join(bandcamp.TestApi.JSON_DIR, name), 'rb') as f:
+        return f.read()
+
+
+class TestDiscographyStream(unittest.TestCase):
+    """Test the incremental parser for discography responses"""
+
+    def test_single_discography(self):
+        """Verify that the entries of a single discography are yielded without band id"""
+        body = read_fixture('test_single_discography')
+        entries = list(iter_discography_entries(io.BytesIO(body), chunk_size=7))
+
+        self.assertEqual([(None, entry) for entry in json.loads(body.decode('utf-8'))['discography']], entries)
+
+    def test_multiple_discographies(self):
+        """Verify that the entries of a batch response are yielded with their band id"""
+        body = read_fixture('test_multiple_discographies')
+        expected = [(int(band_id), entry) for band_id, content in json.loads(body.decode('utf-8')).items()
+                    for entry in content['discography']]
+
+        for chunk_size in (1, 13, 4096):
+            entries = list(iter_discography_entries(io.BytesIO(body), chunk_size=chunk_size))
+            self.assertEqual(expected, entries)
+
+    def test_numbers_split_between_chunks(self):
+        """Verify that a number at the end of a chunk is not cut off"""
+        body = b'{"discography": [{"track_id": 1234567890}, {"album_id": 42}]}'
+
+        for chunk_size in range(1, len(body)):
+            entries = list(iter_discography_entries(io.BytesIO(body), chunk_size=chunk_size))
+            self.assertEqual([(None, {'track_id': 1234567890}), (None, {'album_id': 42})], entries)
+
+    def test_error_response(self):
+        """Verify that an error of the API is raised"""
+        body = read_fixture('test_search_thirteen')
+
+        with self.assertRaises(ValueError):
+            list(iter_discography_entries(io.BytesIO(body)))
+
+    def test_iter_discography(self):
+        """Verify that band.iter_discography yields discography items"""
+        api = bandcamp.TestApi('test_multiple_discographies')
+        items = list(bandcamp.band.iter_discography(api=api, band_id=[3463798201, 203035041]))
+
+        discographies = bandcamp.band.discography(api=api, band_id=[3463798201, 203035041])
+        expected = sum(len(discography.albums) + len(discography.tracks) for discography in discographies.values())
+
+        self.assertEqual(expected, len(items))
+        self.assertIsInstance(dict(items)[203035041], bandcamp.band.DiscographyAlbum)
+
+    def test_iter_single_discography(self):
+        """Verify that the band id of a single discography is filled in"""
+        api = bandcamp.TestApi('test_single_discography')
+        items = list(bandcamp.band.iter_discography(api=api, band_id=203035041))
+
+        self.assertEqual(10, len(items))
+        self.assertTrue(all(band_id == 203035041 for band_id, item in items))
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import bandcamp
+from bandcamp.cache import MemoryCache
+from bandcamp.metrics import Histogram, Metrics, RequestRecord
+
+from .catalog import CatalogTransport
+
+
+def get_record(**kwargs):
+    values = dict(endpoint='/api/track/3/info', batch_size=1, status=200, cache_hit=False, response_bytes=100,
+                  encoded_bytes=40, dns=0.0, connect=0.0, wait=0.01, transfer=0.001, parse=0.002, total=0.02,
+                  attempts=1, throttle_wait=0.0, error=None)
+    values.update(kwargs)
+
+    return RequestRecord(**values)
+
+
+class TestHooks(unittest.TestCase):
+    """Test the request records of the Api object"""
+
+    def setUp(self):
+        self.records = []
+        self.api = bandcamp.Api(api_key='secret', transport=CatalogTransport({1: {'albums': {}, 'tracks': [11, 12]}}),
+                                cache=MemoryCache(), hooks=[self.records.append])
+
+    def test_request_and_cache_hit(self):
+        bandcamp.track.info(api=self.api, track_id=[11, 12])
+        bandcamp.track.info(api=self.api, track_id=[11, 12])
+
+        miss, hit = self.records
+        self.assertEqual(('/api/track/3/info', 2, 200, False, 1), (miss.endpoint, miss.batch_size, miss.status,
+                                                                   miss.cache_hit, miss.attempts))
+        self.assertGreater(miss.response_bytes, 0)
+        self.assertGreater(miss.total, 0)
+        self.assertTrue(hit.cache_hit)
+        self.assertEqual(0, hit.response_bytes)
+
+    def test_error(self):
+        self.assertRaises(KeyError, bandcamp.track.info, api=self.api, track_id=13)
+
+        self.assertEqual('KeyError', self.records[0].error)
+        self.assertIsNone(self.records[0].status)
+
+    def test_streamed_request(self):
+        api = bandcamp.TestApi('test_single_discography')
+        api.hooks = [self.records.append]
+        items = bandcamp.band.iter_discography(api=api, band_id=203035041)
+        next(items)
+
+        self.assertEqual([], self.records)
+
+        list(items)
+        record, = self.records
+        self.assertEqual(('/api/band/3/discography', 1, 200, 1), (record.endpoint, record.batch_size, record.status,
+                                                                  record.attempts))
+        self.assertEqual(len(api.transport.request(api.file_path).body), record.response_bytes)
+        self.assertEqual(record.response_bytes, record.encoded_bytes)
+        self.assertIsNone(record.error)
+
+    def test_streamed_error(self):
+        api = bandcamp.TestApi('test_single_discography')
+        api.hooks = [self.records.append]
+        api.transport.request = lambda url, headers=None: bandcamp.transport.Response(status=503, headers={},
+                                                                                        body=b'')
+
+        self.assertRaises(ValueError, list, bandcamp.band.iter_discography(api=api, band_id=203035041))
+
+        self.assertEqual((503, 'ValueError', 0), (self.records[0].status, self.records[0].error,
+                                                  self.records[0].response_bytes))
+
+
+class TestMetrics(unittest.TestCase):
+    """Test the aggregation and export of request records"""
+
+    def test_histogram(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value)
+
+        self.assertEqual([1, 3], histogram.counts)
+        self.assertEqual(4, histogram.count)
+        self.assertEqual(1.0, histogram.quantile(0.5))
+        self.assertEqual(float('inf'), histogram.quantile(1.0))
+
+    def test_aggregation(self):
+        metrics = Metrics()
+        metrics(get_record())
+        metrics(get_record(batch_size=50, throttle_wait=0.25))
+        metrics(get_record(cache_hit=True, status=None, response_bytes=0))
+        metrics(get_record(endpoint='/api/band/3/info', status=None, error='OSError', total=1.5))
+
+        self.assertEqual(2, metrics.requests[('/api/track/3/info', 200, 'miss')])
+        self.assertEqual(1, metrics.requests[('/api/track/3/info', '', 'hit')])
+        self.assertEqual(52, metrics.batch_items['/api/track/3/info'])
+        self.assertEqual(200, metrics.response_bytes['/api/track/3/info'])
+        self.assertEqual(80, metrics.encoded_bytes['/api/track/3/info'])
+        self.assertEqual(0.25, metrics.throttle_wait['/api/track/3/info'])
+        self.assertEqual(2, metrics.latency['/api/track/3/info'].count)
+        self.assertEqual(1, metrics.errors[('/api/band/3/info', 'OSError')])
+
+    def test_prometheus(self):
+        metrics = Metrics(buckets=(0.01, 0.1))
+        metrics(get_record())
+        metrics(get_record(endpoint='/api/"odd"/info'))
+
+        text = metrics.to_prometheus()
+
+        self.assertIn('# TYPE bandcamp_requests_total counter\n', text)
+        self.assertIn('bandcamp_requests_total{endpoint="/api/track/3/info",status="200",cache="miss"} 1\n', text)
+        self.assertIn('bandcamp_request_duration_seconds_bucket{endpoint="/api/track/3/info",le="0.01"} 0\n', text)
+        self.assertIn('bandcamp_request_duration_seconds_bucket{endpoint="/api/track/3/info",le="+Inf"} 1\n', text)
+        self.assertIn('bandcamp_request_duration_seconds_count{endpoint="/api/track/3/info"} 1\n', text)
+        self.assertIn('endpoint="/api/\\"odd\\"/info"', text)
+        self.assertTrue(text.endswith('\n'))
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import bandcamp
+from bandcamp.ratelimit import RateLimiter
+from bandcamp.transport import Response, Transport
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SequenceTransport(Transport):
+    """Answer with the given statuses in order, the last one forever"""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def request(self, url, headers=None):
+        self.calls += 1
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return Response(status=status, headers={}, body=b'{"band_id": 4214473200}')
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test the token bucket rate limiter"""
+
+    def test_burst_then_wait(self):
+        """Verify that requests beyond the burst have to wait for new tokens"""
+        limiter = RateLimiter(rate=10, burst=2, clock=FakeClock())
+
+        self.assertEqual(0, limiter.reserve())
+        self.assertEqual(0, limiter.reserve())
+        self.assertAlmostEqual(0.1, limiter.reserve())
+        self.assertAlmostEqual(0.2, limiter.reserve())
+
+        self.assertEqual(4, limiter.acquired)
+        self.assertAlmostEqual(0.3, limiter.waited)
+
+    def test_tokens_refill(self):
+        """Verify that tokens are refilled over time up to the burst size"""
+        clock = FakeClock()
+        limiter = RateLimiter(rate=10, burst=2, clock=clock)
+        limiter.reserve()
+        limiter.reserve()
+
+        clock.now = 10
+        self.assertEqual(0, limiter.reserve())
+        self.assertEqual(0, limiter.reserve())
+        self.assertGreater(limiter.reserve(), 0)
+
+    def test_adaptive_rate(self):
+        """Verify that the rate drops when throttled and recovers on success"""
+        limiter = RateLimiter(rate=10, min_rate=1, increase=1, decrease=0.5, clock=FakeClock())
+
+        self.assertTrue(limiter.record(Response(status=429, headers={}, body=b'')))
+        self.assertEqual(5, limiter.rate)
+        self.assertFalse(limiter.record(Response(status=500, headers={}, body=b'')))
+        self.assertEqual(2.5, limiter.rate)
+
+        for _ in range(20):
+            limiter.record(Response(status=200, headers={}, body=b''))
+
+        self.assertEqual(10, limiter.rate)
+
+    def test_not_modified_is_a_success(self):
+        """Verify that revalidated cache entries do not slow the client down"""
+        limiter = RateLimiter(rate=10, clock=FakeClock())
+
+        for _ in range(3):
+            self.assertFalse(limiter.record(Response(status=304, headers={}, body=b'')))
+
+        self.assertEqual(10, limiter.rate)
+
+    def test_api_retries_throttled_requests(self):
+        """Verify that the Api object retries a throttled request"""
+        transport = SequenceTransport(429, 429, 200)
+        limiter = RateLimiter(rate=1000, retries=3)
+        api = bandcamp.Api(api_key=None, transport=transport, rate_limiter=limiter)
+
+        response = bandcamp.url.info(api=api, url='cults.bandcamp.com')
+
+        self.assertEqual(4214473200, response.band_id)
+        self.assertEqual(3, transport.calls)
+        self.assertEqual(3, limiter.acquired)
+
+    def test_api_gives_up(self):
+        """Verify that the Api object raises once the retries are used up"""
+        transport = SequenceTransport(429)
+        api = bandcamp.Api(api_key=None, transport=transport, rate_limiter=RateLimiter(rate=1000, retries=2))
+
+        with self.assertRaises(ValueError):
+            bandcamp.url.info(api=api, url='cults.bandcamp.com')
+
+        self.assertEqual(3, transport.calls)
+
+    def test_api_records_the_wait(self):
+        """Verify that every request record tells how long that request waited for the rate limiter"""
+        records = []
+        api = bandcamp.Api(api_key=None, transport=SequenceTransport(200), hooks=[records.append],
+                           rate_limiter=RateLimiter(rate=100, burst=1))
+
+        bandcamp.url.info(api=api, url='cults.bandcamp.com')
+        bandcamp.url.info(api=api, url='cults.bandcamp.com')
+
+        self.assertEqual(0.0, records[0].throttle_wait)
+        self.assertGreater(records[1].throttle_wait, 0.0)
+
+    def test_api_slows_down_on_connection_errors(self):
+        """Verify that requests failing without a response cut the rate"""
+        class FailingTransport(Transport):
+            def request(self, url, headers=None):
+                raise OSError('Connection refused')
+
+        limiter = RateLimiter(rate=10, decrease=0.5)
+        api = bandcamp.Api(api_key=None, transport=FailingTransport(), rate_limiter=limiter)
+
+        with self.assertRaises(OSError):
+            bandcamp.url.info(api=api, url='cults.bandcamp.com')
+
+        self.assertEqual(5, limiter.rate)
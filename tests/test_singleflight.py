@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+import time
+import unittest
+
+import bandcamp
+from bandcamp.singleflight import AsyncSingleFlight, SingleFlight
+from bandcamp.transport import AsyncTransport, Response, Transport
+
+BODY = b'{"album_id": 2587417518, "title": "Who Killed Amanda Palmer"}'
+
+
+class SlowTransport(Transport):
+    def __init__(self):
+        self.calls = 0
+
+    def request(self, url, headers=None):
+        self.calls += 1
+        time.sleep(0.05)
+        return Response(status=200, headers={}, body=BODY)
+
+
+class SlowAsyncTransport(AsyncTransport):
+    def __init__(self):
+        self.calls = 0
+
+    async def request(self, url, headers=None):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return Response(status=200, headers={}, body=BODY)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test the coalescing of identical requests"""
+
+    def test_threads_share_one_request(self):
+        """Verify that concurrent threads asking for the same album only send one request"""
+        transport = SlowTransport()
+        api = bandcamp.Api(api_key=None, transport=transport)
+        albums = []
+
+        def fetch():
+            albums.append(bandcamp.album.info(api=api, album_id=2587417518))
+
+        threads = [threading.Thread(target=fetch) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, transport.calls)
+        self.assertEqual(10, len(albums))
+        self.assertTrue(all(album.title == 'Who Killed Amanda Palmer' for album in albums))
+
+    def test_exceptions_are_shared(self):
+        """Verify that waiting callers get the exception of the call they waited for"""
+        flight = SingleFlight()
+        started = threading.Event()
+        errors = []
+
+        def fail():
+            started.set()
+            time.sleep(0.05)
+            raise ValueError('HTTP status 500 returned when querying API')
+
+        def call():
+            try:
+                flight.do('key', fail)
+            except ValueError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        call()
+        leader.join()
+
+        self.assertEqual(2, len(errors))
+        self.assertEqual(0, len(flight))
+
+    def test_coroutines_share_one_request(self):
+        """Verify that concurrent coroutines asking for the same album only send one request"""
+        transport = SlowAsyncTransport()
+        api = bandcamp.AsyncApi(api_key=None, transport=transport)
+
+        async def fetch():
+            return await asyncio.gather(*(bandcamp.album.info(api=api, album_id=2587417518) for _ in range(10)))
+
+        albums = asyncio.run(fetch())
+
+        self.assertEqual(1, transport.calls)
+        self.assertEqual(10, len(albums))
+
+    def test_cancelled_leader(self):
+        """Verify that cancelling the first caller does not cancel the callers waiting for the same call"""
+        flight = AsyncSingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return 'result'
+
+        async def run():
+            leader = asyncio.ensure_future(flight.do('key', work))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.do('key', work))
+            await asyncio.sleep(0)
+
+            leader.cancel()
+            result = await follower
+            await asyncio.sleep(0)
+
+            return leader, result
+
+        leader, result = asyncio.run(run())
+
+        self.assertTrue(leader.cancelled())
+        self.assertEqual('result', result)
+        self.assertEqual(0, len(flight))
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import unittest
+
+import bandcamp
+from bandcamp.sync import Snapshot, sync
+
+from .catalog import CatalogTransport
+
+
+def get_catalog():
+    return {
+        1: {'albums': {11: [111, 112], 12: [121]}, 'tracks': [101]},
+        2: {'albums': {21: [211]}, 'tracks': []},
+    }
+
+
+class TestSync(unittest.TestCase):
+    """Test the incremental catalog sync"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'snapshot.json')
+
+        self.transport = CatalogTransport(get_catalog())
+        self.api = bandcamp.Api(api_key=None, transport=self.transport)
+
+    def test_first_sync_fetches_everything(self):
+        result = sync(api=self.api, band_ids=[1, 2], snapshot=Snapshot(self.path))
+
+        self.assertEqual({11, 12, 21}, set(result.albums))
+        self.assertEqual({101}, set(result.tracks))
+        self.assertEqual({11, 12}, result.deltas[1].new_albums)
+
+    def test_unchanged_catalog_fetches_nothing(self):
+        """Verify that a second sync only fetches the discographies"""
+        sync(api=self.api, band_ids=[1, 2], snapshot=Snapshot(self.path))
+        del self.transport.urls[:]
+
+        result = sync(api=self.api, band_ids=[1, 2], snapshot=Snapshot(self.path))
+
+        self.assertEqual({}, result.albums)
+        self.assertEqual({}, result.tracks)
+        self.assertEqual(1, len(self.transport.urls))
+        self.assertIn('/discography', self.transport.urls[0])
+
+    def test_delta(self):
+        """Verify that new, removed and changed items are detected and only those are fetched"""
+        sync(api=self.api, band_ids=[1, 2], snapshot=Snapshot(self.path))
+
+        catalog = get_catalog()
+        catalog[1]['albums'][13] = [131]
+        del catalog[1]['albums'][12]
+        catalog[1]['tracks'].append(102)
+        transport = CatalogTransport(catalog, release_dates={21: 1400000000})
+        api = bandcamp.Api(api_key=None, transport=transport)
+
+        result = sync(api=api, band_ids=[1, 2], snapshot=Snapshot(self.path))
+
+        self.assertEqual({13}, result.deltas[1].new_albums)
+        self.assertEqual({12}, result.deltas[1].removed_albums)
+        self.assertEqual({102}, result.deltas[1].new_tracks)
+        self.assertEqual({21}, result.deltas[2].changed_albums)
+
+        self.assertEqual({13, 21}, set(result.albums))
+        self.assertEqual({102}, set(result.tracks))
+        self.assertEqual({'13', '11'}, set(Snapshot(self.path).get(1)['albums']))
+
+    def test_failed_items_are_retried(self):
+        """Verify that an album that could not be fetched is fetched on the next sync"""
+        original_get_album = self.transport.get_album
+
+        def get_album(album_id):
+            if album_id == 21:
+                raise OSError('Connection reset by peer')
+
+            return original_get_album(album_id)
+
+        self.transport.get_album = get_album
+        result = sync(api=self.api, band_ids=[1, 2], snapshot=Snapshot(self.path))
+        self.assertNotIn(21, result.albums)
+
+        self.transport.get_album = original_get_album
+        result = sync(api=self.api, band_ids=[1, 2], snapshot=Snapshot(self.path))
+        self.assertEqual({21}, set(result.albums))
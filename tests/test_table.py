@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import unittest
+from unittest import mock
+
+import bandcamp
+from bandcamp.commons import DownloadableStates
+from bandcamp.table import TrackTable, release_year
+
+
+class TestTrackTable(unittest.TestCase):
+    """Test the columnar track table"""
+
+    def setUp(self):
+        api = bandcamp.TestApi('test_album_tpwg')
+        self.album = bandcamp.album.info(api=api, album_id=2587417518)
+
+    def test_from_album(self):
+        """Verify that a table can be built from the tracks of an album"""
+        table = TrackTable.from_tracks(self.album)
+
+        self.assertEqual(6, len(table))
+        self.assertEqual([track.track_id for track in self.album.tracks], list(table['track_id']))
+        self.assertEqual([1, 2, 3, 4, 5, 6], list(table['number']))
+
+    def test_from_batch_result(self):
+        """Verify that a table can be built from the mapping returned by track.info"""
+        api = bandcamp.TestApi('test_multiple_tracks')
+        tracks = bandcamp.track.info(api=api, track_id=[3257270656, 1269403107])
+
+        table = TrackTable.from_tracks(tracks)
+
+        self.assertEqual({3257270656, 1269403107}, set(table['track_id']))
+
+    def test_compact_tracks(self):
+        """Verify that compact tracks give the same table"""
+        api = bandcamp.TestApi('test_album_tpwg')
+        api.models = bandcamp.compact.models()
+        compact_album = bandcamp.album.info(api=api, album_id=2587417518)
+
+        table = TrackTable.from_tracks(self.album)
+        compact_table = TrackTable.from_tracks(compact_album)
+
+        for name in table.columns:
+            self.assertEqual(list(table[name]), list(compact_table[name]), name)
+
+    def test_sum_and_group_sum(self):
+        """Verify that durations can be summed in total and per band"""
+        table = TrackTable.from_tracks(self.album)
+        total = sum(track.duration for track in self.album.tracks)
+
+        self.assertAlmostEqual(total, table.sum('duration'))
+        self.assertEqual({self.album.band_id: table.sum('duration')}, table.group_sum(by='band_id', column='duration'))
+
+    def test_filter(self):
+        """Verify that rows can be filtered"""
+        table = TrackTable.from_tracks(self.album)
+
+        first_half = table.filter(table.mask('number', lambda number: number <= 3))
+        self.assertEqual([1, 2, 3], list(first_half['number']))
+
+        paid = table.where('downloadable', DownloadableStates.PAID.value)
+        self.assertEqual(sum(track.downloadable == DownloadableStates.PAID for track in self.album.tracks),
+                         len(paid))
+
+    def test_where_across_types(self):
+        """Verify that a float column can be queried with an int and downloadable with its enum member"""
+        table = TrackTable.from_tracks(self.album)
+        duration = int(table['duration'][0])
+        table['duration'][0] = duration
+
+        self.assertEqual([self.album.tracks[0].track_id], list(table.where('duration', duration)['track_id']))
+        self.assertEqual(0, len(table.where('duration', -1)))
+        self.assertEqual(len(table.where('downloadable', DownloadableStates.PAID.value)),
+                         len(table.where('downloadable', DownloadableStates.PAID)))
+        self.assertEqual(0, len(table.where('downloadable', DownloadableStates.NOT_FOR_SALE)))
+
+    def test_group_count_by_year(self):
+        """Verify that rows can be counted per release year"""
+        tracks = [bandcamp.track.info(api=bandcamp.TestApi('test_single_track'), track_id=1269403107)]
+        table = TrackTable.from_tracks(tracks)
+
+        expected = tracks[0].release_date.tm_year if tracks[0].release_date else 0
+        self.assertEqual({expected: 1}, table.group_count(by='release_date', key=release_year))
+
+
+    def test_missing_durations(self):
+        """Verify that tracks without a duration are skipped by the sums but counted"""
+        bodies = [{'track_id': 1, 'band_id': 10, 'duration': 60.5}, {'track_id': 2, 'band_id': 10},
+                  {'track_id': 3, 'band_id': 20, 'duration': 30.0}]
+        table = TrackTable.from_tracks([bandcamp.track.Track(track_body=body) for body in bodies])
+
+        self.assertEqual(90.5, table.sum('duration'))
+        self.assertEqual({10: 60.5, 20: 30.0}, table.group_sum(by='band_id', column='duration'))
+        self.assertEqual({10: 3, 20: 3}, table.group_sum(by='band_id', column='track_id'))
+        self.assertEqual({10: 2, 20: 1}, table.group_count(by='band_id'))
+        self.assertEqual(0, len(table.where('band_id', 30)))
+
+
+class TestTrackTableWithoutNumPy(TestTrackTable):
+    """Test the pure Python fallback of the track table"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('bandcamp.table.numpy', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import unittest
+from unittest import mock
 
 import bandcamp
 
@@ -109,3 +110,47 @@ class TestTrack(unittest.TestCase):
 
         self.assertEqual(2846277250, track.track_id)
 
+    def test_many_tracks_are_split_into_batches(self):
+        """Verify that too many track ids are fetched in several requests and merged"""
+        track_ids = range(1000000000, 1000000500)
+
+        api = bandcamp.TestApi('test_multiple_tracks')
+        with mock.patch.object(api.transport, 'request', wraps=api.transport.request) as request:
+            tracks = bandcamp.track.info(api=api, track_id=track_ids)
+
+        self.assertGreater(request.call_count, 1)
+        for call in request.call_args_list:
+            self.assertLess(len(call[0][0]), 2000)
+
+        self.assertEqual({3257270656, 1269403107}, set(tracks))
+
+    def test_partial_batches(self):
+        """Verify that the tracks of successful batches can be returned when some batches fail"""
+        track_ids = range(1000000000, 1000000500)
+
+        api = bandcamp.TestApi('test_multiple_tracks')
+        original_request = api.transport.request
+
+        def request(url, headers=None):
+            if '1000000000' in url:
+                raise OSError('Connection refused')
+
+            return original_request(url, headers=headers)
+
+        with mock.patch.object(api.transport, 'request', side_effect=request):
+            with self.assertRaises(OSError):
+                bandcamp.track.info(api=api, track_id=track_ids)
+
+            tracks = bandcamp.track.info(api=api, track_id=track_ids, partial=True)
+
+        self.assertEqual(2, len(tracks))
+
+    def test_partial_single_batch(self):
+        """Verify that partial=True also applies when all ids fit into one request"""
+        api = bandcamp.TestApi('test_single_track')
+
+        tracks = bandcamp.track.info(api=api, track_id=1269403107, partial=True)
+        self.assertEqual({1269403107}, set(tracks))
+
+        with mock.patch.object(api.transport, 'request', side_effect=OSError('Connection refused')):
+            self.assertEqual({}, bandcamp.track.info(api=api, track_id=1269403107, partial=True))
@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import unittest
+import zlib
+
+import bandcamp
+from bandcamp.cache import MemoryCache, SQLiteCache
+from bandcamp.metrics import Metrics
+from bandcamp.transport import (AsyncPooledTransport, AsyncReplayTransport, FileTransport, PooledTransport,
+                                RecordingTransport, ReplayTransport, _Decompressor, get_request_key)
+
+from .catalog import CatalogTransport
+from .server import FixtureServer
+
+
+class TestPooledTransport(unittest.TestCase):
+    """Test the keep-alive connection pool"""
+
+    def test_connection_is_reused(self):
+        """Verify that consecutive requests share one connection"""
+        with FixtureServer() as server:
+            transport = PooledTransport()
+            self.addCleanup(transport.close)
+
+            for _ in range(3):
+                response = transport.request(server.url + '/api/band/3/info?band_id=3463798201')
+                self.assertEqual(200, response.status)
+                self.assertEqual(3463798201, json.loads(response.body.decode('utf-8'))['band_id'])
+
+        self.assertEqual(3, len(server.requests))
+        self.assertEqual(1, server.connections)
+
+    def test_timings(self):
+        """Verify that connecting is only timed for new connections"""
+        with FixtureServer() as server:
+            transport = PooledTransport()
+            self.addCleanup(transport.close)
+
+            first = transport.request(server.url + '/api/band/3/info?band_id=3463798201').timings
+            second = transport.request(server.url + '/api/band/3/info?band_id=3463798201').timings
+
+        self.assertGreater(first.connect, 0)
+        self.assertEqual((0.0, 0.0), (second.dns, second.connect))
+        self.assertGreater(second.wait, 0)
+
+    def test_idle_timeout(self):
+        """Verify that connections idle for too long are not reused"""
+        now = [0]
+
+        with FixtureServer() as server:
+            transport = PooledTransport(idle_timeout=10, clock=lambda: now[0])
+            self.addCleanup(transport.close)
+
+            transport.request(server.url + '/api/band/3/info?band_id=3463798201')
+            now[0] = 11
+            transport.request(server.url + '/api/band/3/info?band_id=3463798201')
+
+        self.assertEqual(2, server.connections)
+
+    def test_streamed_body(self):
+        """Verify that a streamed body can be read in pieces and its connection is reused afterwards"""
+        with FixtureServer() as server:
+            transport = PooledTransport()
+            self.addCleanup(transport.close)
+
+            response = transport.open(server.url + '/api/band/3/discography?band_id=203035041')
+            with response.body:
+                pieces = iter(lambda: response.body.read(100), b'')
+                body = b''.join(pieces)
+
+            transport.request(server.url + '/api/band/3/info?band_id=3463798201')
+
+        self.assertEqual(10, len(json.loads(body.decode('utf-8'))['discography']))
+        self.assertEqual(1, server.connections)
+
+    def test_error_status(self):
+        """Verify that the status of the response is passed on"""
+        with FixtureServer() as server:
+            transport = PooledTransport()
+            self.addCleanup(transport.close)
+
+            self.assertEqual(404, transport.request(server.url + '/unknown').status)
+
+
+class TestCompression(unittest.TestCase):
+    """Test gzip and deflate encoded responses"""
+
+    URL = '/api/band/3/discography?band_id=203035041'
+
+    def get_body(self, server):
+        return server.get_fixture('test_single_discography')
+
+    def request(self, compression, **kwargs):
+        with FixtureServer(compression=compression) as server:
+            transport = PooledTransport(**kwargs)
+            self.addCleanup(transport.close)
+
+            response = transport.request(server.url + self.URL, headers={'Accept-Encoding': 'gzip, deflate'})
+
+        return server, response
+
+    def test_gzip(self):
+        server, response = self.request('gzip')
+
+        self.assertEqual(self.get_body(server), response.body)
+        self.assertEqual(len(server.get_fixture('test_single_discography', encoding='gzip')),
+                         response.encoded_size)
+        self.assertLess(response.encoded_size, len(response.body))
+
+    def test_deflate(self):
+        server, response = self.request('deflate')
+
+        self.assertEqual(self.get_body(server), response.body)
+        self.assertLess(response.encoded_size, len(response.body))
+
+    def test_raw_deflate(self):
+        """Verify that deflate bodies without the zlib header are decompressed as well"""
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        data = compressor.compress(b'{"a": 1}' * 100) + compressor.flush()
+        decompressor = _Decompressor('deflate', max_size=1000)
+
+        body = b''.join(decompressor.feed(data[index:index + 7]) for index in range(0, len(data), 7))
+
+        self.assertEqual(b'{"a": 1}' * 100, body + decompressor.flush())
+
+    def test_not_accepted(self):
+        """Verify that the body is sent as is if the client does not ask for compression"""
+        with FixtureServer(compression='gzip') as server:
+            transport = PooledTransport()
+            self.addCleanup(transport.close)
+
+            response = transport.request(server.url + self.URL)
+
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(len(response.body), response.encoded_size)
+
+    def test_size_limit(self):
+        """Verify that a body that decompresses to more than the limit is refused without decompressing it"""
+        data = gzip.compress(b' ' * 10000000)
+        decompressor = _Decompressor('gzip', max_size=1000)
+
+        with self.assertRaises(ValueError):
+            decompressor.feed(data)
+
+        self.assertLessEqual(decompressor.size, 1001)
+
+        with self.assertRaises(ValueError):
+            self.request('gzip', max_decompressed_size=100)
+
+    def test_streamed_body(self):
+        """Verify that a streamed body is decompressed while it is read"""
+        with FixtureServer(compression='gzip') as server:
+            transport = PooledTransport()
+            self.addCleanup(transport.close)
+
+            response = transport.open(server.url + self.URL, headers={'Accept-Encoding': 'gzip'})
+            with response.body:
+                body = b''.join(iter(lambda: response.body.read(100), b''))
+
+            transport.request(server.url + self.URL)
+
+        self.assertEqual(self.get_body(server), body)
+        self.assertEqual(1, server.connections)
+
+    def test_async(self):
+        async def request(url):
+            transport = AsyncPooledTransport()
+            try:
+                return await transport.request(url, headers={'Accept-Encoding': 'gzip'})
+            finally:
+                await transport.close()
+
+        with FixtureServer(compression='gzip') as server:
+            response = asyncio.run(request(server.url + self.URL))
+
+        self.assertEqual(self.get_body(server), response.body)
+        self.assertLess(response.encoded_size, len(response.body))
+
+    def test_api_accepts_compression(self):
+        """Verify that the Api asks for compression and the hooks see the size on the wire"""
+        class LocalTransport(PooledTransport):
+            def request(self, url, headers=None):
+                return super().request(server.url + url[url.index('/api/'):], headers=headers)
+
+        with FixtureServer(compression='gzip') as server:
+            metrics = Metrics()
+            api = bandcamp.Api(api_key=None, transport=LocalTransport(), hooks=[metrics])
+            self.addCleanup(api.close)
+
+            discography = bandcamp.band.discography(api=api, band_id=203035041)
+
+        endpoint = '/api/band/3/discography'
+        self.assertEqual(10, len(discography.albums))
+        self.assertLess(metrics.encoded_bytes[endpoint], metrics.response_bytes[endpoint])
+        self.assertEqual(len(self.get_body(server)), metrics.response_bytes[endpoint])
+
+    def test_api_streams_compression(self):
+        """Verify that the hooks see the size on the wire of a streamed response"""
+        class LocalTransport(PooledTransport):
+            def open(self, url, headers=None):
+                return super().open(server.url + url[url.index('/api/'):], headers=headers)
+
+        with FixtureServer(compression='gzip') as server:
+            metrics = Metrics()
+            api = bandcamp.Api(api_key=None, transport=LocalTransport(), hooks=[metrics])
+            self.addCleanup(api.close)
+
+            items = list(bandcamp.band.iter_discography(api=api, band_id=203035041))
+
+        endpoint = '/api/band/3/discography'
+        self.assertEqual(10, len(items))
+        self.assertLess(metrics.encoded_bytes[endpoint], metrics.response_bytes[endpoint])
+        self.assertEqual(len(self.get_body(server)), metrics.response_bytes[endpoint])
+
+
+class TestConditionalRequests(unittest.TestCase):
+    """Test 304 Not Modified answers from a real server"""
+
+    URL = '/api/band/3/info?band_id=3463798201'
+
+    def test_not_modified(self):
+        with FixtureServer() as server:
+            transport = PooledTransport()
+            self.addCleanup(transport.close)
+
+            etag = transport.request(server.url + self.URL).headers['ETag']
+            response = transport.request(server.url + self.URL, headers={'If-None-Match': etag})
+            transport.request(server.url + self.URL)
+
+        self.assertEqual(304, response.status)
+        self.assertEqual(b'', response.body)
+        self.assertEqual(1, server.connections)
+
+    def test_async_not_modified(self):
+        """Verify that a 304 without a Content-Length does not wait for the connection to be closed"""
+        async def request(url):
+            transport = AsyncPooledTransport(timeout=2)
+            try:
+                etag = (await transport.request(url)).headers['ETag']
+                response = await transport.request(url, headers={'If-None-Match': etag})
+                await transport.request(url)
+                return response
+            finally:
+                await transport.close()
+
+        with FixtureServer() as server:
+            response = asyncio.run(request(server.url + self.URL))
+
+        self.assertEqual(304, response.status)
+        self.assertEqual(b'', response.body)
+        self.assertEqual(1, server.connections)
+
+    def test_async_api_revalidation(self):
+        """Verify that an AsyncApi revalidates an expired cache entry without decoding it again"""
+        class LocalTransport(AsyncPooledTransport):
+            async def request(self, url, headers=None):
+                return await super().request(server.url + url[url.index('/api/'):], headers=headers)
+
+        clock = [0.0]
+        cache = MemoryCache(ttl=10, endpoint_ttls={}, clock=lambda: clock[0])
+
+        async def info():
+            api = bandcamp.AsyncApi(api_key=None, cache=cache, transport=LocalTransport(timeout=2))
+            try:
+                first = await bandcamp.band.info(api=api, band_id=3463798201)
+                clock[0] = 11
+                return first, await bandcamp.band.info(api=api, band_id=3463798201)
+            finally:
+                await api.close()
+
+        with FixtureServer() as server:
+            first, second = asyncio.run(info())
+
+        self.assertEqual(first.band_id, second.band_id)
+        self.assertEqual(2, len(server.requests))
+        self.assertEqual(1, cache.revalidations)
+
+
+class TestAsyncPooledTransport(unittest.TestCase):
+    """Test the asyncio connection pool"""
+
+    def test_timeout_closes_the_connection(self):
+        """Verify that a request that times out does not leave its connection open"""
+        writers = []
+
+        class Transport(AsyncPooledTransport):
+            async def _connect(self, origin):
+                connection, dns, connect = await super()._connect(origin)
+                writers.append(connection[1])
+                return connection, dns, connect
+
+        async def request(url):
+            transport = Transport(timeout=0.1)
+            try:
+                with self.assertRaises(asyncio.TimeoutError):
+                    await transport.request(url)
+
+                return transport._pools
+            finally:
+                await transport.close()
+
+        with FixtureServer(latency=0.5) as server:
+            pools = asyncio.run(request(server.url + '/api/band/3/info?band_id=3463798201'))
+
+        self.assertEqual(1, len(writers))
+        self.assertTrue(writers[0].is_closing())
+        self.assertFalse(any(pools.values()))
+
+
+class TestFileTransport(unittest.TestCase):
+    """Test the transport that replaces the network in the unittests"""
+
+    def test_api_with_file_transport(self):
+        """Verify that an Api object can be backed by a file"""
+        transport = FileTransport(os.path.join(bandcamp.TestApi.JSON_DIR, 'test_single_band'))
+        api = bandcamp.Api(api_key=None, transport=transport)
+
+        band = bandcamp.band.info(api=api, band_id=3463798201)
+
+        self.assertEqual('amandapalmer', band.subdomain)
+
+
+class TestRecordAndReplay(unittest.TestCase):
+    """Test the record/replay transports"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'session.jsonl.gz')
+
+        transport = RecordingTransport(CatalogTransport({1: {'albums': {11: [111]}, 'tracks': [101]}}), self.path)
+        api = bandcamp.Api(api_key='secret', transport=transport)
+
+        self.album = bandcamp.album.info(api=api, album_id=11)
+        self.discography = bandcamp.band.discography(api=api, band_id=1)
+        api.close()
+
+    def test_replay(self):
+        """Verify that recorded requests are answered the same way, regardless of the api key"""
+        transport = ReplayTransport(self.path)
+        api = bandcamp.Api(api_key='other-key', transport=transport)
+
+        self.assertEqual(2, len(transport))
+        self.assertEqual(self.album.album_body, bandcamp.album.info(api=api, album_id=11).album_body)
+        self.assertEqual({11}, set(bandcamp.band.discography(api=api, band_id=1).albums))
+
+    def test_request_key(self):
+        """Verify that archives and the SQLite cache key requests the same way"""
+        url = 'http://api.bandcamp.com/api/band/3/search?name=a,b&key=secret&extra=1'
+
+        self.assertEqual('http://api.bandcamp.com/api/band/3/search?extra=1&name=a,b', get_request_key(url))
+        self.assertEqual(get_request_key(url), '%s?%s' % SQLiteCache.split_key(url))
+
+    def test_unknown_request(self):
+        api = bandcamp.Api(api_key=None, transport=ReplayTransport(self.path))
+
+        self.assertRaises(KeyError, bandcamp.album.info, api=api, album_id=12)
+
+    def test_latency(self):
+        delays = []
+        transport = ReplayTransport(self.path, latency=0.25, sleep=delays.append)
+        transport.request('http://api.bandcamp.com/api/album/2/info?album_id=11')
+
+        transport.latency = lambda elapsed: elapsed + 1
+        transport.request('http://api.bandcamp.com/api/album/2/info?album_id=11')
+
+        self.assertEqual(0.25, delays[0])
+        self.assertGreaterEqual(delays[1], 1)
+
+    def test_async_replay(self):
+        async def replay():
+            api = bandcamp.AsyncApi(api_key=None, transport=AsyncReplayTransport(self.path, latency='recorded'))
+            return await bandcamp.album.info(api=api, album_id=11)
+
+        self.assertEqual(self.album.album_body, asyncio.run(replay()).album_body)
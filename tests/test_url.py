@@ -3,6 +3,8 @@ import unittest
 
 import bandcamp
 
+from .catalog import CatalogTransport
+
 
 class TestUrl(unittest.TestCase):
     """Test the URL module"""
@@ -33,4 +35,66 @@ class TestUrl(unittest.TestCase):
 
         response = bandcamp.url.info(api=api, url=url)
         self.assertEqual(4180852708, response.band_id)
-        self.assertEqual(1163674320, response.album_id)
\ No newline at end of file
+        self.assertEqual(1163674320, response.album_id)
+
+
+class TestResolver(unittest.TestCase):
+    """Test the bulk URL resolver"""
+
+    def setUp(self):
+        self.transport = CatalogTransport({1: {'albums': {}, 'tracks': []}, 2: {'albums': {}, 'tracks': []}})
+        self.api = bandcamp.Api(api_key=None, transport=self.transport)
+
+    def test_normalize(self):
+        for url in ('band-1.bandcamp.com', 'http://Band-1.bandcamp.com/', ' https://band-1.bandcamp.com?from=x '):
+            self.assertEqual('band-1.bandcamp.com', bandcamp.url.normalize(url))
+
+        self.assertEqual('band-1.bandcamp.com/album/a', bandcamp.url.normalize('https://band-1.bandcamp.com/album/a/'))
+        self.assertRaises(ValueError, bandcamp.url.normalize, 'http://')
+
+    def test_duplicates_are_resolved_once(self):
+        urls = ['band-1.bandcamp.com', 'https://band-1.bandcamp.com/', 'band-2.bandcamp.com/track/a']
+
+        responses = bandcamp.url.info_many(api=self.api, urls=urls)
+
+        self.assertEqual(set(urls), set(responses))
+        self.assertEqual(1, responses[urls[1]].band_id)
+        self.assertEqual(2, responses[urls[2]].band_id)
+        self.assertEqual(2, len(self.transport.urls))
+
+    def test_known_urls_are_not_sent(self):
+        """Verify that resolved URLs and the other page of known bands are answered without a request"""
+        resolver = bandcamp.url.Resolver(api=self.api)
+        resolver.info_many(['band-1.bandcamp.com/track/a', 'band-2.bandcamp.com'])
+        del self.transport.urls[:]
+
+        self.assertEqual(1, resolver.info('http://band-1.bandcamp.com/track/a/').band_id)
+        self.assertEqual(2, resolver.info('band-2.bandcamp.com/music').band_id)
+        self.assertIsNone(resolver.info('band-2.bandcamp.com').album_id)
+        self.assertEqual([], self.transport.urls)
+
+        resolver.info('band-2.bandcamp.com/album/c')
+        self.assertEqual(1, len(self.transport.urls))
+
+    def test_album_urls_do_not_resolve_the_host(self):
+        """Verify that an album on a label's subdomain does not make the label resolve to the artist"""
+        resolver = bandcamp.url.Resolver(api=self.api)
+        resolver.info('band-999.bandcamp.com/album/a')
+
+        self.assertIsNone(resolver.get('band-999.bandcamp.com'))
+        self.assertIsNone(resolver.get('band-999.bandcamp.com/music'))
+
+    def test_max_size(self):
+        resolver = bandcamp.url.Resolver(api=self.api, max_size=1)
+        resolver.info_many(['band-1.bandcamp.com/track/a', 'band-1.bandcamp.com/track/b'])
+
+        self.assertIsNone(resolver.get('band-1.bandcamp.com/track/a'))
+        self.assertIsNotNone(resolver.get('band-1.bandcamp.com/track/b'))
+
+    def test_partial(self):
+        """Verify that URLs that can not be resolved are left out with partial=True"""
+        resolver = bandcamp.url.Resolver(api=self.api)
+        urls = ['band-1.bandcamp.com', 'band-x.bandcamp.com']
+
+        self.assertRaises(ValueError, resolver.info_many, urls)
+        self.assertEqual(['band-1.bandcamp.com'], list(resolver.info_many(urls, partial=True)))